@@ -0,0 +1,719 @@
+# a batch engine stepping a whole population of agents at once
+# the state of N agents is kept in NumPy arrays of shape (N,)
+# and every update of the scalar agents in simulation.py
+# is performed for all of them with a few array operations
+import numpy as np
+
+from noise import BatchNoise
+from online import OnlineStats
+from profiling import PhaseProfiler
+from recorder import CompactRecorder, Recorder, State
+from simulation import InteroceptiveAgent, ExteroceptiveAgent, ActiveExteroceptiveAgent
+
+# variables recorded by a compact recording (those of them the agents have)
+COMPACT_NAMES = ('temp', 'temp_desire', 'aex_action', 'vfe')
+# classes of the agents whose equations the batch steps
+AGENT_CLASSES = (InteroceptiveAgent, ExteroceptiveAgent, ActiveExteroceptiveAgent)
+# values drawn at a time by the noise stream of every source of every agent
+NOISE_BLOCK = 256
+# parameters of the constructors of the agents that all agents of a batch share
+SHARED = ('dt', 'integrator', 'field')
+# attributes of the agents set by the parameters of their constructors, where the names differ
+ATTRIBUTES = {'action_bound': 'temp_change_action_bound',
+              'temp_const_change_initial': 'temp_change_environment_initial'}
+# learning rates of the layers of the agents: whether the learning rate
+# `learn_r` of the agent is used for the given value, as in their constructors
+LEARNING_RATES = {'learn_r_a': lambda value: not value,
+                  'learn_r_ex': lambda value: True,
+                  'learn_r_aex': lambda value: value is None}
+
+
+def sqrd_err(err, sigma):
+    return np.square(err) / sigma
+
+
+def transition(Ad, Bd, x, u):
+    """ exact transition of the state x of all agents for their inputs u,
+        with a transition matrix per agent """
+    x = np.einsum('nij,jn->in', Ad, x) + np.einsum('nij,jn->in', Bd, u)
+    return tuple(x)
+
+
+class BatchAgent:
+    """N agents of the same class, simulated together.
+
+       Parameters of the agents can differ: each keyword argument is
+       either a single value shared by all agents or a sequence with
+       one value per agent (except for those in SHARED). One agent of
+       `agent_cls` with the first values gives the defaults and the derived
+       parameters (e.g. `learn_r_a`), as for the scalar agents, the parameters
+       that differ are set as arrays directly (see set_params).
+
+       The same trajectories as of the scalar agents are produced
+       for the same noise: agent i of the batch gets the same noise
+       and the same trajectories as a scalar agent with the seed `seed[i]`.
+       The streams of every agent draw `noise_block` values at a time
+       (see BatchNoise), small blocks keep the memory of large batches low."""
+
+    def __init__(self, agent_cls=ActiveExteroceptiveAgent, n=None, noise_block=NOISE_BLOCK,
+                 **kwargs):
+        # the parameters with a value per agent
+        per_agent = {name: value for name, value in kwargs.items() if np.ndim(value) == 1}
+        if n is None:
+            n = len(next(iter(per_agent.values()))) if per_agent else 1
+        for name, values in per_agent.items():
+            if len(values) != n:
+                raise ValueError(f'{name} has {len(values)} values for {n} agents')
+            if name in SHARED and any(value is not values[0] and value != values[0]
+                                      for value in values):
+                raise ValueError(f'all agents of a batch must share the same {name}')
+
+        # the agent of the first values of the parameters
+        agent = agent_cls(**{name: values[0] if name in per_agent else values
+                             for name, values in kwargs.items()})
+        self.noise_block = noise_block
+        self.set_agents([agent] * n)
+
+        if 'seed' in per_agent:
+            self.seed = list(per_agent['seed'])
+        if 'schedule' in per_agent:
+            default = agent.default_schedule()
+            self.set_schedules([schedule or default for schedule in per_agent['schedule']])
+
+        varying = {name: values for name, values in per_agent.items()
+                   if name not in SHARED + ('seed', 'schedule')}
+        if varying:
+            self.set_params(agent, varying, kwargs)
+
+    @classmethod
+    def from_agents(cls, agents, noise_block=NOISE_BLOCK):
+        """ create a batch from already constructed scalar agents """
+        batch = cls.__new__(cls)
+        batch.noise_block = noise_block
+        batch.set_agents(agents)
+        return batch
+
+    def set_agents(self, agents):
+        # the same agent may stand for many agents of the batch (e.g. agents with
+        # the same parameters), what is derived from the agents is computed once for it
+        distinct = {}
+        agent_index = np.array([distinct.setdefault(id(agent), len(distinct))
+                                for agent in agents])
+        unique = list({id(agent): agent for agent in agents}.values())
+
+        agent_cls = type(unique[0])
+        if any(type(agent) is not agent_cls for agent in unique):
+            raise ValueError('all agents of a batch must be of the same class')
+        if agent_cls not in AGENT_CLASSES:
+            # subclasses (e.g. LayeredAgent) may update their beliefs differently
+            raise ValueError(f'a batch can only step agents of the classes '
+                             f'{", ".join(cls.__name__ for cls in AGENT_CLASSES)}, '
+                             f'not {agent_cls.__name__}')
+        if any(agent.dt != unique[0].dt for agent in unique):
+            raise ValueError('all agents of a batch must share the same dt')
+        if any(agent.integrator != unique[0].integrator for agent in unique):
+            raise ValueError('all agents of a batch must use the same integrator')
+        if any(agent.field is not unique[0].field for agent in unique):
+            raise ValueError('all agents of a batch must live in the same depth field')
+
+        self.agent_cls = agent_cls
+        self.n = len(agents)
+        self.dt = unique[0].dt
+
+        self.exteroceptive = issubclass(agent_cls, ExteroceptiveAgent)
+        self.active = issubclass(agent_cls, ActiveExteroceptiveAgent)
+
+        def param(name, dtype=float):
+            return np.array([getattr(agent, name) for agent in unique], dtype=dtype)[agent_index]
+
+        # sigma (variances) of sensory noise (z) and model noise (w)
+        self.i_s_z_0 = param('i_s_z_0')
+        self.i_s_z_1 = param('i_s_z_1')
+        self.i_s_w_0 = param('i_s_w_0')
+        self.i_s_w_1 = param('i_s_w_1')
+
+        # learning rates
+        self.learn_r = param('learn_r')
+        self.learn_r_a = param('learn_r_a')
+
+        # goal temperature
+        self.T0 = param('T0')
+        self.temp_viable_mean = param('temp_viable_mean')
+        self.temp_viable_range = param('temp_viable_range')
+
+        # action bound and initial change of temperature
+        self.temp_change_action_bound = param('temp_change_action_bound')
+        self.temp_change_environment_initial = param('temp_change_environment_initial')
+
+        self.simulate_current = param('simulate_current', bool)
+        self.field = unique[0].field
+
+        self.seed = [agent.seed for agent in agents]
+
+        self.set_schedules([agent.schedule or agent.default_schedule() for agent in unique],
+                           agent_index)
+
+        # exact transitions of all agents, stacked
+        self.integrator = unique[0].integrator
+        if self.integrator == 'exact':
+            transitions = [agent.exact_transitions() for agent in unique]
+            self.transitions = {name: [np.stack(matrices)[agent_index] for matrices in
+                                       zip(*[t[name][:2] for t in transitions])]
+                                for name in transitions[0]}
+            # noise of the temperature is the same for all agents of the same dt
+            self.temp_noise = transitions[0]['world'][2]
+
+        if self.exteroceptive:
+            self.learn_r_ex = param('learn_r_ex')
+            self.ex_s_z_0 = param('ex_s_z_0')
+
+        if self.active:
+            self.learn_r_aex = param('learn_r_aex')
+            self.aex_s_z_0 = param('aex_s_z_0')
+            self.aex_s_w_0 = param('aex_s_w_0')
+            self.aex_action_bound = param('aex_action_bound')
+            self.supress_action = param('supress_action', bool)
+            self.supress_desired_temp_inference = \
+                param('supress_desired_temp_inference', bool)
+
+        self.reset()
+
+    def set_schedules(self, schedules, index=None):
+        """ scenarios of the world of the agents, `schedules[index[i]]` of agent i
+            (`schedules[i]` without an index) """
+        # each distinct scenario is compiled once
+        distinct = {}
+        self.schedule_index = np.array([distinct.setdefault(schedule, len(distinct))
+                                        for schedule in schedules])
+        if index is not None:
+            self.schedule_index = self.schedule_index[index]
+        self.schedules = list(distinct)
+        # the action of every agent is noisy until its current starts
+        self.current_start = np.array([schedule.current.start_time()
+                                       for schedule in self.schedules])[self.schedule_index]
+
+    def set_params(self, agent, varying, kwargs):
+        """ set the parameters that differ per agent (`varying`, {name: values})
+            and those derived from them as arrays, starting from the `agent`
+            of the first values of all parameters """
+        params = {}
+        for name, values in varying.items():
+            if name in LEARNING_RATES:
+                continue
+            values = np.asarray(values)
+            params[ATTRIBUTES.get(name, name)] = \
+                values if values.dtype == bool else values.astype(float)
+
+        if 'learn_r' in varying or any(name in varying for name in LEARNING_RATES):
+            learn_r = np.broadcast_to(params.get('learn_r', agent.learn_r), self.n)
+            for name, derived in LEARNING_RATES.items():
+                if not hasattr(agent, name):
+                    continue
+                given = varying.get(name, [kwargs.get(name)] * self.n)
+                values = np.array([np.nan if derived(value) else value for value in given],
+                                  dtype=float)
+                params[name] = np.where(np.isnan(values), learn_r, values)
+
+        vars(self).update(params)
+
+        if self.integrator == 'exact':
+            # the exact transitions of every distinct set of the parameters,
+            # of the agent with them
+            names = list(params)
+            rows, index = np.unique(np.column_stack([params[name] for name in names]),
+                                    axis=0, return_inverse=True)
+            transitions = []
+            for row in rows:
+                vars(agent).update(zip(names, row.tolist()))
+                transitions.append(agent.exact_transitions())
+            self.transitions = {name: [np.stack(matrices)[index.ravel()] for matrices in
+                                       zip(*[t[name][:2] for t in transitions])]
+                                for name in transitions[0]}
+
+        # initial values of the parameters per agent
+        self.reset()
+
+    def reset(self, steps=0, record_every=1, record_window=None):
+        """ set initial state of all agents and allocate the history
+            for the given number of steps (see Recorder) """
+        self.now = State()
+        self.from_start = set()
+        for name, initial in self.variables():
+            setattr(self.now, name, np.full(self.n, np.nan) if initial is None
+                    else np.array(initial, dtype=float))
+            if initial is not None:
+                self.from_start.add(name)
+
+        self.recorder = self.new_recorder(steps, record_every, record_window)
+        self.survival = False
+
+        # noise streams of all agents, created when a simulation starts
+        self.noise = None
+
+    def new_recorder(self, steps, record_every=1, record_window=None, first_step=0):
+        """ recorder of the trajectories of all agents: of all variables, or only
+            of the `record_names` in `record_dtype` set by the simulation """
+        names = getattr(self, 'record_names', None)
+        if names is None:
+            return Recorder(self.now, steps, self.from_start, shape=(self.n,),
+                            every=record_every, window=record_window, first_step=first_step)
+        return CompactRecorder(self.now, steps, self.from_start, shape=(self.n,),
+                               every=record_every, window=record_window,
+                               first_step=first_step, names=names, dtype=self.record_dtype)
+
+    def new_noise(self):
+        """ noise of all agents, the noise of the scalar agents of their seeds """
+        return BatchNoise(self.seed, self.noise_block)
+
+    def variables(self):
+        """ variables of the agents (name, initial value), where variables without
+            an initial value are recorded starting from the first step """
+        zeros = np.zeros(self.n)
+        variables = [
+            # errors
+            ('i_e_z_0', None), ('i_e_z_1', None), ('i_e_w_0', None), ('i_e_w_1', None),
+            # senses
+            ('sense_i', None), ('sense_i_d1', None),
+            # world
+            ('temp', self.T0), ('temp_change', zeros),
+            ('temp_change_environment', self.temp_change_environment_initial),
+            ('temp_change_instant_update', zeros), ('temp_change_action', zeros),
+            ('light_change', zeros), ('light_change_instant', zeros),
+            ('light_change_environment', zeros), ('light_change_movement', None),
+            ('velocity_action', zeros), ('velocity', zeros),
+            # action (interoceptive)
+            ('temp_desire', self.temp_viable_mean),
+            # brain state mu
+            ('mu_i', zeros), ('mu_i_d1', zeros), ('mu_i_d2', zeros),
+            # variational free energy
+            ('vfe_i', None), ('vfe', None),
+        ]
+        if self.exteroceptive:
+            variables += [('ex_sense', None), ('ex_e_z_0', None),
+                          ('ex_mu', zeros), ('vfe_ex', None)]
+        if self.active:
+            variables += [('aex_e_z_0', zeros), ('aex_e_w_0', zeros),
+                          ('aex_mu', zeros), ('aex_mu_d1', zeros),
+                          ('vfe_aex', None),
+                          ('aex_action', zeros), ('aex_action_pre_bound', zeros)]
+        if self.field is not None:
+            field = self.field
+            variables += [('depth', np.full(self.n, float(field.depth_initial))),
+                          ('light', np.full(self.n, field.sample(field.light,
+                                                                 field.depth_initial, 0)))]
+        return variables
+
+    def __getattr__(self, name):
+        # recorded trajectories are available under the same names
+        # as for the scalar agents, with shape (time steps, agents)
+        recorder = self.__dict__.get('recorder')
+        if recorder is None or name not in recorder.columns:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        return recorder.view(name)
+
+    def forcing_now(self, name):
+        """ forcing of the world of all agents at this step """
+        return self.forcing[name][self.step - self.forcing_start][self.schedule_index]
+
+    def update_world(self):
+        now = self.now
+        time = self.time
+
+        # temperature change of the environment jumps at its events
+        new_temp_change_desired = self.forcing_now('temp_change')
+        new_temp_change_desired = np.where(np.isnan(new_temp_change_desired),
+                                           now.temp_change_environment,
+                                           new_temp_change_desired)
+        now.temp_change_instant_update = \
+            new_temp_change_desired - now.temp_change_environment
+
+        now.light_change_instant = self.forcing_now('light_change')
+
+        if self.active:
+            if time < self.act_time:
+                now.velocity_action = np.zeros(self.n)
+            else:
+                acting = ~self.supress_action
+                noise = self.noise('velocity_action', acting & (time < self.current_start))
+                now.velocity_action = np.where(acting, now.aex_action + noise,
+                                               now.velocity_action)
+
+    def upd_velocity(self):
+        now = self.now
+        # external force -- current
+        now.velocity = now.velocity_action + self.forcing_now('current')
+
+    def upd_temp_change(self):
+        now = self.now
+        if self.integrator == 'exact':
+            # exact integration over the step, see InteroceptiveAgent.upd_temp_change_exact
+            temp_change_environment = now.temp_change_environment + \
+                now.temp_change_instant_update
+            Ad, Bd = self.transitions['world']
+            temp_change_environment, temp = transition(
+                Ad, Bd, (temp_change_environment, now.temp),
+                (now.velocity, now.temp_change_action))
+            temp = temp + self.temp_noise * self.noise('temp_change', scale=1)
+
+            now.temp_change_environment = temp_change_environment
+            now.temp_change = (temp - now.temp) / self.dt
+            return
+
+        temp_change_environment = now.temp_change_environment + \
+            now.temp_change_instant_update
+        temp_change_environment += now.velocity * self.dt
+        now.temp_change_environment = temp_change_environment
+
+        action = now.temp_change_action + self.noise('temp_change') * self.dt
+        now.temp_change = now.temp_change_environment + action
+
+    def upd_field(self):
+        """ depth of all agents and the temperature and light change at it,
+            see InteroceptiveAgent.upd_field """
+        now = self.now
+        field = self.field
+
+        depth = now.depth
+        now.depth = depth - now.velocity * self.dt
+
+        now.temp_change_environment = field.sample_array(field.temp_change, now.depth, self.time)
+        action = now.temp_change_action + self.noise('temp_change') * self.dt
+        now.temp_change = now.temp_change_environment + action
+
+        end = self.time + self.dt
+        light = field.sample_array(field.light, depth, end)
+        now.light_change_environment = (light - now.light) / self.dt
+        now.light = field.sample_array(field.light, now.depth, end)
+        now.light_change_movement = (now.light - light) / self.dt
+        now.light_change = now.light_change_environment + now.light_change_movement
+
+    def upd_temp(self):
+        now = self.now
+        now.temp = now.temp + now.temp_change * self.dt
+
+    def upd_light_change(self):
+        now = self.now
+        now.light_change_environment = now.light_change_environment + \
+            now.light_change_instant * self.dt
+        now.light_change_movement = now.velocity
+        now.light_change = now.light_change_environment + now.light_change_movement
+
+    def generate_senses(self):
+        now = self.now
+        now.sense_i = now.temp + self.noise('sense_i')
+        now.sense_i_d1 = now.temp_change + self.noise('sense_i_d1')
+        if self.exteroceptive:
+            now.ex_sense = now.light_change + self.noise('ex_sense')
+
+    def exteroception(self):
+        now = self.now
+        prediction = now.ex_sense
+        if self.active:
+            # light change generated by the agent acting on the world
+            prediction = prediction - now.aex_action
+        now.ex_e_z_0 = prediction - 0.1 * (-now.ex_mu + 30)
+
+        if self.integrator == 'exact':
+            now.ex_mu, = transition(*self.transitions['exteroception'], (now.ex_mu,),
+                                    (prediction, np.ones(self.n)))
+        else:
+            upd = -self.learn_r_ex * (0.1 * now.ex_e_z_0 / self.ex_s_z_0)
+            now.ex_mu = now.ex_mu + upd * self.dt
+
+        now.vfe_ex = 0.5 * sqrd_err(now.ex_e_z_0, self.ex_s_z_0)
+
+    def interoception(self):
+        now = self.now
+        #   --> update errors
+        now.i_e_z_0 = now.sense_i - now.mu_i
+        now.i_e_z_1 = now.sense_i_d1 - now.mu_i_d1
+        now.i_e_w_0 = now.mu_i_d1 + now.mu_i - now.temp_desire
+        now.i_e_w_1 = now.mu_i_d2 + now.mu_i_d1
+
+        #  --> update recognition dynamics
+        if self.integrator == 'exact':
+            now.mu_i, now.mu_i_d1, now.mu_i_d2 = transition(
+                *self.transitions['interoception'], (now.mu_i, now.mu_i_d1, now.mu_i_d2),
+                (now.sense_i, now.sense_i_d1, now.temp_desire))
+        else:
+            self.upd_mu_i_euler()
+
+        #  update free energy
+        now.vfe_i = 0.5 * (sqrd_err(now.i_e_z_0, self.i_s_z_0) +
+                           sqrd_err(now.i_e_z_1, self.i_s_z_1) +
+                           sqrd_err(now.i_e_w_0, self.i_s_w_0) +
+                           sqrd_err(now.i_e_w_1, self.i_s_w_1))
+
+    def upd_mu_i_euler(self):
+        now = self.now
+        mu_i_d1, mu_i_d2 = now.mu_i_d1, now.mu_i_d2
+
+        upd = -self.learn_r * (now.i_e_w_1 / self.i_s_w_1)
+        now.mu_i_d2 = mu_i_d2 + upd * self.dt
+
+        upd = -self.learn_r * (-now.i_e_z_1 / self.i_s_z_1 +
+                               now.i_e_w_0 / self.i_s_w_0 + now.i_e_w_1 / self.i_s_w_1)
+        upd += mu_i_d2
+        now.mu_i_d1 = mu_i_d1 + upd * self.dt
+
+        upd = -self.learn_r * (-now.i_e_z_0 / self.i_s_z_0 + now.i_e_w_0 / self.i_s_w_0)
+        upd += mu_i_d1
+        now.mu_i = now.mu_i + upd * self.dt
+
+    def active_exteroception(self):
+        now = self.now
+        #  --> update recognition dynamics
+        if self.integrator == 'exact':
+            t_change_goal = now.sense_i_d1 - now.temp_change_action
+            now.aex_mu, now.aex_mu_d1 = transition(
+                *self.transitions['active_exteroception'], (now.aex_mu, now.aex_mu_d1),
+                (now.aex_action, t_change_goal))
+        else:
+            upd = -self.learn_r_ex * (now.aex_e_w_0 / self.aex_s_w_0)
+            now.aex_mu_d1 = now.aex_mu_d1 + upd * self.dt
+
+            upd = -self.learn_r_ex * (now.aex_e_z_0 / self.aex_s_z_0 +
+                                      now.aex_e_w_0 / self.aex_s_w_0)
+            upd += now.aex_mu_d1
+            now.aex_mu = now.aex_mu + upd * self.dt
+
+        #   --> update errors
+        now.aex_e_z_0 = now.aex_action - (-now.aex_mu)
+        t_change_goal = now.sense_i_d1 - now.temp_change_action
+        now.aex_e_w_0 = now.aex_mu_d1 - t_change_goal + now.aex_mu
+
+        #  update free energy
+        now.vfe_aex = 0.5 * (sqrd_err(now.aex_e_z_0, self.aex_s_z_0) +
+                             sqrd_err(now.aex_e_w_0, self.aex_s_w_0))
+
+    def active_inference(self):
+        now = self.now
+        if not self.exteroceptive:
+            now.temp_desire = self.temp_viable_mean.copy()
+            self.interoception()
+            return
+
+        self.exteroception()
+
+        # pass the prior about desired temperature to the interoception
+        if self.active:
+            now.temp_desire = np.where(self.supress_desired_temp_inference,
+                                       self.temp_viable_mean, now.ex_mu)
+        else:
+            now.temp_desire = now.ex_mu.copy()
+
+        self.interoception()
+
+        if self.active:
+            self.active_exteroception()
+
+    def upd_vfe(self):
+        now = self.now
+        vfe = now.vfe_i
+        if self.exteroceptive:
+            vfe = vfe + now.vfe_ex
+        if self.active:
+            vfe = vfe + now.vfe_aex
+        now.vfe = vfe
+
+    def upd_action(self):
+        now = self.now
+        upd = -self.learn_r_a * 1 * (now.i_e_z_1 / self.i_s_z_1)
+        action = now.temp_change_action + upd * self.dt
+        bound = self.temp_change_action_bound
+        now.temp_change_action = np.where(np.abs(action) > bound,
+                                          np.sign(action) * bound, action)
+
+        if self.active:
+            upd = -self.learn_r_aex * 1 * (now.aex_e_z_0 / self.aex_s_z_0)
+            aex_action = now.aex_action + upd * self.dt
+            aex_action += self.noise('aex_action') * self.dt
+            now.aex_action_pre_bound = aex_action
+
+            bound = self.aex_action_bound
+            now.aex_action = np.where(np.abs(aex_action) > bound,
+                                      np.sign(aex_action) * bound, aex_action)
+
+    def advance(self):
+        """ simulate one time step of all agents """
+        # in survival runs, dead agents keep their state from their death
+        before = None
+        if self.survival:
+            dead = self.death_step >= 0
+            if dead.any():
+                # every update assigns new arrays, so these keep the state before the step
+                before = dict(vars(self.now))
+
+        self.time = self.step * self.dt
+        # update world
+        self.update_world()
+        self.upd_velocity()
+        if self.field is not None:
+            self.upd_field()
+            self.upd_temp()
+        else:
+            self.upd_temp_change()
+            self.upd_temp()
+            self.upd_light_change()
+
+        # generate sensations
+        self.generate_senses()
+
+        # perform active inference
+        self.active_inference()
+
+        # update variational free energy
+        self.upd_vfe()
+
+        #  act
+        if self.time > self.act_time:
+            self.upd_action()
+
+        if before is not None:
+            for name, value in vars(self.now).items():
+                setattr(self.now, name, np.where(dead, before[name], value))
+
+        self.recorder.record(self.now)
+        if self.stats is not None:
+            self.stats.update(self.now)
+        self.step += 1
+
+        # agents whose temperature left the viable range for the first time
+        temp = self.now.temp
+        died = (self.death_step < 0) & \
+            ~(np.abs(temp - self.temp_viable_mean) <= self.temp_viable_range)
+        if died.any():
+            self.death_step[died] = self.step
+            self.death_cause[died] = np.where(
+                np.isnan(temp[died]), 'diverged',
+                np.where(temp[died] < self.temp_viable_mean[died], 'cold', 'hot'))
+            # the statistics of dead agents end with the step of their death
+            if self.survival and self.stats is not None:
+                self.stats.stop(died)
+
+    def simulate(self, sim_time=None, act_time=50, record_every=1, record_window=None,
+                 profile=False, survival=False, stats=None, record_names=None,
+                 record_dtype=np.float32):
+        """ simulate all agents, by default for the same time as
+            the scalar agent of the batch's class.
+            With `profile=True` the time spent in each phase is reported in `self.profile`.
+            The step after which each agent died (its temperature left the viable range)
+            is recorded in `death_step` (-1 if it did not die) and the cause in `death_cause`.
+            With `survival=True` the state of dead agents is not updated after their
+            death, their statistics end with it, their trajectories are masked with NaN
+            after it and the simulation stops when all agents are dead.
+            With `stats=True` (or an OnlineStats) summary statistics of all agents are
+            updated at every step, see `self.stats.summary()`.
+            With `record_names` only those variables are recorded, in `record_dtype`
+            (see CompactRecorder and recording_error()) """
+        if sim_time is None:
+            sim_time = 300 if not self.exteroceptive else 400
+        profiler = PhaseProfiler(self) if profile else None
+
+        try:
+            self.steps = int(sim_time / self.dt)
+            self.record_names = record_names
+            self.record_dtype = record_dtype
+            self.reset(self.steps, record_every, record_window)
+            self.start_stats(stats)
+            self.noise = self.new_noise()
+            self.act_time = act_time
+            self.step = 0
+            self.death_step = np.full(self.n, -1)
+            self.death_cause = np.full(self.n, None, dtype=object)
+
+            self.compile_forcing(self.steps)
+            self.run(self.steps, survival)
+        finally:
+            # the methods of the agents are restored even if the simulation failed
+            if profiler is not None:
+                self.profile = profiler.finish()
+
+        return self
+
+    def start_stats(self, stats):
+        """ start the summary statistics of the simulation (see online.py) """
+        self.stats = OnlineStats() if stats is True else stats
+        if self.stats is not None:
+            self.stats.start(self.now, self.dt)
+
+    def compile_forcing(self, steps):
+        """ forcing of the worlds of all agents for the next steps,
+            with shape (steps, distinct schedules) """
+        compiled = [schedule.compile(steps, self.dt, start=self.step)
+                    for schedule in self.schedules]
+        self.forcing = {name: np.stack([forcing[name] for forcing in compiled], axis=1)
+                        for name in compiled[0]}
+        self.forcing_start = self.step
+
+    def run(self, steps, survival=False):
+        """ simulate the steps of the started simulation of all agents
+            (see simulate() for `survival`) """
+        self.survival = survival
+        for _ in range(steps):
+            self.advance()
+            if survival and self.death_step.min() >= 0:
+                break
+
+        if survival:
+            self.recorder.mask_after(np.where(self.death_step >= 0, self.death_step, self.step))
+
+    def restore(self, agents):
+        """ continue the simulations of the agents of the batch (scalar agents
+            at the same step, e.g. restored from a checkpoint) with the batch.
+            Continue the simulation with `resume()` """
+        for name in vars(self.now):
+            setattr(self.now, name, np.array([getattr(agent.now, name) for agent in agents],
+                                             dtype=float))
+
+        self.step = agents[0].step
+        self.steps = agents[0].steps
+        self.act_time = agents[0].act_time
+        self.death_step = np.array([agent.death_step for agent in agents])
+        self.death_cause = np.array([agent.death_cause for agent in agents], dtype=object)
+        self.noise = BatchNoise.from_noises([agent.noise for agent in agents])
+
+        # nothing is recorded before the continuation
+        self.recorder = self.new_recorder(0, first_step=self.step)
+        self.stats = None
+
+    def resume(self, sim_time=None, record_every=1, record_window=None, survival=False,
+               stats=None):
+        """ continue the simulation of all agents from the current step until the time
+            `sim_time` (the end of the started simulation by default),
+            recorded starting from the current state """
+        end = self.steps if sim_time is None else int(sim_time / self.dt)
+        if end is None:
+            raise ValueError('the end of the continuation of an unbounded simulation is needed')
+
+        steps = max(end - self.step, 0)
+        self.steps = end
+        self.recorder = self.new_recorder(steps, record_every, record_window,
+                                          first_step=self.step)
+        self.start_stats(stats)
+        self.compile_forcing(steps)
+        self.run(steps, survival)
+
+        return self
+
+
+def recording_error(agent_cls, n=100, names=None, dtype=np.float32, sim_time=None, **kwargs):
+    """Error of the trajectories of `names` (COMPACT_NAMES by default) of n agents
+       recorded in `dtype` against their float64 trajectories, simulated with
+       the same seeds (0, ..., n - 1 by default): {name: {'max_abs': ..., 'max_rel': ...}}"""
+    kwargs.setdefault('seed', list(range(n)))
+    reference = BatchAgent(agent_cls, n=n, **kwargs).simulate(sim_time)
+    if names is None:
+        names = [name for name in COMPACT_NAMES if hasattr(reference.now, name)]
+    compact = BatchAgent(agent_cls, n=n, **kwargs).simulate(sim_time, record_names=names,
+                                                            record_dtype=dtype)
+
+    errors = {}
+    for name in names:
+        expected = reference.recorder.view(name)
+        error = np.abs(compact.recorder.view(name) - expected)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            relative = np.where(error > 0, error / np.abs(expected), 0)
+        errors[name] = {'max_abs': float(np.nanmax(error)), 'max_rel': float(np.nanmax(relative))}
+    return errors
@@ -0,0 +1,210 @@
+# benchmarks of the simulation: throughput (steps per second) and peak memory
+# (of building the agents and of running them) for several horizons,
+# single and batch runs, headless and plotting.
+#
+#   python benchmark.py run --out benchmark.json
+#   python benchmark.py compare baseline.json benchmark.json
+#
+# Every case runs in a fresh process, so that its peak memory is measured alone
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+import numpy as np
+
+AGENTS = ('InteroceptiveAgent', 'ExteroceptiveAgent', 'ActiveExteroceptiveAgent')
+HORIZONS = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+MODES = ('headless', 'plot', 'batch')
+
+# agents of the batch runs
+BATCH_SIZE = 100
+# batch runs only keep the last steps, all steps of 10^6 steps of 100 agents
+# would not fit into the memory
+BATCH_RECORD_WINDOW = 1000
+
+
+def peak_rss():
+    """ peak resident memory of the process in bytes """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_case(case):
+    """ run one case of the benchmark and measure it """
+    import simulation
+    from batch import BatchAgent
+
+    agent_cls = getattr(simulation, case['agent'])
+    steps, mode = case['steps'], case['mode']
+
+    # memory of the process before the agents, so that their construction is measured
+    baseline = peak_rss()
+    if mode == 'batch':
+        agent = BatchAgent(agent_cls, n=case['n'], seed=range(case['n']))
+    else:
+        agent = agent_cls(seed=0)
+    # simulation time for exactly the number of steps
+    sim_time = (steps + 0.5) * agent.dt
+
+    constructed = peak_rss()
+    start = time.perf_counter()
+    if mode == 'batch':
+        agent.simulate(sim_time, record_window=BATCH_RECORD_WINDOW)
+    else:
+        result = agent.simulate(sim_time, plot=False)
+    seconds = time.perf_counter() - start
+
+    plot_seconds = None
+    if mode == 'plot':
+        import matplotlib
+        matplotlib.use('Agg')
+        from matplotlib import pyplot as plt
+
+        start = time.perf_counter()
+        result.plot()
+        plt.gcf().canvas.draw()
+        plot_seconds = time.perf_counter() - start
+        plt.close('all')
+
+    total = seconds + (plot_seconds or 0)
+    return dict(case,
+                seconds=seconds,
+                plot_seconds=plot_seconds,
+                steps_per_sec=steps / total,
+                agent_steps_per_sec=steps * case['n'] / total,
+                # growth of the peak memory by the construction of the agents,
+                # by the simulation on top of it, and both together
+                construction_memory_mb=(constructed - baseline) / 2 ** 20,
+                run_memory_mb=(peak_rss() - constructed) / 2 ** 20,
+                peak_memory_mb=(peak_rss() - baseline) / 2 ** 20)
+
+
+def cases(agents=AGENTS, horizons=HORIZONS, modes=MODES, batch_size=BATCH_SIZE):
+    for agent in agents:
+        for mode in modes:
+            for steps in horizons:
+                yield {'name': f'{agent}/{mode}/{steps}', 'agent': agent, 'mode': mode,
+                       'steps': steps, 'n': batch_size if mode == 'batch' else 1}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(agents=AGENTS, horizons=HORIZONS, modes=MODES, batch_size=BATCH_SIZE,
+        repeat=1, verbose=True):
+    """ run the benchmark and return its results.
+        Of the repeated runs of a case the fastest one is kept """
+    results = []
+    for case in cases(agents, horizons, modes, batch_size):
+        runs = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as pool:
+                runs.append(pool.submit(run_case, case).result())
+        best = max(runs, key=lambda result: result['steps_per_sec'])
+        for memory in ('construction_memory_mb', 'run_memory_mb', 'peak_memory_mb'):
+            best[memory] = max(result[memory] for result in runs)
+        results.append(best)
+
+        if verbose:
+            print(f"{best['name']:45} {best['steps_per_sec']:12.0f} steps/s "
+                  f"{best['construction_memory_mb']:10.1f} MB built "
+                  f"{best['run_memory_mb']:10.1f} MB run", flush=True)
+
+    return {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.platform(),
+            'batch_record_window': BATCH_RECORD_WINDOW,
+        },
+        'cases': results,
+    }
+
+
+def compare(baseline, current, tolerance=0.2):
+    """ compare the results of two benchmarks case by case.
+        Returns the lines of the comparison and the names of the cases that
+        got slower or use more memory than the baseline by more than the tolerance """
+    base = {case['name']: case for case in baseline['cases']}
+
+    lines = [f"{'case':45} {'steps/s':>12} {'baseline':>12} {'ratio':>7} "
+             f"{'MB':>9} {'baseline':>9}"]
+    regressions = []
+    for case in current['cases']:
+        old = base.get(case['name'])
+        if old is None:
+            continue
+
+        speed = case['steps_per_sec'] / old['steps_per_sec']
+        # memory below a few MB is mostly noise of the allocator
+        memory = max(case['peak_memory_mb'], 4) / max(old['peak_memory_mb'], 4)
+        regressed = speed < 1 - tolerance or memory > 1 + tolerance
+        if regressed:
+            regressions.append(case['name'])
+
+        lines.append(f"{case['name']:45} {case['steps_per_sec']:12.0f} "
+                     f"{old['steps_per_sec']:12.0f} {speed:7.2f} "
+                     f"{case['peak_memory_mb']:9.1f} {old['peak_memory_mb']:9.1f}"
+                     f"{'  REGRESSION' if regressed else ''}")
+
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='benchmarks of the simulation')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmark')
+    run_parser.add_argument('--out', default='benchmark.json', help='file for the results')
+    run_parser.add_argument('--agents', nargs='+', default=AGENTS, choices=AGENTS)
+    run_parser.add_argument('--horizons', nargs='+', type=int, default=HORIZONS,
+                            help='numbers of simulated steps')
+    run_parser.add_argument('--modes', nargs='+', default=MODES, choices=MODES)
+    run_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    run_parser.add_argument('--repeat', type=int, default=1,
+                            help='runs of each case, the fastest is kept')
+
+    compare_parser = commands.add_parser('compare', help='compare results with a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current', nargs='?', default='benchmark.json')
+    compare_parser.add_argument('--tolerance', type=float, default=0.2,
+                                help='allowed relative slowdown or memory growth')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        results = run(args.agents, args.horizons, args.modes, args.batch_size, args.repeat)
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=1)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    lines, regressions = compare(baseline, current, args.tolerance)
+    print('\n'.join(lines))
+    if regressions:
+        print(f'{len(regressions)} regressions')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+# checkpoints of running simulations: a snapshot of the state of an agent
+# and its world to branch continuations from, without the recorded history
+import numpy as np
+
+
+class Checkpoint:
+    """Snapshot of a running simulation of an agent:
+       its class and parameters, the values of all its variables (world,
+       beliefs, actions), the state of its noise streams and the step cursor.
+       The recorded trajectories are not part of it.
+
+       Continuations are new agents restored from the checkpoint, e.g.
+           for step, state in agent.iter_steps(4000):
+               if step == 3000:
+                   checkpoint = agent.checkpoint()
+                   break
+           result = checkpoint.agent(aex_action_bound=0.2).resume()"""
+
+    def __init__(self, agent):
+        self.agent_cls = type(agent)
+        self.params = agent.get_params()
+        self.state = dict(vars(agent.now))
+        self.noise = agent.noise.get_state()
+
+        self.dt = agent.dt
+        self.step = agent.step
+        self.steps = agent.steps
+        self.act_time = agent.act_time
+        self.death_step = agent.death_step
+        self.death_cause = agent.death_cause
+
+    @property
+    def time(self):
+        return self.step * self.dt
+
+    def agent(self, **params):
+        """A new agent continuing the simulation from the checkpoint,
+           with the given parameters changed. With a `seed` the continuation
+           gets new noise from the seed, otherwise it continues the noise
+           of the checkpoint. Simulate it with `resume()`."""
+        agent = self.agent_cls(**dict(self.params, **params))
+        agent.restore(self, noise='seed' not in params)
+        return agent
+
+    def fork(self, n=None, **params):
+        """ n continuations of the checkpoint, each parameter is either one value
+            for all of them or a sequence with a value per continuation """
+        if n is None:
+            sizes = [len(value) for value in params.values() if np.ndim(value) == 1]
+            n = sizes[0] if sizes else 1
+
+        agents = []
+        for i in range(n):
+            agent_params = {}
+            for name, value in params.items():
+                if np.ndim(value) == 1:
+                    if len(value) != n:
+                        raise ValueError(f'{name} has {len(value)} values '
+                                         f'for {n} continuations')
+                    value = value[i]
+                agent_params[name] = value
+            agents.append(self.agent(**agent_params))
+
+        return agents
+
+    def fork_batch(self, n=None, **params):
+        """ n continuations of the checkpoint (see `fork`) simulated together
+            as a BatchAgent. Simulate them with `resume()` """
+        from batch import BatchAgent
+
+        agents = self.fork(n, **params)
+        batch = BatchAgent.from_agents(agents)
+        batch.restore(agents)
+        return batch
@@ -0,0 +1,222 @@
+# real-time control: the inference and the action of an agent run as the
+# controller of an external system. Sensations come from an asyncio queue
+# or a socket, each of them is one step of the agent, and the actions
+# are sent back as commands. The built-in world of an agent stands in
+# for the external system when there is none
+import asyncio
+import struct
+from time import perf_counter_ns
+
+import numpy as np
+
+from simulation import FORCING_CHUNK
+
+# sensations the agents take and the commands they give (those of them the agent has)
+SENSATIONS = ('sense_i', 'sense_i_d1', 'ex_sense')
+COMMANDS = ('temp_change_action', 'aex_action')
+
+
+class Controller:
+    """Inference and action of the agent (exteroception, interoception,
+       active exteroception and the update of the actions) driven
+       by external sensations instead of its world.
+
+       `step(sensation)` takes the values of `self.sensations`
+       (sense_i, sense_i_d1 and ex_sense of an ActiveExteroceptiveAgent)
+       and returns the values of `self.commands` (temp_change_action and aex_action).
+       The agent acts after `act_time` as in a simulation.
+
+       The latency of every step, from the arrival of its sensation to its commands,
+       is measured and compared to the `deadline` (in seconds); the last `window`
+       latencies are kept (see `latency_summary()`).
+
+       The sensed temperature (sense_i) stands for the temperature of the
+       controlled system: the step after which it left the viable range is
+       recorded in the agent (`agent.death_step`, `agent.death_cause`, see `dead`),
+       and with `survival=True` the runs stop at the death.
+
+       A step allocates no NumPy arrays: the sensation is written into the state
+       of the agent and the commands and the latency into preallocated arrays,
+       only the state of the previous step is copied within the agent and the values
+       are boxed as Python floats, so the controller keeps up with high rates
+       (use the Euler integrator, the exact one multiplies small matrices at every step)."""
+
+    def __init__(self, agent, act_time=50, deadline=1e-4, window=100000, survival=False):
+        self.agent = agent
+        self.deadline = deadline
+        self.window = window
+        self.survival = survival
+
+        # nothing is recorded
+        agent.start(0, act_time, record_window=0)
+        self.sensations = [name for name in SENSATIONS if hasattr(agent.now, name)]
+        self.commands = [name for name in COMMANDS if hasattr(agent.now, name)]
+        self.command = np.zeros(len(self.commands))
+
+        self.latency = np.zeros(window)
+        self.count = 0
+        self.missed = 0
+
+    def step(self, sensation, received=None):
+        """One step of inference and action for the sensation, which
+           arrived at the time `received` (perf_counter_ns(), now by default).
+           Returns the commands, the array `self.command` overwritten by the next step"""
+        if received is None:
+            received = perf_counter_ns()
+
+        agent = self.agent
+        now = agent.now
+        agent.time = agent.step * agent.dt
+        # keep the values of the previous step
+        vars(agent.prev).update(vars(now))
+
+        for name, value in zip(self.sensations, sensation):
+            setattr(now, name, float(value))
+
+        agent.active_inference()
+        agent.upd_vfe()
+        if agent.time > agent.act_time:
+            agent.upd_action()
+        else:
+            agent.upd_no_action()
+        agent.step += 1
+        agent.check_death(now.sense_i)
+
+        command = self.command
+        for i, name in enumerate(self.commands):
+            command[i] = getattr(now, name)
+
+        latency = (perf_counter_ns() - received) * 1e-9
+        self.latency[self.count % self.window] = latency
+        self.count += 1
+        if latency > self.deadline:
+            self.missed += 1
+
+        return command
+
+    @property
+    def dead(self):
+        """ whether the sensed temperature left the viable range """
+        return self.agent.death_step >= 0
+
+    def stopped(self):
+        """ whether a run stops, at the death with `survival` """
+        return self.survival and self.dead
+
+    def run(self, world, steps):
+        """ control the local world (a LocalWorld) for the steps """
+        for _ in range(steps):
+            world.act(self.step(world.sense()))
+            if self.stopped():
+                break
+
+    async def run_queue(self, sensations, commands, steps=None):
+        """Take the sensations from the asyncio queue `sensations` and put
+           the commands, as lists, into the queue `commands`.
+           Stops after `steps` steps or at the sensation None,
+           or at the death (with `survival`), after which it puts None"""
+        end = None if steps is None else self.count + steps
+        while end is None or self.count < end:
+            sensation = await sensations.get()
+            received = perf_counter_ns()
+            if sensation is None:
+                break
+            commands.put_nowait(self.step(sensation, received).tolist())
+            if self.stopped():
+                commands.put_nowait(None)
+                break
+
+    async def run_stream(self, reader, writer, steps=None):
+        """Take the sensations from the asyncio stream `reader` and write
+           the commands to the stream `writer`, both as little-endian doubles.
+           Stops after `steps` steps, when the stream ends or at the death
+           (with `survival`), closing the stream, e.g.
+               server = await asyncio.start_server(controller.run_stream, port=5000)"""
+        sensation = struct.Struct(f'<{len(self.sensations)}d')
+        command = struct.Struct(f'<{len(self.commands)}d')
+        packet = bytearray(command.size)
+
+        end = None if steps is None else self.count + steps
+        while end is None or self.count < end:
+            try:
+                data = await reader.readexactly(sensation.size)
+            except asyncio.IncompleteReadError:
+                break
+            received = perf_counter_ns()
+            command.pack_into(packet, 0, *self.step(sensation.unpack(data), received))
+            writer.write(packet)
+            await writer.drain()
+            if self.stopped():
+                break
+
+        writer.close()
+
+    def latency_summary(self):
+        """ latency of the steps (of the last `window` of them) in seconds
+            and the steps that missed the deadline """
+        latency = self.latency[:min(self.count, self.window)]
+        if not latency.size:
+            latency = np.full(1, np.nan)
+        return {
+            'steps': self.count,
+            'mean': latency.mean(),
+            'p50': np.quantile(latency, 0.5),
+            'p99': np.quantile(latency, 0.99),
+            'max': latency.max(),
+            'deadline': self.deadline,
+            'missed': self.missed,
+            'missed_fraction': self.missed / max(self.count, 1),
+            'death_step': self.agent.death_step,
+        }
+
+
+class LocalWorld:
+    """The built-in world of the agent as a stand-in for the system
+       a controller controls: the world is simulated with the commands
+       of the controller and sensed as by the agent (with the noise of its seed).
+
+       A controller of an agent with the same seed controlling the local
+       world reproduces the simulation of the agent."""
+
+    def __init__(self, agent, act_time=50):
+        self.agent = agent
+        agent.start(None, act_time, record_window=0)
+        self.sensations = [name for name in SENSATIONS if hasattr(agent.now, name)]
+        self.commands = [name for name in COMMANDS if hasattr(agent.now, name)]
+        self.sensation = np.zeros(len(self.sensations))
+
+    def sense(self):
+        """ simulate the world of this step; returns the sensations,
+            the array `self.sensation` overwritten by the next step """
+        agent = self.agent
+        if agent.step == agent.forcing_end:
+            agent.compile_forcing(FORCING_CHUNK)
+
+        agent.time = agent.step * agent.dt
+        vars(agent.prev).update(vars(agent.now))
+        agent.simulate_world()
+
+        sensation = self.sensation
+        for i, name in enumerate(self.sensations):
+            sensation[i] = getattr(agent.now, name)
+        return sensation
+
+    def act(self, command):
+        """ apply the commands of the controller and go to the next step """
+        now = self.agent.now
+        for name, value in zip(self.commands, command):
+            setattr(now, name, float(value))
+        self.agent.step += 1
+        self.agent.check_death()
+
+    async def feed(self, sensations, commands, steps):
+        """ closed loop with a controller over asyncio queues (see Controller.run_queue):
+            put the sensations of every step and wait for its commands,
+            until the controller stops (its command None) """
+        for _ in range(steps):
+            sensations.put_nowait(self.sense().tolist())
+            command = await commands.get()
+            if command is None:
+                return
+            self.act(command)
+        sensations.put_nowait(None)
@@ -0,0 +1,236 @@
+# equivalence of the engines with their references: the scalar agents
+# with the update equations of the original agents (see original.py), the fast
+# engines (batches, the exact integrator, float32 recording, fast-forward, ...)
+# with the scalar agents. The reference and the candidate engine are simulated
+# with the same seeds, and so the same noise streams, every recorded trajectory
+# is compared step by step and the first divergence, the largest error
+# of every variable and the speedup are reported.
+#
+#   python equivalence.py --engines scalar batch exact fast_forward --seeds 0 1 2
+#
+# Exits with 1 if an engine diverged beyond its tolerances
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import original
+import simulation
+from batch import BatchAgent, COMPACT_NAMES
+
+AGENTS = ('InteroceptiveAgent', 'ExteroceptiveAgent', 'ActiveExteroceptiveAgent')
+
+
+def original_engine(agent_cls, seeds, sim_time, params):
+    """ the update equations of the original agents (see original.py), one run per seed """
+    original_cls = getattr(original, agent_cls.__name__)
+    return [original_cls(seed=seed, **params).simulate(sim_time).trajectories()
+            for seed in seeds]
+
+
+def reference_engine(agent_cls, seeds, sim_time, params):
+    """ the per-step methods of the scalar agents, one run per seed """
+    return [agent_cls(seed=seed, **params).simulate(sim_time, plot=False).trajectories()
+            for seed in seeds]
+
+
+def batch_engine(agent_cls, seeds, sim_time, params):
+    """ all seeds in one batch (see batch.py) """
+    batch = BatchAgent(agent_cls, n=len(seeds), seed=list(seeds), **params)
+    batch.simulate(sim_time)
+    return [{name: batch.recorder.view(name)[:, i] for name in batch.recorder.names}
+            for i in range(len(seeds))]
+
+
+def float32_engine(agent_cls, seeds, sim_time, params):
+    """ a batch recording COMPACT_NAMES in float32 """
+    batch = BatchAgent(agent_cls, n=len(seeds), seed=list(seeds), **params)
+    names = [name for name in COMPACT_NAMES if hasattr(batch.now, name)]
+    batch.simulate(sim_time, record_names=names)
+    return [{name: batch.recorder.view(name)[:, i] for name in names}
+            for i in range(len(seeds))]
+
+
+def exact_engine(agent_cls, seeds, sim_time, params):
+    """ the scalar agents with the exact integrator (see exact.py) """
+    return reference_engine(agent_cls, seeds, sim_time, dict(params, integrator='exact'))
+
+
+def fast_forward_engine(agent_cls, seeds, sim_time, params):
+    """ the scalar agents skipping the quiet stretches (see fastforward.py) """
+    return [agent_cls(seed=seed, **params).simulate(sim_time, plot=False, fast_forward=True)
+            .trajectories() for seed in seeds]
+
+
+# references the engines are compared to
+REFERENCES = {
+    'original': original_engine,
+    'scalar': reference_engine,
+}
+
+# engines, their reference, the parameters of the reference agents
+# and their default tolerances (relative, absolute) of every variable:
+# the scalar agents do the operations of the original ones (up to the rounding
+# of the compiled light change), batches do the same operations as the scalar agents
+# (up to the rounding of the exact transitions) and float32 rounds the recorded values,
+# while the exact integrator (compared to the Euler one) and the fast-forward
+# are approximations within the noise, whose divergence is reported
+ENGINES = {
+    'scalar': (reference_engine, 'original', {}, (1e-9, 1e-9)),
+    'batch': (batch_engine, 'scalar', {}, (1e-9, 1e-9)),
+    'batch_exact': (batch_engine, 'scalar', {'integrator': 'exact'}, (1e-9, 1e-9)),
+    'float32': (float32_engine, 'scalar', {}, (1e-6, 1e-6)),
+    'exact': (exact_engine, 'scalar', {}, (0.05, 1.0)),
+    'fast_forward': (fast_forward_engine, 'scalar', {}, (0, 1.0)),
+}
+# engines that have to reproduce their reference
+EQUIVALENT_ENGINES = ('scalar', 'batch', 'batch_exact', 'float32')
+
+
+def first_divergence(reference, candidate, from_start=(), tolerance=(1e-9, 1e-9),
+                     tolerances=None):
+    """First divergence of the trajectories of the candidate ({name: values})
+       from the reference in any of their common variables:
+       {'step', 'variable', 'magnitude', 'reference', 'candidate'} or None.
+       `tolerance` (relative, absolute) holds for all variables
+       except those in `tolerances` ({name: (relative, absolute)}).
+       The step is the number of simulated steps, 0 for the initial values
+       of the variables `from_start`. Also returns the largest error of every variable"""
+    tolerances = tolerances or {}
+    divergence = None
+    errors = {}
+    for name, expected in reference.items():
+        if name not in candidate:
+            continue
+        values = np.asarray(candidate[name], dtype=float)
+        relative, absolute = tolerances.get(name, tolerance)
+
+        error = np.abs(values - expected)
+        # NaN where both are NaN is no error
+        error = np.where(np.isnan(values) & np.isnan(expected), 0, error)
+        error = np.where(np.isnan(error), np.inf, error)
+        errors[name] = float(error.max()) if error.size else 0.0
+
+        diverged = np.flatnonzero(error > absolute + relative * np.abs(np.nan_to_num(expected)))
+        if not diverged.size:
+            continue
+        row = int(diverged[0])
+        step = row if name in from_start else row + 1
+        if divergence is None or step < divergence['step']:
+            divergence = {'step': step, 'variable': name, 'magnitude': float(error[row]),
+                          'reference': float(expected[row]), 'candidate': float(values[row])}
+    return divergence, errors
+
+
+def check(agent_cls, engine, seeds=(0,), sim_time=None, tolerance=None, tolerances=None,
+          reference=None, **params):
+    """Simulate the agents of `agent_cls` with the reference and the candidate `engine`
+       (a name in ENGINES or a function like them, taking the class of the agents,
+       the seeds, the simulated time and the parameters and returning
+       the trajectories of every seed) with the seeds and compare them.
+       The reference is a name in REFERENCES, that of the engine by default
+       ('scalar' for functions).
+       Returns the report of the engine: the first divergence over all seeds
+       (with its seed), the tolerance and the largest error of every variable,
+       the time of the reference and of the candidate and the speedup"""
+    if isinstance(engine, str):
+        name = engine
+        engine, default_reference, reference_params, default = ENGINES[engine]
+    else:
+        name, default_reference, reference_params, default = \
+            engine.__name__, 'scalar', {}, (1e-9, 1e-9)
+    reference_name = reference or default_reference
+    tolerance = tolerance or default
+    tolerances = tolerances or {}
+    params = dict(params, **reference_params)
+    if sim_time is None:
+        sim_time = 300 if not issubclass(agent_cls, simulation.ExteroceptiveAgent) else 400
+
+    start = time.perf_counter()
+    reference = REFERENCES[reference_name](agent_cls, seeds, sim_time, params)
+    reference_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    candidate = engine(agent_cls, seeds, sim_time, params)
+    candidate_seconds = time.perf_counter() - start
+
+    # variables recorded with their initial values
+    from_start = agent_cls(**params).from_start
+
+    divergence = None
+    errors = {}
+    for seed, expected, values in zip(seeds, reference, candidate):
+        first, seed_errors = first_divergence(expected, values, from_start, tolerance,
+                                              tolerances)
+        if first is not None and (divergence is None or first['step'] < divergence['step']):
+            divergence = dict(first, seed=seed)
+        for variable, error in seed_errors.items():
+            errors[variable] = max(errors.get(variable, 0.0), error)
+
+    return {
+        'agent': agent_cls.__name__,
+        'engine': name,
+        'reference': reference_name,
+        'seeds': list(seeds),
+        'tolerance': tolerance,
+        'tolerances': {variable: tolerances.get(variable, tolerance) for variable in errors},
+        'equivalent': divergence is None,
+        'divergence': divergence,
+        'max_errors': errors,
+        'reference_seconds': reference_seconds,
+        'candidate_seconds': candidate_seconds,
+        'speedup': reference_seconds / candidate_seconds,
+    }
+
+
+def report_line(report):
+    divergence = report['divergence']
+    if divergence is None:
+        outcome = 'equivalent'
+    else:
+        outcome = (f"diverged at step {divergence['step']} in {divergence['variable']} "
+                   f"by {divergence['magnitude']:.3g} (seed {divergence['seed']})")
+    return (f"{report['agent']:26} {report['engine']:13} {report['reference']:9} "
+            f"{report['speedup']:7.2f}x  {outcome}")
+
+
+def variable_lines(report):
+    """ the tolerance and the largest error of every compared variable """
+    lines = []
+    for variable, error in sorted(report['max_errors'].items()):
+        relative, absolute = report['tolerances'][variable]
+        lines.append(f"    {variable:28} rtol {relative:<8.3g} atol {absolute:<8.3g} "
+                     f"max error {error:.3g}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='equivalence of the engines '
+                                                 'with their references')
+    parser.add_argument('--agents', nargs='+', default=AGENTS, choices=AGENTS)
+    parser.add_argument('--engines', nargs='+', default=EQUIVALENT_ENGINES,
+                        choices=list(ENGINES))
+    parser.add_argument('--seeds', nargs='+', type=int, default=[0, 1, 2, 3])
+    parser.add_argument('--sim-time', type=float, default=None)
+    parser.add_argument('--reference', choices=list(REFERENCES), default=None,
+                        help='reference of all engines (that of every engine by default)')
+    parser.add_argument('--variables', action='store_true',
+                        help='report the tolerance and the largest error of every variable '
+                             '(always for the engines that diverged)')
+    args = parser.parse_args(argv)
+
+    diverged = False
+    for agent in args.agents:
+        for engine in args.engines:
+            report = check(getattr(simulation, agent), engine, args.seeds, args.sim_time,
+                           reference=args.reference)
+            print(report_line(report), flush=True)
+            if args.variables or not report['equivalent']:
+                print('\n'.join(variable_lines(report)), flush=True)
+            diverged |= not report['equivalent']
+    return 1 if diverged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
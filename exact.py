@@ -0,0 +1,100 @@
+# exact discretization of the linear parts of the agents and their world
+# between two time steps the inputs of a linear system x' = A x + B u + w
+# are held constant, so the system can be integrated exactly
+# with the matrix exponential, for any dt
+from functools import lru_cache
+
+import numpy as np
+from scipy.linalg import expm
+
+# intensity of the white noise of the temperature change,
+# giving the same noise of the temperature as the Euler integration at dt = 0.1
+TEMP_CHANGE_NOISE_INTENSITY = 1e-5
+
+
+def discretize(A, B, dt, Q=None):
+    """Exact discrete-time transition of x' = A x + B u + w for inputs u held over dt:
+       x[k + 1] = Ad x[k] + Bd u[k] + noise with the covariance Qd,
+       where w is white noise with the covariance (intensity) Q"""
+    n, m = B.shape
+
+    # expm([[A, B], [0, 0]] * dt) = [[Ad, Bd], [0, I]]
+    M = np.zeros((n + m, n + m))
+    M[:n, :n] = A
+    M[:n, n:] = B
+    E = expm(M * dt)
+    Ad, Bd = E[:n, :n], E[:n, n:]
+
+    # noise covariance by the method of Van Loan
+    Qd = np.zeros((n, n))
+    if Q is not None:
+        F = np.zeros((2 * n, 2 * n))
+        F[:n, :n] = -A
+        F[:n, n:] = Q
+        F[n:, n:] = A.T
+        G = expm(F * dt)
+        Qd = G[n:, n:].T @ G[:n, n:]
+
+    for matrix in (Ad, Bd, Qd):
+        matrix.flags.writeable = False
+
+    return Ad, Bd, Qd
+
+
+@lru_cache(maxsize=None)
+def interoceptive_transition(dt, learn_r, i_s_z_0, i_s_z_1, i_s_w_0, i_s_w_1):
+    """Recognition dynamics of the interoceptive layer
+       for x = (mu_i, mu_i_d1, mu_i_d2) and u = (sense_i, sense_i_d1, temp_desire),
+       as in InteroceptiveAgent.upd_mu_i, upd_mu_i_d1 and upd_mu_i_d2"""
+    lr = learn_r
+    A = np.array([
+        [-lr / i_s_z_0 - lr / i_s_w_0, 1 - lr / i_s_w_0, 0],
+        [-lr / i_s_w_0, -lr / i_s_z_1 - lr / i_s_w_0 - lr / i_s_w_1, 1 - lr / i_s_w_1],
+        [0, -lr / i_s_w_1, -lr / i_s_w_1],
+    ])
+    B = np.array([
+        [lr / i_s_z_0, 0, lr / i_s_w_0],
+        [0, lr / i_s_z_1, lr / i_s_w_0],
+        [0, 0, 0],
+    ])
+    return discretize(A, B, dt)[:2]
+
+
+@lru_cache(maxsize=None)
+def exteroceptive_transition(dt, learn_r_ex, ex_s_z_0):
+    """Recognition dynamics of the exteroceptive layer
+       for x = (ex_mu,) and u = (predicted light change, 1), as in ExteroceptiveAgent.upd_ex_mu"""
+    lr = learn_r_ex
+    A = np.array([[-0.01 * lr / ex_s_z_0]])
+    B = np.array([[-0.1 * lr / ex_s_z_0, 0.3 * lr / ex_s_z_0]])
+    return discretize(A, B, dt)[:2]
+
+
+@lru_cache(maxsize=None)
+def active_exteroceptive_transition(dt, learn_r_ex, aex_s_z_0, aex_s_w_0):
+    """Recognition dynamics of the active exteroceptive layer
+       for x = (aex_mu, aex_mu_d1) and u = (aex_action, temperature change to explain),
+       as in ActiveExteroceptiveAgent.upd_aex_mu and upd_aex_mu_d1"""
+    lr = learn_r_ex
+    A = np.array([
+        [-lr / aex_s_z_0 - lr / aex_s_w_0, 1 - lr / aex_s_w_0],
+        [-lr / aex_s_w_0, -lr / aex_s_w_0],
+    ])
+    B = np.array([
+        [-lr / aex_s_z_0, lr / aex_s_w_0],
+        [0, lr / aex_s_w_0],
+    ])
+    return discretize(A, B, dt)[:2]
+
+
+@lru_cache(maxsize=None)
+def world_transition(dt):
+    """Temperature of the agent in its world
+       for x = (temp_change_environment, temp) and u = (velocity, temp_change_action),
+       with white noise of the temperature change, as in InteroceptiveAgent.upd_temp_change
+       and upd_temp. Returns the transition and the standard deviation of the noise of the temperature"""
+    A = np.array([[0, 0], [1, 0]])
+    B = np.array([[1, 0], [0, 1]])
+    Q = np.diag([0, TEMP_CHANGE_NOISE_INTENSITY])
+    Ad, Bd, Qd = discretize(A, B, dt, Q)
+    return Ad, Bd, np.sqrt(Qd[1, 1])
@@ -0,0 +1,183 @@
+# fast-forward of quiet stretches of a simulation: while the forcing of
+# the world is constant the beliefs, errors and actions settle to the
+# equilibrium of their linear dynamics, around which only the noise moves
+# them. Once they have settled, the steps until the next event of the world
+# are not simulated but filled with the equilibrium
+import numpy as np
+
+# recognition dynamics of the layers (the exact transitions of the agents, see exact.py):
+# their beliefs and their inputs from the mean values of the variables
+LAYERS = {
+    'interoception': (('mu_i', 'mu_i_d1', 'mu_i_d2'),
+                      lambda mean: (mean['sense_i'], mean['sense_i_d1'], mean['temp_desire'])),
+    'exteroception': (('ex_mu',),
+                      lambda mean: (mean['ex_sense'] - mean.get('aex_action', 0), 1)),
+    'active_exteroception': (('aex_mu', 'aex_mu_d1'),
+                             lambda mean: (mean['aex_action'],
+                                           mean['sense_i_d1'] - mean['temp_change_action'])),
+}
+
+
+def fixed_point(Ad, Bd, u):
+    """ x = Ad x + Bd u, the equilibrium of the linear dynamics for constant inputs
+        (the same for the exact and the Euler transitions) """
+    return np.linalg.solve(np.eye(len(Ad)) - Ad, Bd @ u)
+
+
+def equilibrium(agent, mean):
+    """Set the state of the agent to the equilibrium for the mean values
+       of its variables `mean` ({name: value}): the world and the actions
+       keep their means, the beliefs of every layer are at the fixed point
+       of its dynamics for the mean inputs and the errors are those
+       of the beliefs, while the free energy keeps its mean"""
+    now = agent.now
+    vars(now).update(mean)
+    model = getattr(agent, 'model', None)
+    if model is not None:
+        # the layers of a hierarchy (see hierarchy.py)
+        model.x[...] = model.equilibrium([mean[name] for name in agent.sense_names])
+    else:
+        for layer, (Ad, Bd, *_) in agent.exact_transitions().items():
+            if layer in LAYERS:
+                names, inputs = LAYERS[layer]
+                vars(now).update(zip(names, fixed_point(Ad, Bd, inputs(mean)).tolist()))
+
+    # errors and the prior passed down the layers of the beliefs,
+    # which one more update leaves (up to rounding) at their fixed points
+    vars(agent.prev).update(vars(now))
+    agent.active_inference()
+    agent.upd_vfe()
+    # the free energy keeps its mean, which unlike the mean errors
+    # includes the noise around the equilibrium
+    vars(now).update((name, value) for name, value in mean.items() if name.startswith('vfe'))
+    vars(agent.prev).update(vars(now))
+
+
+class FastForward:
+    """Fast-forward of a simulation to the next event of its world,
+       e.g. agent.simulate(fast_forward=True)
+       or agent.simulate(fast_forward=FastForward(tol=0.02, window=400)).
+
+       The agent is considered settled when the means of its prediction errors,
+       beliefs, temperature and temperature change of the environment
+       over the two halves of the last `window` steps (since the
+       last event) differ by less than `tol`. They are read from the recorded
+       trajectories when those hold every step of the window, so a step costs
+       almost nothing; otherwise the variables are copied into a ring of the
+       window at every step. The steps until the next event (a change of
+       the forcing, the start of the action or the end of the simulation),
+       if at least `min_skip` of them, are then skipped: the agent jumps to the
+       equilibrium of the means (see equilibrium()), which is recorded for all
+       of them. The noise around it is not simulated, and the skipped steps
+       (first, end) are listed in `skipped` and in `result.compressed`.
+
+       Worlds over depth (a field) have no events and are never fast-forwarded.
+       Only long quiet runs get faster (e.g. 4 - 10 times for sim_time=3000),
+       the default scenario of 300 time units has no stretch to skip."""
+
+    def __init__(self, tol=0.05, window=200, min_skip=100):
+        self.tol = tol
+        self.window = window
+        self.min_skip = min_skip
+
+    def start(self, agent):
+        """ start watching the variables of the agent from its current step """
+        self.names = list(vars(agent.now))
+        # the prediction errors and the beliefs, which settle with the agent,
+        # and the temperature and its change by the environment, which drift
+        # under a ramp of the forcing or once the action saturates
+        self.watched = [i for i, name in enumerate(self.names)
+                        if '_e_' in name or 'mu' in name.split('_')
+                        or name in ('temp', 'temp_change_environment')]
+        # the last window is read from the recorder if it records every step
+        # of it, otherwise from a ring of the values of the last window
+        recorder = agent.recorder
+        self.recorded = recorder.names == self.names and recorder.every == 1 and \
+            (recorder.window is None or recorder.window >= self.window)
+        self.values = None if self.recorded else np.empty((self.window, len(self.names)))
+        # steps watched since the last event or jump
+        self.count = 0
+        self.next = self.next_event(agent)
+        self.skipped = []
+        return self
+
+    def next_event(self, agent):
+        """ first step from the current one at which the world
+            or the agent changes (the end of the compiled forcing at the latest) """
+        step = agent.step
+        if agent.field is not None:
+            return step
+
+        start = step - agent.forcing_start
+        forcing = agent.forcing
+        events = ~np.isnan(forcing['temp_change'][start:]) | \
+            (forcing['light_change'][start:] != 0)
+        current = forcing['current']
+        events[1:] |= current[start + 1:] != current[start:-1]
+        if start > 0:
+            events[0] |= current[start] != current[start - 1]
+
+        event = np.flatnonzero(events)
+        next = step + int(event[0]) if event.size else agent.forcing_end
+
+        # the action starts at the first step after act_time
+        act_step = int(agent.act_time / agent.dt)
+        while act_step * agent.dt <= agent.act_time:
+            act_step += 1
+        if step <= act_step:
+            next = min(next, act_step)
+        return next
+
+    def update(self, agent, end):
+        """ watch the variables after a step and fast-forward
+            the agent (to the step `end` at the latest) once they settled """
+        if agent.step > self.next:
+            # an event happened at the last step
+            self.count = 0
+            self.next = self.next_event(agent)
+
+        if not self.recorded:
+            self.values[self.count % self.window] = list(vars(agent.now).values())
+        self.count += 1
+        # checked every half window
+        half = self.window // 2
+        if self.count < self.window or self.count % half:
+            return
+
+        stop = min(self.next, end, agent.forcing_end)
+        if stop - agent.step < self.min_skip:
+            return
+
+        watched = self.last_window(agent, self.watched)
+        first, second = watched[:half].mean(axis=0), watched[half:].mean(axis=0)
+        if np.all(np.abs(second - first) < self.tol):
+            mean = self.last_window(agent).mean(axis=0)
+            self.jump(agent, stop, dict(zip(self.names, mean.tolist())))
+
+    def last_window(self, agent, columns=slice(None)):
+        """ values of the variables (all, or those of the `columns`)
+            at the last `window` steps, in their order """
+        if not self.recorded:
+            # the ring holds the last window in order after a multiple of the window
+            return np.roll(self.values[:, columns], -(self.count % self.window), axis=0)
+
+        recorder = agent.recorder
+        rows = recorder.count - self.window + np.arange(self.window)
+        if recorder.window is not None:
+            rows %= recorder.window
+        return recorder.data[rows + 1][:, columns]
+
+    def jump(self, agent, stop, mean):
+        """ fill the steps until `stop` with the equilibrium of the mean values """
+        start = agent.step
+        equilibrium(agent, mean)
+
+        steps = stop - start
+        agent.recorder.fill(agent.now, steps)
+        if agent.stats is not None:
+            for _ in range(steps):
+                agent.stats.update(agent.now)
+
+        agent.step = stop
+        self.skipped.append((start, stop))
+        self.count = 0
@@ -0,0 +1,311 @@
+# hierarchical generative models in matrix form: every layer holds its beliefs
+# in generalized coordinates (mu, mu', mu'', ...) of any order, predicts its
+# sensations through a gain and an offset and its motion through a flow towards
+# the prior set by the layer above. The prediction errors of all layers are linear
+# in the beliefs and the sensations, so the whole hierarchy is updated with
+# one matrix-vector product per step, whatever the number of layers
+import numpy as np
+from scipy import sparse as sp
+
+from exact import discretize
+from simulation import ExteroceptiveAgent
+
+
+class Layer:
+    """Layer of a hierarchy with beliefs of `order` generalized coordinates.
+
+       The sensations of the layer, `senses` (names of variables of the agent,
+       one per order from the lowest), are predicted as `gain` * mu + `offset`
+       (the offset only for the lowest order), e.g. the light change sensed
+       by the exteroceptive layer as 0.1 * (-ex_mu + 30).
+       The motion of the beliefs is predicted by the flow
+       mu^(k+1) = -flow * (mu^(k) - v^(k)) towards the prior v, the beliefs of
+       the layer above, or `prior` for the top layer.
+       `s_z` and `s_w` are the variances (one or one per order) of the errors
+       of the sensations and of the motion, `learn_r` the learning rate
+       and `mu` the initial beliefs (one or one per order).
+
+       The variables of the layer are named `mu_name` (mu_<name> by default) with
+       _d1, _d2, ... for higher orders, <name>_e_z_<k>, <name>_e_w_<k> for the errors
+       and vfe_<name> for its free energy, as in the agents."""
+
+    def __init__(self, name, order=1, senses=(), gain=1.0, offset=0.0, flow=1.0,
+                 s_z=0.1, s_w=0.1, learn_r=0.1, prior=0.0, mu=0.0, mu_name=None):
+        if len(senses) > order:
+            raise ValueError(f'layer {name} senses {len(senses)} orders of {order}')
+
+        self.name = name
+        self.order = order
+        self.senses = tuple(senses)
+        self.gain = gain
+        self.offset = offset
+        self.flow = flow
+        self.s_z = np.broadcast_to(np.asarray(s_z, dtype=float), len(self.senses))
+        self.s_w = np.broadcast_to(np.asarray(s_w, dtype=float), order - 1)
+        self.learn_r = learn_r
+        self.prior = prior
+        self.mu = np.broadcast_to(np.asarray(mu, dtype=float), order)
+        self.mu_name = mu_name or f'mu_{name}'
+
+    def belief_names(self):
+        return [self.mu_name] + [f'{self.mu_name}_d{k}' for k in range(1, self.order)]
+
+    def error_names(self):
+        return [f'{self.name}_e_z_{k}' for k in range(len(self.senses))] + \
+            [f'{self.name}_e_w_{k}' for k in range(self.order - 1)]
+
+
+class Hierarchy:
+    """Layers (from the bottom to the top) updated together, each layer
+       setting the prior of the layer below.
+
+       All beliefs form one vector x and the sensations, with a constant 1,
+       the inputs u. The errors are e = E x + G u and the free energy is
+       F = 1/2 e' P e with the precisions P. The beliefs follow
+       x' = D x - learn_r dF/dx, with the shift operator D moving every order
+       up by one, which is linear: x' = A x + B u. It is integrated over a step
+       with `integrator` 'euler' or 'exact' (see exact.py) for x(t + dt) = Ad x + Bd u.
+
+       A step computes the errors, the priors of the layers and the new beliefs
+       with one product of a matrix and the vector (x, u), or with a matrix
+       (x, u) of the vectors of many agents. With `sparse=True` the matrix is
+       sparse, for deep hierarchies of mostly unconnected layers.
+
+       With `bottom_up=False` a layer is moved by its own errors only,
+       not by the errors of the layer below about the prior it sets,
+       as in the agents of simulation.py."""
+
+    def __init__(self, layers, dt=0.1, integrator='euler', bottom_up=True, sparse=False):
+        if integrator not in ('euler', 'exact'):
+            raise ValueError(f"unknown integrator '{integrator}', use 'euler' or 'exact'")
+
+        self.layers = list(layers)
+        self.dt = dt
+        self.integrator = integrator
+
+        # positions of the beliefs of each layer in x, of its sensations in u
+        # and of its errors in e
+        self.beliefs, self.sensations, self.errors_of = {}, {}, {}
+        n_x = n_u = n_e = 0
+        for layer in self.layers:
+            self.beliefs[layer.name] = slice(n_x, n_x + layer.order)
+            self.sensations[layer.name] = slice(n_u, n_u + len(layer.senses))
+            self.errors_of[layer.name] = slice(n_e, n_e + len(layer.senses) + layer.order - 1)
+            n_x += layer.order
+            n_u += len(layer.senses)
+            n_e += len(layer.senses) + layer.order - 1
+        # the last input is the constant 1
+        n_u += 1
+        self.n_x, self.n_u, self.n_e = n_x, n_u, n_e
+        one = n_u - 1
+
+        E = np.zeros((n_e, n_x))
+        G = np.zeros((n_e, n_u))
+        # prior (lowest order) of every layer
+        V = np.zeros((len(self.layers), n_x + n_u))
+        precision = np.zeros(n_e)
+        owner = np.zeros(n_e, dtype=int)
+        D = np.zeros((n_x, n_x))
+        learn_r = np.zeros(n_x)
+
+        for index, layer in enumerate(self.layers):
+            x = self.beliefs[layer.name].start
+            u = self.sensations[layer.name].start
+            row = self.errors_of[layer.name].start
+            above = self.layers[index + 1] if index + 1 < len(self.layers) else None
+
+            # errors of the sensations: y^(k) - gain * mu^(k) - offset
+            for k in range(len(layer.senses)):
+                E[row, x + k] = -layer.gain
+                G[row, u + k] = 1
+                if k == 0:
+                    G[row, one] = -layer.offset
+                precision[row] = 1 / layer.s_z[k]
+                row += 1
+
+            # errors of the motion: mu^(k+1) + flow * (mu^(k) - v^(k))
+            for k in range(layer.order - 1):
+                E[row, x + k + 1] = 1
+                E[row, x + k] = layer.flow
+                if above is not None:
+                    if k < above.order:
+                        E[row, self.beliefs[above.name].start + k] = -layer.flow
+                elif k == 0:
+                    G[row, one] = -layer.flow * layer.prior
+                precision[row] = 1 / layer.s_w[k]
+                row += 1
+
+            if above is not None:
+                V[index, self.beliefs[above.name].start] = 1
+            else:
+                V[index, n_x + one] = layer.prior
+
+            owner[self.errors_of[layer.name]] = index
+            for k in range(layer.order - 1):
+                D[x + k, x + k + 1] = 1
+            learn_r[self.beliefs[layer.name]] = layer.learn_r
+
+        # gradient of the free energy, with the errors of each layer
+        # moving only its own beliefs without bottom-up messages
+        J = E
+        if not bottom_up:
+            layer_of = np.repeat(np.arange(len(self.layers)),
+                                 [layer.order for layer in self.layers])
+            J = np.where(owner[:, None] == layer_of[None, :], E, 0)
+        A = D - learn_r[:, None] * (J.T * precision) @ E
+        B = -learn_r[:, None] * (J.T * precision) @ G
+
+        if integrator == 'exact':
+            Ad, Bd = discretize(A, B, dt)[:2]
+        else:
+            Ad, Bd = np.eye(n_x) + A * dt, B * dt
+
+        self.E, self.G, self.A, self.B = E, G, A, B
+        self.Ad, self.Bd = Ad, Bd
+        self.precision = precision
+        # errors, priors and the new beliefs from (x, u) at once
+        matrix = np.block([[E, G], [V], [Ad, Bd]])
+        self.matrix = sp.csr_matrix(matrix) if sparse else matrix
+
+        # free energy of each layer from the squared errors
+        self.vfe_matrix = np.zeros((len(self.layers), n_e))
+        self.vfe_matrix[owner, np.arange(n_e)] = 0.5 * precision
+
+        self.reset()
+
+    def reset(self, n=None):
+        """ initial beliefs, of n agents if given """
+        shape = (self.n_x + self.n_u,) if n is None else (self.n_x + self.n_u, n)
+        self.state = np.zeros(shape)
+        for layer in self.layers:
+            mu = layer.mu if n is None else layer.mu[:, None]
+            self.state[self.beliefs[layer.name]] = mu
+        self.state[-1] = 1
+        self.x = self.state[:self.n_x]
+        self.u = self.state[self.n_x:]
+
+        self.errors = np.zeros((self.n_e,) + shape[1:])
+        self.priors = np.zeros((len(self.layers),) + shape[1:])
+        self.vfe = np.zeros((len(self.layers),) + shape[1:])
+
+    def step(self, sensations=None):
+        """One step of all layers for the sensations (all of them
+           in the order of the layers, as `self.u` without the last input),
+           or for the sensations already set in `self.u`.
+           The errors and the priors are those of the beliefs before the step"""
+        if sensations is not None:
+            self.u[:-1] = sensations
+
+        out = self.matrix @ self.state
+        n_e, n_p = self.n_e, len(self.layers)
+        self.errors = out[:n_e]
+        self.priors = out[n_e:n_e + n_p]
+        self.x[...] = out[n_e + n_p:]
+        self.vfe = self.vfe_matrix @ (self.errors * self.errors)
+        return self.x
+
+    def equilibrium(self, sensations):
+        """ beliefs at the fixed point of their dynamics for constant sensations,
+            the closest one to the current beliefs where it is not unique
+            (e.g. of a layer without sensations and motion) """
+        u = np.append(sensations, 1)
+        x = self.x
+        step = np.linalg.lstsq(np.eye(self.n_x) - self.Ad, self.Ad @ x + self.Bd @ u - x,
+                               rcond=None)[0]
+        return x + step
+
+    def mu(self, name):
+        """ beliefs of the layer, from the lowest order """
+        return self.x[self.beliefs[name]]
+
+
+def agent_layers(agent):
+    """ layers of the generative model of an interoceptive
+        or exteroceptive agent with its parameters """
+    layers = [Layer('i', order=3, senses=('sense_i', 'sense_i_d1'),
+                    s_z=(agent.i_s_z_0, agent.i_s_z_1), s_w=(agent.i_s_w_0, agent.i_s_w_1),
+                    learn_r=agent.learn_r, prior=agent.temp_viable_mean)]
+    if isinstance(agent, ExteroceptiveAgent):
+        # light change sensed as 0.1 * (-ex_mu + 30)
+        layers.append(Layer('ex', order=1, senses=('ex_sense',), gain=-0.1, offset=3,
+                            s_z=agent.ex_s_z_0, learn_r=agent.learn_r_ex, mu_name='ex_mu'))
+    return layers
+
+
+class LayeredAgent(ExteroceptiveAgent):
+    """Exteroceptive agent whose generative model is a Hierarchy of `layers`
+       (those of the exteroceptive agent by default, see agent_layers),
+       of any depth, updated in matrix form. The bottom layer 'i' senses
+       the temperature and sets the action as in the other agents.
+
+       All layers are updated at once from the beliefs of the previous step,
+       while the agents of simulation.py update the layers one after the other,
+       so the beliefs differ from them by the order of dt."""
+
+    def __init__(self, layers=None, bottom_up=False, sparse=False,
+                 ex_s_z_0=0.01, learn_r=0.1, **kwargs):
+        self.layers = layers
+        self.bottom_up = bottom_up
+        self.sparse = sparse
+        # the parameters of the exteroceptive layer are set before the constructor
+        # of the agent, whose reset builds the model (as ExteroceptiveAgent sets them)
+        self.ex_s_z_0 = ex_s_z_0
+        self.learn_r_ex = learn_r
+        super().__init__(ex_s_z_0=ex_s_z_0, learn_r=learn_r, **kwargs)
+
+    def hierarchy(self):
+        return Hierarchy(self.layers or agent_layers(self), self.dt, self.integrator,
+                         self.bottom_up, self.sparse)
+
+    def init_state(self):
+        super().init_state()
+        # a new model with the initial beliefs at every reset
+        hierarchy = self.hierarchy()
+        self.model = hierarchy
+
+        # names of the variables of the errors, the priors and the beliefs
+        # in the order of the output of a step, and of the free energy
+        self.output_names = [name for layer in hierarchy.layers for name in layer.error_names()]
+        self.output_names += [f'{layer.name}_prior' for layer in hierarchy.layers]
+        self.output_names += [name for layer in hierarchy.layers for name in layer.belief_names()]
+        self.vfe_names = [f'vfe_{layer.name}' for layer in hierarchy.layers]
+
+        for layer in hierarchy.layers:
+            for name, mu in zip(layer.belief_names(), layer.mu):
+                self.track(name, float(mu))
+        for name in self.output_names + self.vfe_names:
+            if not hasattr(self.now, name):
+                self.track(name)
+
+        self.sense_names = [name for layer in hierarchy.layers for name in layer.senses]
+
+    def active_inference(self):
+        now = self.now
+        model = self.model
+        model.u[:-1] = [getattr(now, name) for name in self.sense_names]
+        model.step()
+
+        # one update of the variables of all layers
+        state = vars(now)
+        state.update(zip(self.output_names,
+                         np.concatenate([model.errors, model.priors, model.x]).tolist()))
+        state.update(zip(self.vfe_names, model.vfe.tolist()))
+        now.temp_desire = now.i_prior
+        self.total_vfe = float(model.vfe.sum())
+
+    def upd_vfe(self):
+        self.now.vfe = self.total_vfe
+
+    def get_params(self):
+        params = super().get_params()
+        params.update(layers=self.layers, bottom_up=self.bottom_up, sparse=self.sparse)
+        return params
+
+    def restore(self, checkpoint, noise=True):
+        super().restore(checkpoint, noise)
+        # continue from the beliefs of the checkpoint
+        self.model = self.hierarchy()
+        state = vars(self.now)
+        for layer in self.model.layers:
+            self.model.x[self.model.beliefs[layer.name]] = \
+                [state[name] for name in layer.belief_names()]
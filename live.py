@@ -0,0 +1,207 @@
+# live view of a running simulation: the panels of the plots of the results
+# are drawn while the agent is simulated. Only new points are drawn
+# (blitted onto the figure) and the view takes at most a fixed share of the time
+from time import perf_counter
+
+import numpy as np
+from matplotlib import pyplot as plt
+
+# panels (row, column), their title, y limits and the variables drawn in them
+PANELS = [
+    ((0, 0), 'Temperature', (-10, 50), ('temp', 'temp_desire')),
+    ((1, 0), 'Temperature change', (-8, 8),
+     ('temp_change_environment', 'temp_change_action')),
+    ((2, 0), 'Light change', (-1, 1), ('light_change', 'velocity_action')),
+    ((0, 1), 'Environmental variable, $\\mu$', (-10, 50),
+     ('mu_i', 'mu_i_d1', 'mu_i_d2', 'ex_mu', 'aex_mu')),
+    ((1, 1), 'Variational free energy (VFE), $F$', (-5, 500),
+     ('vfe', 'vfe_i', 'vfe_ex', 'vfe_aex')),
+    ((2, 1), 'Error terms, $\\epsilon$', (-10, 10),
+     ('i_e_z_0', 'i_e_z_1', 'i_e_w_0', 'i_e_w_1', 'ex_e_z_0', 'aex_e_z_0', 'aex_e_w_0')),
+]
+
+
+class LiveView:
+    """Live plot of a running simulation, e.g. agent.simulate(live=True)
+       or agent.simulate(live=LiveView(every=50, budget=0.02)).
+
+       Every `every`-th step the values of the variables are added,
+       and at most `fps` times per second the new points are drawn.
+       All the time spent in the view (building and drawing the figure
+       and copying the values) counts against the `budget`, a fraction of
+       the time since the start: the figure is only built, and a frame only
+       drawn, when it is expected to fit into the time left in the budget,
+       and the values are copied less often (`every` doubles) when copying
+       alone takes half of it, so it never slows the simulation down
+       by much more than that. Short runs may end before the figure fits
+       into the budget, it is then only shown at the end.
+       `start()` it for the steps of the agent, call `update()` after every step
+       and `finish()` at the end."""
+
+    # expected time to build the figure, until it is measured
+    build_seconds = 1.0
+
+    def __init__(self, every=10, budget=0.05, fps=30):
+        self.every = every
+        self.budget = budget
+        self.interval = 1 / fps
+
+    def start(self, agent, steps):
+        """ start viewing the next `steps` steps of the agent """
+        self.started = perf_counter()
+        self.agent = agent
+        # times of the first and the last step
+        self.first = agent.step * agent.dt
+        self.end = (agent.step + steps) * agent.dt
+        self.names = [name for *_, names in PANELS for name in names if hasattr(agent.now, name)]
+        self.time = np.empty(steps // self.every + 1)
+        self.values = {name: np.empty(steps // self.every + 1) for name in self.names}
+        self.count = 0
+        # number of points already drawn
+        self.drawn = 0
+
+        # the figure is built once it fits into the budget
+        self.fig = None
+        self.last_frame = 0
+        # time spent in the view and in copying the values
+        self.view_seconds = perf_counter() - self.started
+        self.copy_seconds = 0
+        self.copy_started = self.started
+        self.copies = 0
+        return self
+
+    def build(self, animated=True):
+        """ open the figure with the panels, its lines animated
+            (drawn by the view) or regular (drawn with the figure) """
+        agent = self.agent
+        self.fig, self.ax = plt.subplots(3, 2, constrained_layout=True)
+        self.lines = {}
+        for (row, col), title, ylim, names in PANELS:
+            ax = self.ax[row][col]
+            for name in names:
+                if name in self.values:
+                    self.lines[name], = ax.plot([], [], lw=0.75, animated=animated, label=name)
+            ax.set_title(title)
+            ax.set_xlabel('time step')
+            ax.set_xlim(self.first - 10, self.end + 30)
+            ax.set_ylim(*ylim)
+            ax.legend(loc='upper right', fontsize='x-small', labelspacing=0)
+
+        self.ylim = {ax: ax.get_ylim() for ax in self.ax.flat}
+        self.pending = {}
+
+        temp = self.ax[0][0]
+        for bound in (-agent.temp_viable_range, agent.temp_viable_range):
+            temp.axhline(agent.temp_viable_mean + bound, lw=0.75, ls='--', c='red')
+
+        if animated:
+            plt.show(block=False)
+            start = perf_counter()
+            self.redraw()
+            self.redraw_seconds = perf_counter() - start
+            self.frame_seconds = 0
+
+    def redraw(self):
+        """ draw the whole figure and all points again """
+        # the lines are animated, not drawn with the figure,
+        # points are drawn onto it afterwards and never erased
+        self.fig.canvas.draw()
+        self.drawn = 0
+        self.draw_points()
+
+    def draw_points(self):
+        """ draw the points added since the last frame """
+        # the new segments start at the last drawn point
+        first = max(self.drawn - 1, 0)
+        for name, line in self.lines.items():
+            line.set_data(self.time[first:self.count], self.values[name][first:self.count])
+            line.axes.draw_artist(line)
+
+        self.fig.canvas.blit(self.fig.bbox)
+        self.fig.canvas.flush_events()
+        self.drawn = self.count
+
+    def new_limits(self):
+        """ y limits of the panels extended to the new points out of them
+            (and to those drawn out of them before) """
+        limits = dict(self.pending)
+        for name, line in self.lines.items():
+            values = self.values[name][self.drawn:self.count]
+            values = values[np.isfinite(values)]
+            if not values.size:
+                continue
+            low, high = limits.get(line.axes, self.ylim[line.axes])
+            if values.min() < low or values.max() > high:
+                # with a margin, so that the limits do not change at every frame
+                margin = 0.25 * (max(high, values.max()) - min(low, values.min()))
+                limits[line.axes] = (min(low, values.min() - margin),
+                                     max(high, values.max() + margin))
+        return limits
+
+    def update(self):
+        """ add the values of the agent at this step and draw them if there is time """
+        agent = self.agent
+        if agent.step % self.every:
+            return
+
+        start = perf_counter()
+        now = agent.now
+        self.time[self.count] = agent.step * agent.dt
+        for name in self.names:
+            self.values[name][self.count] = getattr(now, name)
+        self.count += 1
+        copied = perf_counter()
+        self.copy_seconds += copied - start
+        self.copies += 1
+
+        elapsed = copied - self.started
+        if elapsed - self.last_frame >= self.interval:
+            self.last_frame = elapsed
+            self.draw(self.budget * elapsed - self.view_seconds - (copied - start))
+
+        self.view_seconds += perf_counter() - start
+        # copying takes too much of the budget since the last change of `every`,
+        # copy less often
+        if self.copies >= 10 and \
+                self.copy_seconds > self.budget / 2 * (copied - self.copy_started):
+            self.every *= 2
+            self.copy_seconds = 0
+            self.copy_started = copied
+            self.copies = 0
+
+    def draw(self, budget):
+        """ draw a frame if the time it is expected to take (as long as
+            the last one of its kind) is within the budget left: build the figure,
+            or draw it again with new limits, or add the new points within
+            the old limits until the whole figure can be drawn again """
+        start = perf_counter()
+        if self.fig is None:
+            if self.build_seconds <= budget:
+                self.build()
+                self.build_seconds = perf_counter() - start
+            return
+
+        self.pending = self.new_limits()
+        if self.pending and self.redraw_seconds <= budget:
+            for ax, (low, high) in self.pending.items():
+                ax.set_ylim(low, high)
+            self.ylim.update(self.pending)
+            self.pending = {}
+            self.redraw()
+            self.redraw_seconds = perf_counter() - start
+        elif self.frame_seconds <= budget:
+            self.draw_points()
+            self.frame_seconds = perf_counter() - start
+
+    def finish(self):
+        """ draw all points as a regular (not animated) figure and show it """
+        if self.fig is None:
+            self.build(animated=False)
+        self.drawn = 0
+        for ax, (low, high) in self.new_limits().items():
+            ax.set_ylim(low, high)
+        for name, line in self.lines.items():
+            line.set_data(self.time[:self.count], self.values[name][:self.count])
+            line.set_animated(False)
+        plt.show()
+        return self.ax
@@ -0,0 +1,167 @@
+# seeded noise of the agents
+# every source of noise has its own stream of normally distributed values,
+# drawn in blocks from its own generator. The block size only changes how many
+# values are drawn at once, not the values of a stream
+import numpy as np
+
+# sources of noise, one stream per source.
+# The order defines the streams of a seed, new sources must be added at the end
+NOISE_SOURCES = ('temp_change', 'sense_i', 'sense_i_d1', 'ex_sense',
+                 'velocity_action', 'aex_action')
+
+
+def seed_streams(seed):
+    """ seed sequences of the streams of all sources for the given seed """
+    return dict(zip(NOISE_SOURCES, np.random.SeedSequence(seed).spawn(len(NOISE_SOURCES))))
+
+
+class NoiseStream:
+    """ standard normal values of one source, drawn in blocks into `buffer`
+        (a new array of `block` values by default, or a view into the buffer
+        of a batch, see BatchNoise) """
+
+    def __init__(self, seed_seq, block=4096, buffer=None):
+        self.rng = np.random.default_rng(seed_seq)
+        self.block = block
+        self.buffer = np.empty(block) if buffer is None else buffer
+        self.draw()
+        self.pos = 0
+
+    def draw(self):
+        """ draw the next block of values into the buffer """
+        # state of the generator before the block, to restore the stream from
+        self.block_state = self.rng.bit_generator.state
+        return self.rng.standard_normal(out=self.buffer)
+
+    def get_state(self):
+        """ state of the stream: the state of the generator before
+            the current block and the position in the block """
+        return self.block_state, self.pos
+
+    def set_state(self, state):
+        block_state, pos = state
+        self.rng.bit_generator.state = block_state
+        self.draw()
+        self.pos = pos
+
+    def next(self):
+        if self.pos == self.block:
+            self.draw()
+            self.pos = 0
+
+        value = self.buffer[self.pos]
+        self.pos += 1
+        return float(value)
+
+
+class Noise:
+    """Noise of an agent with a stream per source.
+
+       Runs are reproducible from the `seed`, and every source
+       has its own stream, so a source draws the same values
+       no matter how often the other sources are used.
+       `buffers` ({source: array of `block` values}) are the buffers
+       the streams draw into, new ones by default."""
+
+    def __init__(self, seed=None, block=4096, buffers=None):
+        self.seed = seed
+        buffers = buffers or {}
+        self.streams = {source: NoiseStream(seed_seq, block, buffers.get(source))
+                        for source, seed_seq in seed_streams(seed).items()}
+
+    def get_state(self):
+        """ state of all streams, to continue the noise from """
+        return {source: stream.get_state() for source, stream in self.streams.items()}
+
+    def set_state(self, state):
+        for source, stream_state in state.items():
+            self.streams[source].set_state(stream_state)
+
+    def __call__(self, source, scale=0.1, positive=False):
+        """ Simulate noise of the source with the mean at 0 and the standard deviation of `scale` """
+        noise = self.streams[source].next() * scale
+        if positive:
+            noise = abs(noise)
+
+        return noise
+
+
+class BatchNoise:
+    """Noise of a batch of agents with the same streams as of a standalone agent:
+       agent i of the batch sees the same noise as an agent with `seeds[i]`.
+
+       Blocks of all agents are kept together, so that a step takes
+       the values of all agents of a source with one array operation:
+       the streams of the agents draw their blocks directly into their rows
+       of one (agents x block) buffer per source. The memory is that of
+       6 x `block` values per agent, so large batches use small blocks."""
+
+    def __init__(self, seeds, block=4096):
+        buffers = {source: np.empty((len(seeds), block)) for source in NOISE_SOURCES}
+        self.set_agents([Noise(seed, block, {source: buffer[i]
+                                             for source, buffer in buffers.items()})
+                         for i, seed in enumerate(seeds)], buffers)
+
+    @classmethod
+    def from_noises(cls, noises):
+        """ noise of a batch continuing the noise of the agents """
+        batch = cls.__new__(cls)
+        batch.set_agents(noises)
+        return batch
+
+    def set_agents(self, noises, buffers=None):
+        self.n = len(noises)
+        self.block = noises[0].streams[NOISE_SOURCES[0]].block
+        self.agents = noises
+
+        if buffers is None:
+            # the blocks of the agents are moved into the buffer of the batch,
+            # so they are not kept twice
+            buffers = {source: np.stack([noise.streams[source].buffer for noise in noises])
+                       for source in NOISE_SOURCES}
+            for source, buffer in buffers.items():
+                for noise, row in zip(noises, buffer):
+                    noise.streams[source].buffer = row
+        self.buffers = buffers
+        self.pos = {source: np.array([noise.streams[source].pos for noise in noises])
+                    for source in NOISE_SOURCES}
+        self.index = np.arange(self.n)
+
+    def __call__(self, source, used=None, scale=0.1):
+        """ noise of the source for the agents that use it at this step (all by default),
+            zero for the other agents, which don't consume their streams """
+        buffer, pos = self.buffers[source], self.pos[source]
+
+        used = np.ones(self.n, dtype=bool) if used is None else used
+        # refill blocks of the agents that used all their values
+        for i in np.flatnonzero(used & (pos == self.block)):
+            # drawn into the row i of the buffer
+            self.agents[i].streams[source].draw()
+            pos[i] = 0
+
+        noise = np.where(used, buffer[self.index, np.minimum(pos, self.block - 1)], 0)
+        pos += used
+        return noise * scale
+
+
+class PopulationNoise:
+    """Noise of a population of agents: one stream per source for all agents,
+       from which the values of all agents of a step are drawn at once.
+
+       Unlike BatchNoise, memory and time do not grow with a generator and
+       a block per agent, so it suits large populations, but an agent does not
+       see the noise of a scalar agent and its noise depends on the size of the population."""
+
+    def __init__(self, seed, n):
+        self.seed = seed
+        self.n = n
+        self.rngs = {source: np.random.default_rng(seed_seq)
+                     for source, seed_seq in seed_streams(seed).items()}
+
+    def __call__(self, source, used=None, scale=0.1):
+        """ noise of the source for the agents that use it at this step (all by default),
+            zero for the other agents """
+        noise = self.rngs[source].standard_normal(self.n)
+        if used is not None:
+            noise = np.where(used, noise, 0)
+        return noise * scale
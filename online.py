@@ -0,0 +1,262 @@
+# summary statistics of variables updated as the simulation goes, in constant
+# memory: the values of the last steps are kept in a small block, which is
+# merged into the statistics when it is full, so a step only stores its values
+from operator import attrgetter
+
+import numpy as np
+
+# variables summarized by default (those of them the agent has):
+# free energy and prediction errors
+DEFAULT_NAMES = ('vfe', 'vfe_i', 'vfe_ex', 'vfe_aex',
+                 'i_e_z_0', 'i_e_z_1', 'i_e_w_0', 'i_e_w_1',
+                 'ex_e_z_0', 'aex_e_z_0', 'aex_e_w_0')
+
+# fewest points of a block added to the quantile sketch
+# and the most points of the last blocks before they are merged into the sketch
+BLOCK_POINTS = 8
+PENDING_POINTS = 128
+# fractional part of the golden ratio, the shift of the ranks taken from the blocks
+GOLDEN = (5 ** 0.5 - 1) / 2
+
+
+class OnlineStats:
+    """Running statistics of variables of a simulation, for a single agent
+       or for all agents of a batch:
+       the mean and the variance (merged block by block as in Welford's
+       algorithm), minimum, maximum, the total over time (e.g. the cumulative
+       free energy), the time above the `thresholds` ({name: value}) and
+       quantiles from a sketch of `sketch_size` points (within about 1% in
+       rank; with `quantiles=()` there is no sketch).
+
+       The memory does not depend on the number of steps, nor does the time
+       per step: a full block is sorted once and thinned to a few points, which
+       are merged into the sketch every `PENDING_POINTS` points. The summary,
+       a dict like {'vfe.mean': ..., 'vfe.q0.5': ...}, is given by `summary()`."""
+
+    def __init__(self, names=DEFAULT_NAMES, thresholds=None,
+                 quantiles=(0.05, 0.25, 0.5, 0.75, 0.95), block=256, sketch_size=200):
+        self.requested = names
+        self.thresholds = thresholds or {}
+        self.quantiles = quantiles
+        self.block = block
+        self.sketch_size = sketch_size
+
+    def start(self, state, dt):
+        """ start the statistics of the variables of the state """
+        self.names = [name for name in self.requested if hasattr(state, name)]
+        # the values of the variables as a tuple
+        self.getter = attrgetter(*self.names)
+        self.shape = np.shape(getattr(state, self.names[0]))
+        self.dt = dt
+
+        columns = (len(self.names),) + self.shape
+        self.buffer = np.empty((self.block,) + columns)
+        self.pos = 0
+
+        self.count = 0
+        self.mean = np.zeros(columns)
+        self.m2 = np.zeros(columns)
+        self.min = np.full(columns, np.inf)
+        self.max = np.full(columns, -np.inf)
+        self.total = np.zeros(columns)
+        self.threshold = np.array([self.thresholds.get(name, np.nan) for name in self.names])
+        self.threshold = self.threshold.reshape((-1,) + (1,) * len(self.shape))
+        self.above = np.zeros(columns)
+
+        # sorted points of the quantile sketch (along the last axis), all of
+        # the same weight, and the number of values they stand for, the points
+        # of the last blocks not merged into it yet, with their weights,
+        # and the offset of the ranks taken from the blocks (see merge_sketch)
+        self.sketch = np.empty(columns + (0,))
+        self.sketch_count = 0
+        self.pending = []
+        self.offset = 0.5
+
+        # agents of a batch whose statistics were stopped (see stop())
+        # and their summaries at that step
+        self.stopped = np.zeros(self.shape, dtype=bool)
+        self.frozen = {}
+        return self
+
+    def update(self, state):
+        """ add the values of the variables at this step """
+        self.buffer[self.pos] = self.getter(state)
+        self.pos += 1
+        if self.pos == self.block:
+            self.flush()
+
+    def flush(self):
+        """ merge the values of the block into the statistics """
+        values = self.buffer[:self.pos]
+        n = len(values)
+        if not n:
+            return
+
+        # mean and sum of squared deviations of the block, merged with those
+        # of all previous steps (Chan et al.'s parallel form of Welford's algorithm)
+        total = values.sum(axis=0)
+        mean = total / n
+        deviation = values - mean
+        m2 = np.einsum('i...,i...->...', deviation, deviation)
+        count = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / count
+        self.m2 += m2 + np.square(delta) * self.count * n / count
+
+        self.min = np.minimum(self.min, values.min(axis=0))
+        self.max = np.maximum(self.max, values.max(axis=0))
+        self.total += total
+        if self.thresholds:
+            self.above += (values > self.threshold).sum(axis=0)
+
+        if self.quantiles:
+            self.merge_sketch(values, count)
+        self.count = count
+        self.pos = 0
+
+    def merge_sketch(self, values, count):
+        """Add the values of the block to the quantile sketch: the block is sorted
+           and points of it at evenly spaced ranks are kept, each standing for its
+           share of the block, as many as the block's share of the sketch but at least
+           BLOCK_POINTS. The points of the last blocks are merged into the sketch
+           once there are PENDING_POINTS of them (see compress), so that the work
+           per block of a long run does not grow with the size of the sketch"""
+        # the values of every column one after another
+        values = np.sort(np.moveaxis(values, 0, -1), axis=-1)
+        n = values.shape[-1]
+        if not self.pending and count <= self.sketch_size:
+            # all values are kept while there are few of them
+            self.sketch = np.sort(np.concatenate([self.sketch, values], axis=-1), axis=-1)
+            self.sketch_count = count
+            return
+
+        # the ranks taken from the blocks are shifted from block to block
+        # (by the golden ratio), so that also the tails of the blocks are taken
+        k = min(max(BLOCK_POINTS, -(-self.sketch_size * n // count)), n)
+        self.offset = (self.offset + GOLDEN) % 1
+        self.pending.append((thin(values, k, self.offset), n / k))
+        if sum(points.shape[-1] for points, _ in self.pending) >= PENDING_POINTS:
+            self.compress()
+
+    def compress(self):
+        """ merge the pending points of the last blocks into the sketch,
+            compressed back to `sketch_size` points of the same weight """
+        if not self.pending:
+            return
+
+        size = self.sketch.shape[-1]
+        weights = [np.full(size, self.sketch_count / max(size, 1))]
+        weights += [np.full(points.shape[-1], weight) for points, weight in self.pending]
+        points = np.concatenate([self.sketch] + [points for points, _ in self.pending], axis=-1)
+        self.sketch = weighted_quantiles(points, np.concatenate(weights), self.sketch_size)
+        self.sketch_count += sum(points.shape[-1] * weight for points, weight in self.pending)
+        self.pending = []
+
+    def quantile(self, q):
+        """ estimated quantile q of all variables """
+        self.compress()
+        sketch = self.sketch
+        size = sketch.shape[-1]
+        position = np.clip(q * size - 0.5, 0, size - 1)
+        lower = int(position)
+        upper = min(lower + 1, size - 1)
+        fraction = position - lower
+        return sketch[..., lower] + fraction * (sketch[..., upper] - sketch[..., lower])
+
+    def stop(self, stopped):
+        """ stop the statistics of the agents of a batch `stopped` (a mask of them),
+            e.g. of agents that died: their summary keeps the statistics
+            of the steps until now, later values don't change it """
+        new = stopped & ~self.stopped
+        if not new.any():
+            return
+
+        for key, value in self.running_summary().items():
+            frozen = self.frozen.setdefault(key, np.full(self.shape, np.nan))
+            frozen[new] = value[new]
+        self.stopped |= new
+
+    def summary(self):
+        """ statistics of all variables by '<variable>.<statistic>',
+            of the stopped agents until they were stopped """
+        stats = self.running_summary()
+        if self.stopped.any():
+            stats = {key: np.where(self.stopped, self.frozen[key], value)
+                     for key, value in stats.items()}
+        return stats
+
+    def running_summary(self):
+        """ statistics of all variables over all steps so far """
+        self.flush()
+
+        stats = {}
+        for i, name in enumerate(self.names):
+            stats[f'{name}.mean'] = self.mean[i][()]
+            stats[f'{name}.var'] = (self.m2[i] / max(self.count - 1, 1))[()]
+            stats[f'{name}.min'] = self.min[i][()]
+            stats[f'{name}.max'] = self.max[i][()]
+            # integrated over time
+            stats[f'{name}.total'] = (self.total[i] * self.dt)[()]
+            if name in self.thresholds:
+                stats[f'{name}.time_above'] = (self.above[i] * self.dt)[()]
+            for q in self.quantiles:
+                stats[f'{name}.q{q:g}'] = self.quantile(q)[i][()]
+
+        return stats
+
+
+def thin(values, k, offset=0.5):
+    """ k points of the sorted values (along the last axis) at evenly spaced ranks
+        (the first at `offset` / k), interpolated between the values around them """
+    size = values.shape[-1]
+    position = np.clip((np.arange(k) + offset) * size / k - 0.5, 0, size - 1)
+    lower = position.astype(int)
+    upper = np.minimum(lower + 1, size - 1)
+    fraction = position - lower
+
+    low = np.take(values, lower, axis=-1)
+    high = np.take(values, upper, axis=-1)
+    high -= low
+    high *= fraction
+    high += low
+    return high
+
+
+def weighted_quantiles(points, weights, size):
+    """Values at `size` evenly spaced ranks of the points (along the last axis),
+       each with its weight (`weights` of the last axis, the same in all columns),
+       interpolated between the middles of the points"""
+    shape = points.shape[:-1]
+    points = points.reshape(-1, points.shape[-1])
+    columns, length = points.shape
+    count = weights.sum()
+
+    # the points of all columns sorted and the ranks of their middles
+    order = np.argsort(points, axis=-1)
+    weights = weights[order]
+    ranks = np.cumsum(weights, axis=-1)
+    ranks -= weights / 2
+    order += (np.arange(columns) * length)[:, None]
+    points = points.ravel()[order]
+
+    # the number of points below each rank (j + 0.5) * count / size,
+    # counted for all columns at once
+    bins = (ranks * (size / count) + 0.5).astype(np.intp)
+    np.minimum(bins, size, out=bins)
+    bins += (np.arange(columns) * (size + 1))[:, None]
+    index = np.bincount(bins.ravel(), minlength=columns * (size + 1))
+    index = index.reshape(columns, size + 1)[:, :size].cumsum(axis=-1)
+    np.clip(index, 1, length - 1, out=index)
+    index += (np.arange(columns) * length)[:, None]
+
+    # interpolated between the points around the ranks
+    targets = (np.arange(size) + 0.5) * (count / size)
+    lower = ranks.ravel()[index - 1]
+    fraction = (targets - lower) / (ranks.ravel()[index] - lower)
+    np.clip(fraction, 0, 1, out=fraction)
+    low = points.ravel()[index - 1]
+    high = points.ravel()[index]
+    high -= low
+    high *= fraction
+    high += low
+    return high.reshape(shape + (size,))
@@ -0,0 +1,200 @@
+# search of the parameters of the agents (precisions, learning rates, ...)
+# minimizing an objective, e.g. the cumulative free energy,
+# with the cross-entropy method: a population of parameter sets is sampled
+# from a distribution, which is then moved towards the best of them
+import json
+
+import numpy as np
+
+from batch import BatchAgent
+from results import summarize
+from sweep import iter_sweep, to_table
+
+
+def vfe_total(metrics):
+    """ free energy integrated over time """
+    return metrics['vfe_total']
+
+
+def time_outside(metrics):
+    """ fraction of time the temperature was outside of the viable range """
+    return 1 - metrics['time_viable']
+
+
+def action_energy(metrics):
+    """ energy of all actions of the agent """
+    return metrics['action_energy'] + metrics.get('aex_action_energy', 0)
+
+
+OBJECTIVES = {
+    'vfe_total': vfe_total,
+    'time_outside': time_outside,
+    'action_energy': action_energy,
+}
+
+
+def simulate_metrics(agent_cls, candidates, seeds, engine='batch', batch_size=128,
+                     processes=None, params=None, sim_kwargs=None):
+    """Metrics of the simulations of every parameter set of `candidates` with every
+       one of the `seeds` (common random numbers), run i * len(seeds) + j being the
+       candidate i with the seed j, as batches of at most `batch_size` agents
+       (`engine='batch'`) or over a process pool (`engine='pool'`)"""
+    params = params or {}
+    sim_kwargs = sim_kwargs or {}
+    if engine == 'pool':
+        runs = [dict(params, **candidate) for candidate in candidates]
+        return to_table(iter_sweep(agent_cls, runs, seeds, processes=processes, **sim_kwargs))
+
+    runs = [(candidate, seed) for candidate in candidates for seed in seeds]
+    chunks = []
+    for start in range(0, len(runs), batch_size):
+        chunk = runs[start:start + batch_size]
+        kwargs = {name: [candidate[name] for candidate, _ in chunk] for name in chunk[0][0]}
+        batch = BatchAgent(agent_cls, n=len(chunk), seed=[seed for _, seed in chunk],
+                           **dict(params, **kwargs))
+        chunks.append(summarize(batch.simulate(**sim_kwargs)))
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+
+class CrossEntropySearch:
+    """Cross-entropy method minimizing the objective of simulations of `agent_cls`
+       over the parameters in `space`, {name: (low, high)} of positive values.
+
+       The parameters are sampled in the log space from a normal distribution
+       with a diagonal covariance, which is moved to the best `elite` fraction
+       of each generation of `population` candidates. Every candidate is
+       simulated with the same `seeds` (common random numbers), so that
+       candidates are compared on the same noise, and its objective is the mean
+       over the seeds. `objective` is a name in OBJECTIVES or a function of
+       the metrics of the runs (see results.summarize).
+
+       A generation is simulated as batches of at most `batch_size` agents
+       (`engine='batch'`) or over a process pool (`engine='pool'`).
+       `params` are fixed parameters of the agents and `sim_kwargs` are passed
+       to simulate(). `start` ({name: value}) warm-starts the search."""
+
+    def __init__(self, agent_cls, space, objective='vfe_total', population=32, elite=0.25,
+                 seeds=range(4), smoothing=0.7, min_std=0.01, engine='batch',
+                 batch_size=128, processes=None, params=None, sim_kwargs=None,
+                 start=None, seed=0):
+        self.agent_cls = agent_cls
+        self.names = list(space)
+        self.low = np.log([space[name][0] for name in self.names])
+        self.high = np.log([space[name][1] for name in self.names])
+
+        self.objective = OBJECTIVES.get(objective, objective)
+        self.population = population
+        self.elite = max(1, int(round(elite * population)))
+        self.seeds = list(seeds)
+        self.smoothing = smoothing
+        self.min_std = min_std
+
+        if engine not in ('batch', 'pool'):
+            raise ValueError(f"unknown engine '{engine}', use 'batch' or 'pool'")
+        self.engine = engine
+        self.batch_size = batch_size
+        self.processes = processes
+        self.params = params or {}
+        self.sim_kwargs = sim_kwargs or {}
+
+        # distribution of the candidates in the log space
+        self.mean = (self.low + self.high) / 2
+        if start:
+            self.mean = np.array([np.log(start.get(name, np.exp(m)))
+                                  for name, m in zip(self.names, self.mean)])
+        self.std = (self.high - self.low) / 4
+
+        self.rng = np.random.default_rng(seed)
+        self.generation = 0
+        self.best_params = None
+        self.best_score = np.inf
+        self.history = []
+
+    def candidates(self, x):
+        """ parameter sets of the points x in the log space """
+        return [dict(zip(self.names, np.exp(point).tolist())) for point in x]
+
+    def evaluate(self, candidates):
+        """ objective of each of the parameter sets, the mean over the seeds """
+        seeds = len(self.seeds)
+        metrics = simulate_metrics(self.agent_cls, candidates, self.seeds, self.engine,
+                                   self.batch_size, self.processes, self.params,
+                                   self.sim_kwargs)
+
+        scores = np.asarray(self.objective(metrics), dtype=float)
+        # diverged runs are the worst
+        scores = np.where(np.isnan(scores), np.inf, scores)
+        return scores.reshape(len(candidates), seeds).mean(axis=1)
+
+    def step(self):
+        """ simulate one generation and update the distribution; returns its best score """
+        x = self.mean + self.std * self.rng.standard_normal((self.population, len(self.names)))
+        x = np.clip(x, self.low, self.high)
+        candidates = self.candidates(x)
+        scores = self.evaluate(candidates)
+
+        order = np.argsort(scores)
+        elite = x[order[:self.elite]]
+        self.mean = self.smoothing * elite.mean(axis=0) + (1 - self.smoothing) * self.mean
+        self.std = np.maximum(self.smoothing * elite.std(axis=0) +
+                              (1 - self.smoothing) * self.std, self.min_std)
+
+        if scores[order[0]] < self.best_score:
+            self.best_score = float(scores[order[0]])
+            self.best_params = candidates[order[0]]
+
+        self.generation += 1
+        self.history.append({'generation': self.generation,
+                             'best': float(scores[order[0]]),
+                             'mean': float(np.mean(scores[np.isfinite(scores)]))
+                             if np.isfinite(scores).any() else float('inf'),
+                             'params': self.candidates(self.mean[None])[0]})
+        return scores[order[0]]
+
+    def run(self, generations=20, checkpoint=None, verbose=False):
+        """ run the generations, saving the state of the search to the file
+            `checkpoint` after each of them; returns the best parameters """
+        for _ in range(generations):
+            score = self.step()
+            if checkpoint is not None:
+                self.save(checkpoint)
+            if verbose:
+                print(f'generation {self.generation}: best {score:.4g}, '
+                      f'overall best {self.best_score:.4g} {self.best_params}')
+
+        return self.best_params
+
+    def state(self):
+        """ state of the search, to continue it from """
+        return {
+            'names': self.names,
+            'mean': self.mean.tolist(),
+            'std': self.std.tolist(),
+            'generation': self.generation,
+            'best_params': self.best_params,
+            'best_score': self.best_score,
+            'history': self.history,
+            'rng': self.rng.bit_generator.state,
+        }
+
+    def set_state(self, state):
+        if state['names'] != self.names:
+            raise ValueError(f"the search is over {state['names']}, not {self.names}")
+
+        self.mean = np.array(state['mean'])
+        self.std = np.array(state['std'])
+        self.generation = state['generation']
+        self.best_params = state['best_params']
+        self.best_score = state['best_score']
+        self.history = state['history']
+        self.rng.bit_generator.state = state['rng']
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.state(), f, indent=1)
+
+    def load(self, path):
+        """ continue the search saved to the file """
+        with open(path) as f:
+            self.set_state(json.load(f))
+        return self
@@ -0,0 +1,500 @@
+# the update equations of the original agents, kept as the reference
+# the engines are checked against (see equivalence.py): trajectories as lists
+# appended at every step, the world of the original scenario hard-coded
+# in update_world and no recording, schedules, fields or integrators.
+# The only change is the noise, which comes from the streams of a seed
+# (see noise.py) instead of the global generator of NumPy,
+# so that a run draws the same noise as an agent of simulation.py
+import numpy as np
+
+from noise import Noise
+
+
+class InteroceptiveAgent:
+    """Interoceptive agent resembling homeostatic regulation """
+
+    def __init__(self, i_s_z_0=0.1, i_s_z_1=0.1, i_s_w_0=0.1, i_s_w_1=0.1,
+                 action_bound=6, temp_const_change_initial=0,
+                 learn_r_a=None,
+                 temp_viable_range=10, dt=0.1, learn_r=0.1,
+                 simulate_current=False, seed=None):
+        # sigma (variances) of sensory noise (z) and model noise (w)
+        self.i_s_z_0 = i_s_z_0
+        self.i_s_z_1 = i_s_z_1
+        self.i_s_w_0 = i_s_w_0
+        self.i_s_w_1 = i_s_w_1
+
+        # learning rate
+        self.learn_r = learn_r
+        self.learn_r_a = learn_r_a if learn_r_a else learn_r
+
+        self.dt = dt
+
+        # goal temperature
+        self.T0 = 30
+        self.temp_viable_mean = 30
+        self.temp_viable_range = temp_viable_range
+
+        # action bound -- agent can't set action more or less than this
+        self.temp_change_action_bound = action_bound
+        self.temp_change_environment_initial = temp_const_change_initial
+
+        # if the current should be simulated
+        self.simulate_current = simulate_current
+
+        # seed of the noise streams
+        self.seed = seed
+
+        self.reset()
+
+    def reset(self):
+        self.noise = Noise(self.seed)
+
+        # errors
+        self.i_e_z_0 = []
+        self.i_e_z_1 = []
+        self.i_e_w_0 = []
+        self.i_e_w_1 = []
+
+        # senses
+        self.sense_i = []
+        self.sense_i_d1 = []
+
+        # world
+        # >> temperature params
+        self.temp = [self.T0]
+        self.temp_change = [0]
+        self.temp_change_environment = [self.temp_change_environment_initial]
+        self.temp_change_instant_update = [0]
+        self.temp_change_action = [0]
+        # >> light params
+        self.light_change = [0]
+        self.light_change_instant = [0]
+        self.light_change_environment = [0]
+        self.light_change_movement = []
+        self.ex_sense = []
+        # >> movement params
+        self.velocity_action = [0]
+        self.velocity = [0]
+
+        # action (interoceptive)
+        self.temp_relative_change = [0]
+        self.temp_desire = [self.temp_viable_mean]
+
+        # brain state mu
+        self.mu_i = [0]
+        self.mu_i_d1 = [0]
+        self.mu_i_d2 = [0]
+
+        # variational free energy
+        self.vfe_i = []
+        self.vfe = []
+
+    def generate_senses(self):
+        self.generate_sense()
+        self.generate_sense_d1()
+
+    def generate_sense(self):
+        sense = self.temp[-1] + self.noise('sense_i')
+        self.sense_i.append(sense)
+
+    def generate_sense_d1(self):
+        """ change in sensation is felt change in temperature """
+        sense_i_d1 = self.temp_change[-1] + self.noise('sense_i_d1')
+
+        self.sense_i_d1.append(sense_i_d1)
+
+    def update_world(self):
+        """ update world parameters """
+        if self.time == 50:
+            new_temp_chage_desired = 3
+        elif self.time == 100:
+            new_temp_chage_desired = 5
+        elif self.time == 150:
+            new_temp_chage_desired = -1
+        elif self.time == 200:
+            new_temp_chage_desired = -6.2
+        elif self.time == 250:
+            new_temp_chage_desired = 0
+        else:
+            new_temp_chage_desired = self.temp_change_environment[-1]
+
+        temp_change_instant_update = new_temp_chage_desired - \
+            self.temp_change_environment[-1]
+
+        self.temp_change_instant_update.append(temp_change_instant_update)
+
+    def upd_velocity(self):
+        velocity = self.velocity_action[-1]
+
+        # simulate external force -- current after time step 300
+        if self.simulate_current and self.time > 300:
+            velocity += 0.1
+
+        self.velocity.append(velocity)
+
+    def upd_light_change(self):
+        light_change_environment = self.light_change_environment[-1]
+        light_change_environment += self.light_change_instant[-1] * self.dt
+        self.light_change_environment.append(light_change_environment)
+
+        self.light_change_movement.append(self.velocity[-1])
+
+        light_change = self.light_change_environment[-1]
+        light_change += self.light_change_movement[-1]
+
+        self.light_change.append(light_change)
+
+    def upd_temp_change(self):
+        temp_change_environment = self.temp_change_environment[-1]
+        temp_change_environment += self.temp_change_instant_update[-1]
+        temp_change_environment += self.velocity[-1] * self.dt
+        self.temp_change_environment.append(temp_change_environment)
+
+        action = self.temp_change_action[-1] + self.noise('temp_change') * self.dt
+        temp_change = self.temp_change_environment[-1] + action
+
+        self.temp_change.append(temp_change)
+
+    def upd_temp(self):
+        upd = self.temp_change[-1]
+        upd *= self.dt
+
+        self.temp.append(self.temp[-1] + upd)
+
+    def upd_err_z_0(self):
+        self.i_e_z_0.append(self.sense_i[-1] - self.mu_i[-1])
+
+    def upd_err_z_1(self):
+        self.i_e_z_1.append(self.sense_i_d1[-1] - self.mu_i_d1[-1])
+
+    def upd_err_w_0(self):
+        self.i_e_w_0.append(self.mu_i_d1[-1] + self.mu_i[-1] - self.temp_desire[-1])
+
+    def upd_err_w_1(self):
+        self.i_e_w_1.append(self.mu_i_d2[-1] + self.mu_i_d1[-1])
+
+    def upd_mu_i_d2(self):
+        upd = -self.learn_r * (self.i_e_w_1[-1] / self.i_s_w_1)
+        upd *= self.dt
+
+        self.mu_i_d2.append(self.mu_i_d2[-1] + upd)
+
+    def upd_mu_i_d1(self):
+        upd = -self.learn_r * (-self.i_e_z_1[-1] / self.i_s_z_1 +
+                               self.i_e_w_0[-1] / self.i_s_w_0 + self.i_e_w_1[-1] / self.i_s_w_1)
+        upd += self.mu_i_d2[-2]
+        upd *= self.dt
+
+        self.mu_i_d1.append(self.mu_i_d1[-1] + upd)
+
+    def upd_mu_i(self):
+        upd = -self.learn_r * \
+            (-self.i_e_z_0[-1] / self.i_s_z_0 + self.i_e_w_0[-1] / self.i_s_w_0)
+        upd += self.mu_i_d1[-2]
+        upd *= self.dt
+
+        self.mu_i.append(self.mu_i[-1] + upd)
+
+    def upd_vfe_i(self):
+        def sqrd_err(err, sigma):
+            return np.power(err, 2) / sigma
+
+        vfe_i = 0.5 * (sqrd_err(self.i_e_z_0[-1], self.i_s_z_0) +
+                       sqrd_err(self.i_e_z_1[-1], self.i_s_z_1) +
+                       sqrd_err(self.i_e_w_0[-1], self.i_s_w_0) +
+                       sqrd_err(self.i_e_w_1[-1], self.i_s_w_1))
+
+        self.vfe_i.append(vfe_i)
+
+    def upd_action(self):
+        upd = -self.learn_r_a * 1 * (self.i_e_z_1[-1] / self.i_s_z_1)
+        upd *= self.dt
+        action = self.temp_change_action[-1] + upd
+
+        if abs(action) > self.temp_change_action_bound:
+            action = np.sign(action) * self.temp_change_action_bound
+
+        self.temp_change_action.append(action)
+
+    def upd_no_action(self):
+        self.temp_change_action.append(self.temp_change_action[-1])
+
+    def interoception(self):
+        self.upd_err_z_0()
+        self.upd_err_z_1()
+        self.upd_err_w_0()
+        self.upd_err_w_1()
+
+        self.upd_mu_i_d2()
+        self.upd_mu_i_d1()
+        self.upd_mu_i()
+
+        self.upd_vfe_i()
+
+    def active_inference(self):
+        self.temp_desire.append(self.temp_viable_mean)
+        self.interoception()
+
+    def upd_vfe(self):
+        self.vfe.append(self.vfe_i[-1])
+
+    def simulate(self, sim_time=300, act_time=50):
+        self.reset()
+        self.act_time = act_time
+
+        self.steps = int(sim_time / self.dt)
+
+        for step in range(self.steps):
+            self.time = step * self.dt
+            # update world
+            self.update_world()
+            self.upd_velocity()
+            self.upd_temp_change()
+            self.upd_temp()
+            self.upd_light_change()
+
+            # generate sensations
+            self.generate_senses()
+
+            # perform active inference
+            self.active_inference()
+
+            # update variational free energy
+            self.upd_vfe()
+
+            #  act
+            if step * self.dt > act_time:
+                self.upd_action()
+
+            else:
+                self.upd_no_action()
+
+        return self
+
+    def trajectories(self):
+        """Trajectories of the last simulation as arrays, aligned as those
+           recorded by the agents of simulation.py: the values of every step,
+           after the initial value for the lists that start with one.
+           The lists the original agents never update are constant"""
+        trajectories = {}
+        for name, values in vars(self).items():
+            if not isinstance(values, list):
+                continue
+            if len(values) == 1:
+                values = values * (self.steps + 1)
+            trajectories[name] = np.array(values, dtype=float)
+        return trajectories
+
+
+class ExteroceptiveAgent(InteroceptiveAgent):
+    """Exteroceptive agent that infers the desired temperature
+       and passes it down to the interoceptive layer"""
+
+    def __init__(self, ex_s_z_0=0.01, simulate_current=True, **kwargs):
+        # simulate current by default
+        super().__init__(simulate_current=simulate_current, **kwargs)
+
+        self.learn_r_ex = self.learn_r
+
+        # sigma (variances)
+        self.ex_s_z_0 = ex_s_z_0
+
+    def reset(self):
+        super().reset()
+
+        self.ex_e_z_0 = []
+        self.ex_e_w_0 = []
+
+        self.ex_mu = [0]
+
+        self.vfe_ex = []
+
+    def generate_senses(self):
+        super().generate_senses()
+        self.generate_ex_sense()
+
+    def generate_ex_sense(self):
+        ex_sense = self.light_change[-1] + self.noise('ex_sense')
+        self.ex_sense.append(ex_sense)
+
+    def upd_ex_err_z_0(self):
+        self.ex_e_z_0.append(self.ex_sense[-1] - 0.1 * (-self.ex_mu[-1] + 30))
+
+    def upd_ex_mu(self):
+        upd = -self.learn_r_ex * \
+            (0.1 * self.ex_e_z_0[-1] / self.ex_s_z_0)
+        upd *= self.dt
+
+        self.ex_mu.append(self.ex_mu[-1] + upd)
+
+    def upd_vfe_ex(self):
+        def sqrd_err(err, sigma):
+            return np.power(err, 2) / sigma
+
+        vfe_ex = 0.5 * (sqrd_err(self.ex_e_z_0[-1], self.ex_s_z_0))
+
+        self.vfe_ex.append(vfe_ex)
+
+    def upd_vfe(self):
+        vfe = self.vfe_i[-1] + self.vfe_ex[-1]
+        self.vfe.append(vfe)
+
+    def exteroception(self):
+        self.upd_ex_err_z_0()
+        self.upd_ex_mu()
+        self.upd_vfe_ex()
+
+    def update_world(self):
+        """ light drop before the temperature drop """
+        super().update_world()
+
+        if int(self.time) == 175:
+            light_change_instant = -0.7
+        elif int(self.time) == 200:
+            light_change_instant = 0.7
+        else:
+            light_change_instant = 0
+
+        self.light_change_instant.append(light_change_instant)
+
+    def active_inference(self):
+        self.exteroception()
+        self.temp_desire.append(self.ex_mu[-1])
+        self.interoception()
+
+    def simulate(self, sim_time=400, act_time=50):
+        # simulate for 400 time steps by default
+        return super().simulate(sim_time=sim_time, act_time=act_time)
+
+
+class ActiveExteroceptiveAgent(ExteroceptiveAgent):
+    """Agent that moves up and down in the water, changing the light and
+       the temperature, with active exteroception below the inferred
+       desired temperature"""
+
+    def __init__(self, aex_s_z_0=0.1, aex_s_z_1=0.1, aex_s_w_0=0.1, aex_s_w_1=0.1,
+                 aex_action_bound=0.2, supress_action=False, learn_r_aex=None,
+                 supress_desired_temp_inference=False,
+                 simulate_current=True,
+                 **kwargs):
+        super().__init__(simulate_current=simulate_current, **kwargs)
+
+        self.learn_r_aex = self.learn_r if learn_r_aex is None else learn_r_aex
+
+        # sigma (variances)
+        self.aex_s_z_0 = aex_s_z_0
+        self.aex_s_w_0 = aex_s_w_0
+
+        # action bound of the action on the world
+        self.aex_action_bound = aex_action_bound
+
+        self.supress_action = supress_action
+        self.supress_desired_temp_inference = supress_desired_temp_inference
+
+    def reset(self):
+        super().reset()
+
+        self.aex_e_z_0 = [0]
+        self.aex_e_w_0 = [0]
+
+        self.aex_mu = [0]
+        self.aex_mu_d1 = [0]
+
+        self.vfe_aex = []
+
+        self.aex_action = [0]
+        self.aex_action_pre_bound = [0]
+
+    def update_world(self):
+        super().update_world()
+
+        if self.time < self.act_time:
+            self.velocity_action.append(0)
+            return
+
+        if not self.supress_action:
+            noise = self.noise('velocity_action') if self.time < 300 else 0
+            self.velocity_action.append(self.aex_action[-1] + noise)
+
+    def upd_aex_mu_d1(self):
+        upd = -self.learn_r_ex * (self.aex_e_w_0[-1] / self.aex_s_w_0)
+        upd *= self.dt
+
+        self.aex_mu_d1.append(self.aex_mu_d1[-1] + upd)
+
+    def upd_aex_mu(self):
+        upd = -self.learn_r_ex * \
+            (+self.aex_e_z_0[-1] / self.aex_s_z_0 +
+             +self.aex_e_w_0[-1] / self.aex_s_w_0
+             )
+        upd += self.aex_mu_d1[-1]
+        upd *= self.dt
+
+        self.aex_mu.append(self.aex_mu[-1] + upd)
+
+    def upd_ex_err_z_0(self):
+        prediction = self.ex_sense[-1] - self.aex_action[-1]
+
+        self.ex_e_z_0.append(prediction - 0.1 * (-self.ex_mu[-1] + 30))
+
+    def upd_aex_err_w_0(self):
+        t_change_goal = self.sense_i_d1[-1] - self.temp_change_action[-1]
+        self.aex_e_w_0.append(self.aex_mu_d1[-1] - t_change_goal + self.aex_mu[-1])
+
+    def upd_aex_err_z_0(self):
+        error = self.aex_action[-1]
+        self.aex_e_z_0.append(error - (-self.aex_mu[-1]))
+
+    def upd_avfe_ex(self):
+        def sqrd_err(err, sigma):
+            return np.power(err, 2) / sigma
+
+        vfe_aex = 0.5 * (sqrd_err(self.aex_e_z_0[-1], self.aex_s_z_0)
+                         + sqrd_err(self.aex_e_w_0[-1], self.aex_s_w_0))
+
+        self.vfe_aex.append(vfe_aex)
+
+    def upd_vfe(self):
+        vfe = self.vfe_i[-1] + self.vfe_ex[-1] + self.vfe_aex[-1]
+        self.vfe.append(vfe)
+
+    def upd_action(self):
+        super().upd_action()
+
+        upd = -self.learn_r_aex * 1 * (self.aex_e_z_0[-1] / self.aex_s_z_0)
+        upd *= self.dt
+        aex_action = self.aex_action[-1] + upd
+        aex_action += self.noise('aex_action') * self.dt
+
+        self.aex_action_pre_bound.append(aex_action)
+
+        if abs(aex_action) > self.aex_action_bound:
+            aex_action = np.sign(aex_action) * self.aex_action_bound
+
+        self.aex_action.append(aex_action)
+
+    def upd_no_action(self):
+        super().upd_no_action()
+        self.aex_action.append(self.aex_action[-1])
+        self.aex_action_pre_bound.append(self.aex_action_pre_bound[-1])
+
+    def active_exteroception(self):
+        self.upd_aex_mu_d1()
+        self.upd_aex_mu()
+
+        self.upd_aex_err_z_0()
+        self.upd_aex_err_w_0()
+
+        self.upd_avfe_ex()
+
+    def active_inference(self):
+        self.exteroception()
+
+        if not self.supress_desired_temp_inference:
+            self.temp_desire.append(self.ex_mu[-1])
+        else:
+            self.temp_desire.append(self.temp_viable_mean)
+
+        self.interoception()
+        self.active_exteroception()
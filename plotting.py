@@ -0,0 +1,182 @@
+# plotting of simulation results
+import numpy as np
+from matplotlib import pyplot as plt
+
+from simulation import ExteroceptiveAgent, ActiveExteroceptiveAgent
+from utils import minmax_downsample, running_mean
+
+
+def plot_line(ax, timeline, values, **kwargs):
+    """ plot the values against the timeline, downsampled to about
+        the width of the figure in pixels, so that long runs plot fast """
+    buckets = int(ax.figure.get_figwidth() * ax.figure.dpi)
+    return ax.plot(*minmax_downsample(timeline, values, buckets), **kwargs)
+
+
+def plot_interoceptive(res):
+    """ temperature, temperature change, light change, beliefs,
+        free energy and errors of the interoceptive agent """
+    fig, ax = plt.subplots(3, 2, constrained_layout=True)
+
+    timeline = res.time
+
+    # Temperature
+    min_temp = res.temp_viable_mean - res.temp_viable_range
+    max_temp = res.temp_viable_mean + res.temp_viable_range
+    plot_line(ax[0][0], timeline, res.temp[1:])
+    plot_line(ax[0][0], timeline, res.temp_desire[1:], ls='--', lw=0.75, c='green')
+    ax[0][0].set_title('Temperature')
+    ax[0][0].set_xlabel('time step')
+    ax[0][0].set_ylabel('temperature')
+    plot_line(ax[0][0], timeline, np.ones_like(timeline) * min_temp,
+              lw=0.75, ls='--', c='red')
+    plot_line(ax[0][0], timeline, np.ones_like(timeline) * max_temp,
+              lw=0.75, ls='--', c='red')
+    ax[0][0].legend(['agent, $T$', 'goal, $T_{goal}$', 'viability'],
+                    loc='lower right')
+    ax[0][0].set_ylim(-10, 50)
+    ax[0][0].set_xlim(-10, res.time[-1] + 30)
+
+    # Temperature change
+    temp_change_organism = np.array(res.temp_change_environment[1:]) + \
+        np.array(res.temp_change_action[1:])
+    plot_line(ax[1][0], timeline, res.temp_change_environment[1:])
+    plot_line(ax[1][0], timeline, res.temp_change_action[1:])
+    plot_line(ax[1][0], timeline, temp_change_organism, lw=1.25, ls='--', c='g')
+    plot_line(ax[1][0], timeline, np.ones_like(timeline) * 0, lw=0.65, c='gray')
+    ax[1][0].legend(['env-t, $\\dot{T}_e$', 'action, $\\dot{T}_i$',
+                     'agent, $\\dot{T}$'],
+                    loc='lower right',
+                    # loc='center right',
+                    labelspacing=0.3)
+    ax[1][0].set_title('Temperature change')
+    ax[1][0].set_xlabel('time step')
+    ax[1][0].set_ylabel('temperature change')
+    ax[1][0].set_ylim(-8, 8)
+    ax[1][0].set_xlim(-10, res.time[-1] + 30)
+
+    # Light change
+    plot_line(ax[2][0], timeline, running_mean(res.light_change[1:]), lw=2)
+    ax[2][0].set_title('Light change')
+    ax[2][0].set_xlabel('time step')
+    ax[2][0].set_ylabel('light change')
+    ax[2][0].legend(['total, $\\dot{L}$'], loc='lower right')
+    ax[2][0].set_xlim(-10, res.time[-1] + 30)
+
+    # mu
+    plot_line(ax[0][1], timeline, res.mu_i[1:])
+    plot_line(ax[0][1], timeline, res.mu_i_d1[1:])
+    plot_line(ax[0][1], timeline, res.mu_i_d2[1:])
+    ax[0][1].set_title('Environmental variable, $\\mu$')
+    ax[0][1].set_xlabel('time step')
+    ax[0][1].set_ylabel('$\\mu$')
+    ax[0][1].legend(['$\\mu_i$', "$\\mu_i'$", "$\\mu_i''$"], loc='upper right')
+    ax[0][1].set_ylim(-10, 50)
+
+    # VFE
+    plot_line(ax[1][1], timeline, running_mean(res.vfe), lw=3, c="#3f92d2")
+    ax[1][1].set_title('Variational free energy (VFE), $F$')
+    ax[1][1].set_xlabel('time step')
+    ax[1][1].set_ylabel('$F$')
+    ax[1][1].set_ylim(-5, 500)
+
+    # Error terms
+    errors = running_mean(np.column_stack([res.i_e_z_0, res.i_e_z_1,
+                                           res.i_e_w_0, res.i_e_w_1]))
+    for error in errors.T:
+        plot_line(ax[2][1], timeline, error, lw=0.75)
+    ax[2][1].set_ylim(-10, 10)
+    ax[2][1].set_title('Error terms, $\\epsilon$')
+    ax[2][1].set_xlabel('time step')
+    ax[2][1].set_ylabel('$\\epsilon$')
+    ax[2][1].legend(['$\\epsilon_{z0}$', '$\\epsilon_{z1}$', '$\\epsilon_{w0}$',
+                     '$\\epsilon_{w1}$'], loc='upper right')
+
+    return ax
+
+
+def plot_exteroceptive(res):
+    """ add beliefs, free energy and errors of the exteroceptive layer """
+    ax = plot_interoceptive(res)
+
+    timeline = res.time
+
+    plot_line(ax[0][1], timeline, res.ex_mu[1:], ls='--')
+    ax[0][1].legend(['$\\mu_i$', "$\\mu_i'$", "$\\mu_i''$",
+                     "$\\mu_e$"], loc='upper right')
+
+    plot_line(ax[1][1], timeline, running_mean(res.vfe_i, 5), lw=1, c='tab:red')
+    plot_line(ax[1][1], timeline, running_mean(res.vfe_ex), lw=1, c='tab:pink')
+    ax[1][1].legend(['$F$', '$F_i$', '$F_e$'], loc='upper right')
+    ax[1][1].set_ylim(-10, 200)
+
+    plot_line(ax[2][1], timeline, running_mean(res.ex_e_z_0), lw=0.75)
+    ax[2][1].legend(['$\\epsilon^{z0}_i$', '$\\epsilon^{z1}_i$', '$\\epsilon^{w0}_i$',
+                     '$\\epsilon^{w1}_i$', '$\\epsilon^{z0}_e$'], loc='upper right')
+    ax[2][1].set_ylim(-5, 5)
+
+    return ax
+
+
+def plot_active_exteroceptive(res):
+    """ add beliefs, errors and free energy of the active exteroceptive layer
+        and light change produced by the action and the external force """
+    ax = plot_exteroceptive(res)
+
+    timeline = res.time
+
+    # change in light
+    plot_line(ax[0][1], timeline, res.aex_mu[1:], ls='--')
+    ax[0][1].legend(['$\\mu_i$', "$\\mu_i'$", "$\\mu_i''$",
+                     "$\\mu_e$", '$\\mu_a$'], loc='upper right')
+
+    errors = running_mean(np.column_stack([res.aex_e_z_0[1:], res.aex_e_w_0[1:]]))
+    for error in errors.T:
+        plot_line(ax[2][1], timeline, error, lw=0.75)
+    ax[2][1].legend(['$\\epsilon^{z0}_i$', '$\\epsilon^{z1}_i$', '$\\epsilon^{w0}_i$',
+                     '$\\epsilon^{w1}_i$', '$\\epsilon^{z0}_e$',
+                     '$\\epsilon^{z0}_a$', '$\\epsilon^{w0}_a$'],
+                    loc='upper right',
+                    labelspacing=0)
+    ax[2][1].set_ylim(-3.5, 3.5)
+
+    # change in light produced by the external force (the current)
+    light_change_external = np.r_[0, res.forcing['current']]
+    current = light_change_external[1:] != 0
+
+    # environmental change in light (e.g. modelled sunset/sunrise)
+    # is all change in light minus change in light generated by the agent's action
+    # and generated by the external force dragging agent closer to surface
+    light_change_env = np.array(res.light_change) - np.array(res.velocity_action) \
+        - light_change_external
+
+    # action  produced by the organism (including environmental noise)
+    plot_line(ax[2][0], timeline, running_mean(res.velocity_action[1:]), lw=0.75)
+    plot_line(ax[2][0], timeline, light_change_env[1:], lw=1, c='tab:red', ls='--')
+    plot_line(ax[2][0], timeline[current], light_change_external[1:][current], lw=1, c='tab:green')
+    ax[2][0].legend(['total, $\\dot{L}$', 'action, $\\dot{L}_a$',
+                     'env-t, $\\dot{L}_e$', 'external'],
+                    loc='lower right')
+
+    plot_line(ax[1][1], timeline, running_mean(res.vfe_aex), lw=1, c="tab:orange")
+    ax[1][1].legend(['$F$', '$F_i$', '$F_e$', '$F_a$'])
+    ax[1][1].set_ylim(-5, 175)
+
+    return ax
+
+
+def plot_result(res):
+    """ plot the result of a simulation of any of the agents """
+    if issubclass(res.agent_cls, ActiveExteroceptiveAgent):
+        return plot_active_exteroceptive(res)
+    if issubclass(res.agent_cls, ExteroceptiveAgent):
+        return plot_exteroceptive(res)
+    return plot_interoceptive(res)
+
+
+def show_result(res):
+    """ plot the result of a simulation and show the figure """
+    plt.ion()
+    ax = plot_result(res)
+    plt.show()
+    return ax
@@ -0,0 +1,113 @@
+# populations of agents living together in one shared world.
+# The forcing of the world is evaluated once per step and broadcast to all
+# agents, every agent has its own movement and body temperature,
+# and all agents advance in one vectorized step of the batch engine
+import numpy as np
+
+from batch import BatchAgent, SHARED as BATCH_SHARED
+from noise import PopulationNoise
+from simulation import ActiveExteroceptiveAgent
+from world import SharedWorld
+
+
+# parameters of the constructors of the agents that all agents of a population share
+SHARED = BATCH_SHARED + ('simulate_current',)
+
+
+class Population(BatchAgent):
+    """n agents of `agent_cls` in one shared world of the `schedule`
+       (the default scenario of the agents if None), for populations
+       of 10^4 - 10^5 agents.
+
+       Parameters are either one value for all agents or a sequence with
+       a value per agent (except for those in SHARED). One scalar agent gives
+       the defaults and the shared parameters, the parameters that differ are
+       set as arrays directly. The noise of all agents is drawn from the streams
+       of the population's `seed` (see PopulationNoise): agents of a population
+       don't reproduce scalar agents as those of a BatchAgent do, but the noise
+       does not grow with a generator per agent.
+
+       By default nothing is recorded per step, as the trajectories of all agents
+       take steps x agents x variables values; summary statistics (`stats=True`)
+       or a `record_every` / `record_window` keep the memory bounded."""
+
+    def __init__(self, agent_cls=ActiveExteroceptiveAgent, n=1000, seed=None, schedule=None,
+                 **kwargs):
+        varying = {}
+        for name, value in kwargs.items():
+            if np.ndim(value) == 1:
+                if len(value) != n:
+                    raise ValueError(f'{name} has {len(value)} values for {n} agents')
+                if name in SHARED:
+                    raise ValueError(f'{name} must be the same for all agents of a population')
+                varying[name] = value
+
+        # the agent of the first values of the parameters
+        agent = agent_cls(seed=seed, schedule=schedule,
+                          **{name: value[0] if name in varying else value
+                             for name, value in kwargs.items()})
+        self.world = SharedWorld(agent.schedule or agent.default_schedule(), agent.dt)
+        self.set_agents([agent] * n)
+        if varying:
+            self.set_params(agent, varying, kwargs)
+
+    def new_noise(self):
+        # one seed for the population
+        return PopulationNoise(self.seed[0], self.n)
+
+    def reset(self, steps=0, record_every=1, record_window=None):
+        super().reset(steps, record_every, record_window)
+        self.world.reset()
+
+    def compile_forcing(self, steps):
+        self.world.compile(steps, start=self.step)
+
+    def forcing_now(self, name):
+        # the same forcing for all agents
+        return np.broadcast_to(getattr(self.world, name), self.n)
+
+    def update_world(self):
+        self.world.advance(self.step)
+        super().update_world()
+
+    def upd_light_change(self):
+        now = self.now
+        # light change of the environment is shared
+        light_change_environment = self.world.light_change_environment
+        now.light_change_environment = np.broadcast_to(light_change_environment, self.n)
+        now.light_change_movement = now.velocity
+        now.light_change = light_change_environment + now.light_change_movement
+
+    def simulate(self, sim_time=None, act_time=50, record_every=1, record_window=0,
+                 profile=False, survival=False, stats=None, record_names=None,
+                 record_dtype=np.float32):
+        """ simulate all agents in their world, see BatchAgent.simulate;
+            nothing is recorded per step by default """
+        return super().simulate(sim_time, act_time, record_every, record_window,
+                                profile, survival, stats, record_names, record_dtype)
+
+    def restore(self, checkpoint):
+        """ start all agents from the state of a scalar agent of the same class
+            in a checkpoint (see checkpoint.py): the values of its variables,
+            its step and its world, with the noise of the population's seed,
+            e.g. to branch a population off a running simulation.
+            Continue the simulation with `resume()` """
+        if checkpoint.agent_cls is not self.agent_cls or checkpoint.dt != self.dt:
+            raise ValueError('a population continues checkpoints of agents '
+                             'of its class and dt')
+
+        for name in vars(self.now):
+            setattr(self.now, name, np.full(self.n, checkpoint.state[name], dtype=float))
+
+        self.step = checkpoint.step
+        self.steps = checkpoint.steps
+        self.act_time = checkpoint.act_time
+        self.death_step = np.full(self.n, checkpoint.death_step)
+        self.death_cause = np.full(self.n, checkpoint.death_cause, dtype=object)
+        self.noise = self.new_noise()
+        # the light change of the shared world continues from that of the agent
+        self.world.light_change_environment = checkpoint.state['light_change_environment']
+
+        # nothing is recorded before the continuation
+        self.recorder = self.new_recorder(0, first_step=self.step)
+        self.stats = None
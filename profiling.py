@@ -0,0 +1,140 @@
+# opt-in profiling of the phases of a simulation step.
+# The phases of an agent are timed by wrapping its methods on the instance
+# only while a profiler is attached, so the simulation costs nothing extra
+# when it is not profiled
+from time import perf_counter
+
+# phases of a simulation step and the methods of the agents they time.
+# The sub-phases of active inference are included in its time
+PHASES = {
+    'update_world': ('update_world',),
+    'upd_velocity': ('upd_velocity',),
+    'upd_field': ('upd_field',),
+    'upd_temp_change': ('upd_temp_change', 'upd_temp_change_exact'),
+    'upd_temp': ('upd_temp',),
+    'upd_light_change': ('upd_light_change',),
+    'generate_senses': ('generate_senses',),
+    'active_inference': ('active_inference',),
+    'exteroception': ('exteroception',),
+    'interoception': ('interoception',),
+    'active_exteroception': ('active_exteroception',),
+    'upd_vfe': ('upd_vfe',),
+    'upd_action': ('upd_action',),
+    'plotting': ('show_result',),
+    # the whole step, including the recording of the state
+    'step': ('advance',),
+}
+
+# hooks called by every profiler with (agent, phase, seconds)
+# after each timed call, and with the phase 'run' when the profiler finishes
+_hooks = []
+
+
+def add_hook(hook):
+    """ register a hook, e.g. an exporter of the timings to an external profiler """
+    _hooks.append(hook)
+    return hook
+
+
+def remove_hook(hook):
+    _hooks.remove(hook)
+
+
+class PhaseProfiler:
+    """Cumulative wall time and number of calls of each phase
+       of the simulation of an agent (a single agent or a BatchAgent).
+
+       Times the phases from its creation until `finish()`, which
+       restores the agent and returns the report of the run, e.g.
+           profiler = PhaseProfiler(agent)
+           agent.simulate(plot=False)
+           report = profiler.finish()
+       or simply `agent.simulate(profile=True).profile`."""
+
+    def __init__(self, agent, hooks=()):
+        self.agent = agent
+        self.hooks = list(_hooks) + list(hooks)
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+
+        self.wrapped = []
+        for phase, methods in PHASES.items():
+            for name in methods:
+                if hasattr(type(agent), name):
+                    setattr(agent, name, self.timed(phase, getattr(agent, name)))
+                    self.wrapped.append(name)
+
+        self.start = perf_counter()
+
+    def timed(self, phase, method):
+        seconds, calls, hooks, agent = self.seconds, self.calls, self.hooks, self.agent
+
+        def timed_method(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                seconds[phase] += elapsed
+                calls[phase] += 1
+                for hook in hooks:
+                    hook(agent, phase, elapsed)
+
+        return timed_method
+
+    def finish(self):
+        """ stop timing the agent and return the report of the run """
+        total = perf_counter() - self.start
+        for name in self.wrapped:
+            del self.agent.__dict__[name]
+        self.wrapped = []
+
+        for hook in self.hooks:
+            hook(self.agent, 'run', total)
+
+        return self.report(total)
+
+    def report(self, total=None):
+        """ report of the run: the agent, its integrator, the number of steps
+            and the seconds and number of calls of each phase that was called """
+        agent = self.agent
+        agent_cls = getattr(agent, 'agent_cls', type(agent))
+        return {
+            'agent': agent_cls.__name__,
+            'engine': type(agent).__name__,
+            'integrator': getattr(agent, 'integrator', None),
+            'steps': self.calls['step'],
+            'seconds': perf_counter() - self.start if total is None else total,
+            'phases': {phase: {'seconds': self.seconds[phase], 'calls': self.calls[phase]}
+                       for phase in PHASES if self.calls[phase]},
+        }
+
+
+def format_reports(*reports):
+    """ table of the time per step (in microseconds) of each phase,
+        with a column per report to compare agents and engines """
+    names = []
+    for report in reports:
+        name = report['agent']
+        if report['engine'] != name:
+            name = f"{report['engine']}({name})"
+        names.append(f"{name}/{report['integrator']}")
+    phases = [phase for phase in PHASES
+              if any(phase in report['phases'] for report in reports)]
+
+    width = max([len(name) for name in names] + [12])
+    lines = [' ' * 22 + ''.join(name.rjust(width + 2) for name in names)]
+    for phase in phases + ['run']:
+        cells = []
+        for report in reports:
+            if phase == 'run':
+                seconds = report['seconds']
+            elif phase in report['phases']:
+                seconds = report['phases'][phase]['seconds']
+            else:
+                cells.append('-'.rjust(width + 2))
+                continue
+            cells.append(f"{seconds / max(report['steps'], 1) * 1e6:{width + 2}.2f}")
+        lines.append(phase.ljust(22) + ''.join(cells))
+
+    return '\n'.join(lines)
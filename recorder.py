@@ -0,0 +1,159 @@
+# recording of simulated trajectories into preallocated arrays
+from operator import attrgetter
+
+import numpy as np
+
+
+class State:
+    """ current values of the simulated variables, one attribute per variable.
+        The order of the attributes is the order in which they were set """
+
+    def copy(self):
+        state = State()
+        vars(state).update(vars(self))
+        return state
+
+
+class Recorder:
+    """Preallocated trajectories of the variables of a state.
+
+       Trajectories are stored in one array of `dtype` with a row per recorded
+       step (row 0 holds the initial values) and a column per variable
+       (all variables of the state, or only the `names`),
+       `shape` being the shape of each variable (e.g. (N,) for a batch).
+       Variables that are not in `from_start` have no initial value and
+       their trajectories start from the first step.
+
+       Only every `every`-th step is recorded, and with a `window` only
+       the last `window` recorded steps are kept (in a ring buffer,
+       none for a window of 0), so that the memory does not grow with the
+       number of steps. The initial values are always kept.
+
+       A recorder of a continued simulation starts at the step `first_step`."""
+
+    def __init__(self, state, steps, from_start=(), shape=(), every=1, window=None,
+                 first_step=0, names=None, dtype=float):
+        if names is None:
+            names = list(vars(state))
+        missing = [name for name in names if not hasattr(state, name)]
+        if missing:
+            raise ValueError(f'the state has no variables {missing} to record')
+
+        self.names = list(names)
+        self.columns = {name: i for i, name in enumerate(self.names)}
+        # the values of the variables of a state, in the order of the columns
+        self.getter = attrgetter(*self.names)
+        self.from_start = set(from_start) & set(self.names)
+        self.shape = shape
+        self.every = every
+        self.window = window
+        self.first_step = first_step
+
+        if window is None:
+            if steps is None:
+                raise ValueError('recording of an unbounded number of steps needs a window')
+            rows = steps // every
+        else:
+            rows = window
+
+        self.data = np.full((rows + 1, len(self.names)) + tuple(shape), np.nan, dtype=dtype)
+        # step cursor -- the number of steps passed to the recorder
+        self.step = 0
+        # number of recorded steps, including the ones no longer kept
+        self.count = 0
+        self.data[0] = self.getter(state)
+
+    @property
+    def capacity(self):
+        return len(self.data) - 1
+
+    def record(self, state):
+        """ record the state of the next time step """
+        self.step += 1
+        if self.step % self.every:
+            return
+
+        if self.window is None:
+            row = self.count + 1
+        elif self.window:
+            row = self.count % self.window + 1
+        else:
+            self.count += 1
+            return
+
+        self.data[row] = self.getter(state)
+        self.count += 1
+
+    def fill(self, state, steps):
+        """ record the same state for the next `steps` time steps """
+        first = self.step
+        self.step += steps
+        # the recorded ones of them
+        recorded = self.step // self.every - first // self.every
+        if self.window is None:
+            rows = slice(self.count + 1, self.count + recorded + 1)
+        elif self.window:
+            kept = min(recorded, self.window)
+            rows = (self.count + recorded - kept + np.arange(kept)) % self.window + 1
+        else:
+            rows = slice(0)
+
+        self.data[rows] = self.getter(state)
+        self.count += recorded
+
+    def kept_rows(self):
+        """ indices of the kept rows after the initial one, in the order of steps """
+        if self.window is None:
+            return slice(1, self.count + 1)
+
+        kept = min(self.count, self.window)
+        return (self.count - kept + np.arange(kept)) % max(self.window, 1) + 1
+
+    def recorded_steps(self):
+        """ numbers of steps of the kept rows after the initial one """
+        kept = self.count if self.window is None else min(self.count, self.window)
+        return (self.count - kept + 1 + np.arange(kept)) * self.every + self.first_step
+
+    def column(self, name):
+        """ all rows of the variable """
+        return self.data[:, self.columns[name]]
+
+    def view(self, name):
+        """ read-only trajectory of the variable recorded so far.
+            It is a view on the recorded data unless the data is in a ring buffer """
+        column = self.column(name)
+        rows = self.kept_rows()
+        if isinstance(rows, slice):
+            start = 0 if name in self.from_start else 1
+            values = column[start:rows.stop]
+        else:
+            values = column[rows]
+            if name in self.from_start:
+                values = np.concatenate([column[:1], values])
+
+        values.flags.writeable = False
+        return values
+
+    def mask_after(self, steps):
+        """ set the recorded values after the given step of each
+            of the agents of a batch (one step per agent) to NaN """
+        rows = self.kept_rows()
+        if isinstance(rows, slice):
+            rows = np.arange(rows.start, rows.stop)
+
+        row, agent = np.nonzero(self.recorded_steps()[:, None] > np.asarray(steps))
+        self.data[rows[row], :, agent] = np.nan
+
+
+class CompactRecorder(Recorder):
+    """Recorder of only the variables `names` of the state, in float32
+       by default, for batches of many agents, whose trajectories are limited
+       by the memory and its bandwidth. The state itself is not changed,
+       the variables are only rounded to the dtype when they are recorded.
+       Only the recording shrinks: the state of the agents, their noise
+       streams and the temporaries of a step take the same memory."""
+
+    def __init__(self, state, steps, from_start=(), shape=(), every=1, window=None,
+                 first_step=0, names=('temp', 'temp_desire', 'vfe'), dtype=np.float32):
+        super().__init__(state, steps, from_start, shape, every, window, first_step,
+                         names, dtype)
@@ -0,0 +1,107 @@
+# results of simulations and their summary metrics
+import numpy as np
+
+
+def summarize(res):
+    """ summary metrics of recorded trajectories.
+        Works for a single run as well as for a batch of runs,
+        where trajectories have the shape (time steps, agents).
+        Only the recorded steps are summarized, each standing for
+        the steps up to the next recorded one """
+    death_step = np.asarray(res.death_step)
+    # time of the death of the agent, when the temperature left
+    # the viable range for the first time (NaN if it never did)
+    death_time = np.where(death_step >= 0, death_step * res.dt, np.nan)[()]
+
+    if not len(res.vfe):
+        # nothing recorded
+        return {'death_time': death_time}
+
+    # time between the recorded steps
+    dt = res.dt * res.recorder.every
+    temp = res.temp[1:]
+    deviation = np.abs(temp - res.temp_viable_mean)
+
+    metrics = {
+        'temp_min': np.min(temp, axis=0),
+        'temp_max': np.max(temp, axis=0),
+        # fraction of time the temperature was within the viable range
+        'time_viable': np.mean(deviation <= res.temp_viable_range, axis=0),
+        # how far the temperature was from the desired one
+        'temp_error': np.mean(np.abs(temp - res.temp_desire[1:]), axis=0),
+        'vfe_mean': np.mean(res.vfe, axis=0),
+        # free energy integrated over time
+        'vfe_total': np.sum(res.vfe, axis=0) * dt,
+        # energy of the interoceptive action
+        'action_energy': np.sum(np.square(res.temp_change_action[1:]), axis=0) * dt,
+        'death_time': death_time,
+    }
+
+    aex_action = getattr(res, 'aex_action', None)
+    if aex_action is not None:
+        # energy of the action on the world
+        metrics['aex_action_energy'] = np.sum(np.square(aex_action[1:]), axis=0) * dt
+
+    return metrics
+
+
+class SimulationResult:
+    """Result of a simulation of an agent.
+
+       Holds the time axis `time`, the recorded trajectories (available
+       under the names of the variables, e.g. `result.temp`), the parameters
+       of the agent, the forcing of its world and summary `metrics` of the run.
+       Plotting is a separate step: `result.plot()`."""
+
+    def __init__(self, agent_cls, params, recorder, dt, act_time, forcing,
+                 temp_viable_mean, temp_viable_range, death_step=-1, death_cause=None,
+                 stats=None):
+        self.agent_cls = agent_cls
+        self.params = params
+        self.recorder = recorder
+
+        self.dt = dt
+        self.act_time = act_time
+        # forcing of the world at each recorded step (see world.py)
+        self.forcing = forcing
+        self.temp_viable_mean = temp_viable_mean
+        self.temp_viable_range = temp_viable_range
+
+        # the step after which the temperature left the viable range
+        # (-1 if it never did) and the cause: 'cold', 'hot' or 'diverged'
+        self.death_step = death_step
+        self.death_cause = death_cause
+        self.death_time = death_step * dt if death_step >= 0 else None
+
+        self.steps = recorder.step
+        # time at the start of each recorded step
+        self.time = (recorder.recorded_steps() - 1) * dt
+
+        self.metrics = summarize(self)
+        # summary statistics updated during the simulation (see online.py), if kept
+        self.stats = stats
+        # time spent in the phases of the simulation, if it was profiled
+        self.profile = None
+        # steps (first, end) filled with the equilibrium by a fast-forward
+        self.compressed = []
+
+    @property
+    def names(self):
+        """ names of the recorded variables """
+        return self.recorder.names
+
+    def __getattr__(self, name):
+        recorder = self.__dict__.get('recorder')
+        if recorder is None or name not in recorder.columns:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        return recorder.view(name)
+
+    def trajectories(self):
+        """ all recorded trajectories by the names of the variables """
+        return {name: self.recorder.view(name) for name in self.names}
+
+    def plot(self):
+        """ plot the result (requires matplotlib) """
+        from plotting import plot_result
+        return plot_result(self)
@@ -0,0 +1,143 @@
+# sensitivity of the outcomes of the simulations (survival, free energy, ...)
+# to the parameters of the agents: local derivatives by central finite
+# differences and global variance-based (Sobol) indices. All parameter sets
+# are simulated with the same seeds (common random numbers), so that the
+# differences between them are not drowned in the noise
+import numpy as np
+
+from optimize import simulate_metrics
+
+
+def survival(metrics):
+    """ whether the agent survived, its temperature never left the viable range """
+    return np.isnan(np.asarray(metrics['death_time'], dtype=float)).astype(float)
+
+
+def time_viable(metrics):
+    """ fraction of time the temperature was within the viable range """
+    return metrics['time_viable']
+
+
+def temp_error(metrics):
+    """ mean |temp - temp_desire| """
+    return metrics['temp_error']
+
+
+def vfe_total(metrics):
+    """ free energy integrated over time """
+    return metrics['vfe_total']
+
+
+METRICS = {
+    'survival': survival,
+    'time_viable': time_viable,
+    'temp_error': temp_error,
+    'vfe_total': vfe_total,
+}
+
+
+class Sensitivity:
+    """Sensitivity of summary metrics of simulations of `agent_cls` to the parameters
+       in `space`, {name: (low, high)} of positive values, e.g.
+           Sensitivity(ActiveExteroceptiveAgent, {'i_s_z_1': (0.05, 0.2),
+                                                  'learn_r_a': (0.05, 0.2)})
+
+       `metrics` are names in METRICS or of the metrics of results.summarize.
+       Every parameter set is simulated with all `seeds` (common random
+       numbers) and its metrics are the means over them. The runs are
+       simulated as batches of at most `batch_size` agents (`engine='batch'`)
+       or over a process pool (`engine='pool'`), see optimize.simulate_metrics.
+       `params` are fixed parameters of the agents and `sim_kwargs` are passed
+       to simulate()."""
+
+    def __init__(self, agent_cls, space, metrics=('survival', 'time_viable', 'temp_error',
+                                                  'vfe_total'),
+                 seeds=range(8), engine='batch', batch_size=256, processes=None,
+                 params=None, sim_kwargs=None, seed=0):
+        self.agent_cls = agent_cls
+        self.names = list(space)
+        self.low = np.log([space[name][0] for name in self.names])
+        self.high = np.log([space[name][1] for name in self.names])
+        self.metrics = {name: METRICS.get(name, lambda metrics, name=name: metrics[name])
+                        for name in metrics}
+
+        self.seeds = list(seeds)
+        if engine not in ('batch', 'pool'):
+            raise ValueError(f"unknown engine '{engine}', use 'batch' or 'pool'")
+        self.engine = engine
+        self.batch_size = batch_size
+        self.processes = processes
+        self.params = params or {}
+        self.sim_kwargs = sim_kwargs or {}
+        self.rng = np.random.default_rng(seed)
+
+    def evaluate(self, points):
+        """ metrics of the parameter sets `points` (points x parameters),
+            the means over the seeds: {metric: values of the points} """
+        candidates = [dict(zip(self.names, point)) for point in np.asarray(points).tolist()]
+        metrics = simulate_metrics(self.agent_cls, candidates, self.seeds, self.engine,
+                                   self.batch_size, self.processes, self.params,
+                                   self.sim_kwargs)
+        return {name: np.asarray(metric(metrics), dtype=float)
+                .reshape(len(candidates), len(self.seeds)).mean(axis=1)
+                for name, metric in self.metrics.items()}
+
+    def gradient(self, at=None, step=0.05):
+        """Derivatives of the metrics with respect to every parameter at the
+           parameters `at` ({name: value}, the geometric center of the space
+           by default) by central finite differences with a relative `step`.
+           All 2 x parameters perturbed copies are simulated together.
+           Returns {metric: {parameter: {'gradient': df/dx, 'elasticity': x/f df/dx}}}"""
+        center = np.exp((self.low + self.high) / 2)
+        if at is not None:
+            center = np.array([at.get(name, value) for name, value in zip(self.names, center)])
+
+        h = step * center
+        shift = np.diag(h)
+        points = np.concatenate([center + shift, center - shift, center[None]])
+        values = self.evaluate(points)
+
+        d = len(self.names)
+        gradients = {}
+        for metric, f in values.items():
+            gradient = (f[:d] - f[d:2 * d]) / (2 * h)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                elasticity = gradient * center / f[-1]
+            gradients[metric] = {name: {'gradient': float(g), 'elasticity': float(e)}
+                                 for name, g, e in zip(self.names, gradient, elasticity)}
+        return gradients
+
+    def sobol(self, samples=128):
+        """First-order and total Sobol indices of the metrics for the parameters
+           drawn log-uniformly from the space: the fraction of the variance
+           of a metric caused by a parameter alone and together with the others.
+           The `samples` x (parameters + 2) points of the estimators of Saltelli
+           and Jansen are simulated together. The indices of a metric that is
+           the same for all points (e.g. the survival when all agents survive) are 0.
+           Returns {metric: {parameter: {'first': S, 'total': ST}}}"""
+        d = len(self.names)
+        a = self.low + (self.high - self.low) * self.rng.random((samples, d))
+        b = self.low + (self.high - self.low) * self.rng.random((samples, d))
+        # A with the column i of B, for every parameter i
+        ab = np.repeat(a[None], d, axis=0)
+        ab[np.arange(d), :, np.arange(d)] = b.T
+
+        points = np.exp(np.concatenate([a, b, ab.reshape(d * samples, d)]))
+        values = self.evaluate(points)
+
+        indices = {}
+        for metric, f in values.items():
+            # centered, for estimators of a lower variance
+            f = f - np.mean(f[:2 * samples])
+            f_a, f_b = f[:samples], f[samples:2 * samples]
+            f_ab = f[2 * samples:].reshape(d, samples)
+            variance = np.var(np.concatenate([f_a, f_b]))
+            if variance == 0:
+                # a constant metric, which no parameter changes
+                first = total = np.zeros(d)
+            else:
+                first = np.mean(f_b * (f_ab - f_a), axis=1) / variance
+                total = 0.5 * np.mean(np.square(f_a - f_ab), axis=1) / variance
+            indices[metric] = {name: {'first': float(s), 'total': float(st)}
+                               for name, s, st in zip(self.names, first, total)}
+        return indices
@@ -1,19 +1,22 @@
 # a simple agent using dynamical generative model of FEP
 # that can control it's own temperature
 # directly
-import numpy as np
-from matplotlib import pyplot as plt
-
-from utils import running_mean
+import math
 
+import numpy as np
 
-def get_noise(scale=0.1, positive=False):
-    """ Simulate noise with the mean at 0 and the standard deviation of 0.1 """
-    noise = np.random.normal() * scale
-    if positive:
-        noise = np.abs(noise)
+from checkpoint import Checkpoint
+from exact import (active_exteroceptive_transition, exteroceptive_transition,
+                   interoceptive_transition, world_transition)
+from noise import Noise
+from online import OnlineStats
+from profiling import PhaseProfiler
+from recorder import Recorder, State
+from results import SimulationResult
+from world import Schedule, current_after, sunset, temperature_drops
 
-    return noise
+# number of steps the forcing of the world is compiled for at once in unbounded runs
+FORCING_CHUNK = 100000
 
 
 class InteroceptiveAgent:
@@ -23,7 +26,8 @@ class InteroceptiveAgent:
                  action_bound=6, temp_const_change_initial=0,
                  learn_r_a=None,
                  temp_viable_range=10, dt=0.1, learn_r=0.1,
-                 simulate_current=False):
+                 simulate_current=False, seed=None, integrator='euler',
+                 schedule=None, field=None):
         # sigma (variances) of sensory noise (z) and model noise (w)
         self.i_s_z_0 = i_s_z_0
         self.i_s_z_1 = i_s_z_1
@@ -48,134 +52,189 @@ class InteroceptiveAgent:
         # if the current should be simulated
         self.simulate_current = simulate_current
 
+        # scenario of the world, the default one of the agent if not set
+        self.schedule = schedule
+        # world over depth and time (a DepthField), where the temperature change
+        # and the light change of the environment depend on the depth of the agent
+        # instead of the schedule (its current still flows)
+        self.field = field
+
+        # seed of the noise, every simulation with the same seed
+        # gets the same noise (a new one each time if not set)
+        self.seed = seed
+
+        # integration of the linear dynamics: 'euler' or 'exact',
+        # the latter allowing for much larger dt (see exact.py)
+        if integrator not in ('euler', 'exact'):
+            raise ValueError(f"unknown integrator '{integrator}', use 'euler' or 'exact'")
+        self.integrator = integrator
+
         self.reset()
 
-    def reset(self):
+    def reset(self, steps=0, record_every=1, record_window=None):
+        """ set the initial state of the agent and its world and
+            allocate the recorder of trajectories for the given number of steps
+            (see Recorder for recording every few steps or only the last ones) """
+        # current values of the variables and their values at the previous step
+        self.now = State()
+        self.from_start = set()
+        self.init_state()
+        self.prev = self.now.copy()
+
+        self.recorder = Recorder(self.now, steps, self.from_start,
+                                 every=record_every, window=record_window)
+
+        # noise streams, created when a simulation starts
+        # (agents only used to build batches never allocate them)
+        self.noise = None
+
+    def exact_transitions(self):
+        """ exact discrete-time transitions of the linear dynamics for dt
+            (cached for the same parameters) """
+        return {
+            'world': world_transition(self.dt),
+            'interoception': interoceptive_transition(
+                self.dt, self.learn_r, self.i_s_z_0, self.i_s_z_1, self.i_s_w_0, self.i_s_w_1),
+        }
+
+    def track(self, name, initial=None):
+        """ add a variable to the state of the agent.
+            Variables without an initial value are recorded starting from the first step """
+        setattr(self.now, name, np.nan if initial is None else initial)
+        if initial is not None:
+            self.from_start.add(name)
+
+    def init_state(self):
         # errors
-        self.i_e_z_0 = []
-        self.i_e_z_1 = []
-        self.i_e_w_0 = []
-        self.i_e_w_1 = []
+        self.track('i_e_z_0')
+        self.track('i_e_z_1')
+        self.track('i_e_w_0')
+        self.track('i_e_w_1')
 
         # senses
-        self.sense_i = []
-        self.sense_i_d1 = []
+        self.track('sense_i')
+        self.track('sense_i_d1')
 
         # world
         # >> temperature params
         # start with temperature at T0
-        self.temp = [self.T0]
+        self.track('temp', self.T0)
         # overall change of temperature
-        self.temp_change = [0]
+        self.track('temp_change', 0)
         # change of agent's temperature, generated by the environment
-        self.temp_change_environment = [self.temp_change_environment_initial]
-        self.temp_change_instant_update = [0]
+        self.track('temp_change_environment', self.temp_change_environment_initial)
+        self.track('temp_change_instant_update', 0)
         # change of temperature, generated by the action
-        self.temp_change_action = [0]
+        self.track('temp_change_action', 0)
         # >> light params
         # overall light
-        self.light_change = [0]
+        self.track('light_change', 0)
         # light change generated by the environment
-        self.light_change_instant = [0]
-        self.light_change_environment = [0]
+        self.track('light_change_instant', 0)
+        self.track('light_change_environment', 0)
         # light change generated by the movement
-        self.light_change_movement = []
-        # sense of light
-        self.ex_sense = []
+        self.track('light_change_movement')
         # >> movement params
-        self.velocity_action = [0]
-        self.velocity = [0]
+        self.track('velocity_action', 0)
+        self.track('velocity', 0)
+        if self.field is not None:
+            # >> depth params
+            self.track('depth', self.field.depth_initial)
+            self.track('light', self.field.sample(self.field.light, self.field.depth_initial, 0))
 
         # action (interoceptive)
-        # temperature change set by action
-        self.temp_relative_change = [0]
-        self.temp_desire = [self.temp_viable_mean]
+        self.track('temp_desire', self.temp_viable_mean)
 
         # brain state mu
-        self.mu_i = [0]
-        self.mu_i_d1 = [0]
-        self.mu_i_d2 = [0]
+        self.track('mu_i', 0)
+        self.track('mu_i_d1', 0)
+        self.track('mu_i_d2', 0)
 
         # variational free energy
         # on the interoceptive layer
-        self.vfe_i = []
+        self.track('vfe_i')
         # total
-        self.vfe = []
+        self.track('vfe')
+
+    def __getattr__(self, name):
+        # trajectories of the variables are available as read-only arrays
+        # under the names of the variables
+        recorder = self.__dict__.get('recorder')
+        if recorder is None or name not in recorder.columns:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        return recorder.view(name)
 
     def generate_senses(self):
         self.generate_sense()
         self.generate_sense_d1()
 
     def generate_sense(self):
-        sense = self.temp[-1] + get_noise()
-        self.sense_i.append(sense)
+        self.now.sense_i = self.now.temp + self.noise('sense_i')
 
     def generate_sense_d1(self):
         """ change in sensation is felt change in temperature """
-        sense_i_d1 = self.temp_change[-1] + get_noise()
-
-        self.sense_i_d1.append(sense_i_d1)
-
-    def update_world(self):
-        """ update world parameters """
+        self.now.sense_i_d1 = self.now.temp_change + self.noise('sense_i_d1')
 
+    def default_schedule(self):
+        """ scenario of the world of the agent """
         # an agent lives in the water world where
         # a temperature changes at each timestep
         # at some time this rate of change can be adjusted
+        schedule = Schedule(temp_change=temperature_drops())
 
-        if self.time == 50:
-            # jump to 2
-            new_temp_chage_desired = 3
-        elif self.time == 100:
-            # jump to 5
-            new_temp_chage_desired = 5
-        elif self.time == 150:
-            # jump to -1
-            new_temp_chage_desired = -1
-        elif self.time == 200:
-            # jump to -6
-            new_temp_chage_desired = -6.2
-        elif self.time == 250:
-            # jump to 0
-            new_temp_chage_desired = 0
-        else:
-            new_temp_chage_desired = self.temp_change_environment[-1]
+        # simulate external force -- current after time step 300
+        # (still water without it, the action stays noisy until then, see update_world)
+        schedule.current = current_after(300, 0.1 if self.simulate_current else 0)
+
+        return schedule
+
+    def update_world(self):
+        """ update world parameters from the compiled schedule """
+        now = self.now
+
+        new_temp_chage_desired = self.forcing['temp_change'][self.step - self.forcing_start]
+        if math.isnan(new_temp_chage_desired):
+            new_temp_chage_desired = now.temp_change_environment
 
         temp_change_instant_update = new_temp_chage_desired - \
-            self.temp_change_environment[-1]
+            now.temp_change_environment
 
-        self.temp_change_instant_update.append(temp_change_instant_update)
+        now.temp_change_instant_update = temp_change_instant_update
+
+        now.light_change_instant = self.forcing['light_change'][self.step - self.forcing_start]
 
     def upd_velocity(self):
-        velocity = self.velocity_action[-1]
+        velocity = self.now.velocity_action
 
-        # simulate external force -- current after time step 300
-        if self.simulate_current and self.time > 300:
-            velocity += 0.1
+        # external force -- current
+        velocity += self.forcing['current'][self.step - self.forcing_start]
 
-        self.velocity.append(velocity)
+        self.now.velocity = velocity
 
     def upd_light_change(self):
         """ Light change is composed of the light change
         due to the environment and light change due to the movement of the
         agent in the environment (set by its velocity) """
 
+        now = self.now
+
         # light change due to the environment is updated by the
-        light_change_environment = self.light_change_environment[-1]
+        light_change_environment = now.light_change_environment
         # instant change of light (Euler integrated)
-        light_change_environment += self.light_change_instant[-1] * self.dt
-        self.light_change_environment.append(light_change_environment)
+        light_change_environment += now.light_change_instant * self.dt
+        now.light_change_environment = light_change_environment
 
         # the light change due to velocity (Euler integrated)
         # assuming 1:1 relationship
-        self.light_change_movement.append(self.velocity[-1])
+        now.light_change_movement = now.velocity
 
         # combined light change is light change due to environment
-        light_change = self.light_change_environment[-1]
+        light_change = now.light_change_environment
         # and light change due to the movement
-        light_change += self.light_change_movement[-1]
+        light_change += now.light_change_movement
 
-        self.light_change.append(light_change)
+        now.light_change = light_change
 
     def upd_temp_change(self):
         """ Change in temperature or the organism is composed of 
@@ -187,89 +246,145 @@ class InteroceptiveAgent:
         # is affected by instant changes in change in temperature
         # and by movement of the agent
         # by adding velocity effect (Euler integrated)
-        temp_change_environment = self.temp_change_environment[-1]
+        now = self.now
+
+        temp_change_environment = now.temp_change_environment
         # first update by instant change in temperature change (Euler integrating)
-        temp_change_environment += self.temp_change_instant_update[-1]
+        temp_change_environment += now.temp_change_instant_update
         # update movement effect by adding Euler integrated velocity
         # assuming 1:1 relationship
-        temp_change_environment += self.velocity[-1] * self.dt
-        self.temp_change_environment.append(temp_change_environment)
+        temp_change_environment += now.velocity * self.dt
+        now.temp_change_environment = temp_change_environment
 
         # total temperature change is change due to the environment
         # and change produced by the organism
         # add noise
-        action = self.temp_change_action[-1] + get_noise() * self.dt
-        temp_change = self.temp_change_environment[-1] + action
+        action = now.temp_change_action + self.noise('temp_change') * self.dt
+        now.temp_change = now.temp_change_environment + action
 
-        self.temp_change.append(temp_change)
+    def upd_temp_change_exact(self):
+        """ Exact integration of the change in temperature over the time step.
+        The change of temperature is the mean change over the step,
+        so that upd_temp integrates the temperature exactly.
+        """
+        now = self.now
+        Ad, Bd, noise = self.transitions['world']
+
+        # instant change in temperature change happens at the start of the step
+        temp_change_environment = now.temp_change_environment + now.temp_change_instant_update
+        x = Ad @ (temp_change_environment, now.temp) + \
+            Bd @ (now.velocity, now.temp_change_action)
+        temp = x[1] + noise * self.noise('temp_change', scale=1)
+
+        now.temp_change_environment = x[0]
+        now.temp_change = (temp - now.temp) / self.dt
+
+    def upd_field(self):
+        """ depth of the agent and the temperature change and the light change
+            of the environment at it, sampled from the depth field.
+            The temperature change is constant over the step, so that
+            both integrators update the temperature with it """
+        now = self.now
+        field = self.field
+
+        # moving up (positive velocity) decreases the depth
+        depth = now.depth
+        now.depth = depth - now.velocity * self.dt
+
+        now.temp_change_environment = field.sample(field.temp_change, now.depth, self.time)
+        action = now.temp_change_action + self.noise('temp_change') * self.dt
+        now.temp_change = now.temp_change_environment + action
+
+        # light changes over the step at the depth the agent leaves
+        # and with its movement to the new depth
+        end = self.time + self.dt
+        light = field.sample(field.light, depth, end)
+        now.light_change_environment = (light - now.light) / self.dt
+        now.light = field.sample(field.light, now.depth, end)
+        now.light_change_movement = (now.light - light) / self.dt
+        now.light_change = now.light_change_environment + now.light_change_movement
 
     def upd_temp(self):
         # update temperature with the current temperature update
-        upd = self.temp_change[-1]
+        upd = self.now.temp_change
         # Euler integrating it
         upd *= self.dt
 
-        self.temp.append(self.temp[-1] + upd)
+        self.now.temp += upd
 
     def upd_err_z_0(self):
         # error between sensation and generated sensations
-        self.i_e_z_0.append(self.sense_i[-1] - self.mu_i[-1])
+        self.now.i_e_z_0 = self.now.sense_i - self.now.mu_i
 
     def upd_err_z_1(self):
         # error between first derivatives of sensation and generated sensations
-        self.i_e_z_1.append(self.sense_i_d1[-1] - self.mu_i_d1[-1])
+        self.now.i_e_z_1 = self.now.sense_i_d1 - self.now.mu_i_d1
 
     def upd_err_w_0(self):
         # error between model and generation of model
         # here: model of dynamics at 1st derivative
         # and it's generation for the 1st derivative
-        self.i_e_w_0.append(self.mu_i_d1[-1] + self.mu_i[-1] - self.temp_desire[-1])
+        now = self.now
+        now.i_e_w_0 = now.mu_i_d1 + now.mu_i - now.temp_desire
 
     def upd_err_w_1(self):
         # error between model and generation of model
         # here: model of dynamics at 2nd derivative)
         # and it's generation for the 2nd derivative
-        self.i_e_w_1.append(self.mu_i_d2[-1] + self.mu_i_d1[-1])
+        self.now.i_e_w_1 = self.now.mu_i_d2 + self.now.mu_i_d1
 
     def upd_mu_i_d2(self):
-        upd = -self.learn_r * (self.i_e_w_1[-1] / self.i_s_w_1)
+        upd = -self.learn_r * (self.now.i_e_w_1 / self.i_s_w_1)
         upd *= self.dt
 
-        self.mu_i_d2.append(self.mu_i_d2[-1] + upd)
+        self.now.mu_i_d2 += upd
 
     def upd_mu_i_d1(self):
-        upd = -self.learn_r * (-self.i_e_z_1[-1] / self.i_s_z_1 +
-                               self.i_e_w_0[-1] / self.i_s_w_0 + self.i_e_w_1[-1] / self.i_s_w_1)
-        upd += self.mu_i_d2[-2]
+        now = self.now
+        upd = -self.learn_r * (-now.i_e_z_1 / self.i_s_z_1 +
+                               now.i_e_w_0 / self.i_s_w_0 + now.i_e_w_1 / self.i_s_w_1)
+        upd += self.prev.mu_i_d2
         upd *= self.dt
 
-        self.mu_i_d1.append(self.mu_i_d1[-1] + upd)
+        now.mu_i_d1 += upd
 
     def upd_mu_i(self):
+        now = self.now
         upd = -self.learn_r * \
-            (-self.i_e_z_0[-1] / self.i_s_z_0 + self.i_e_w_0[-1] / self.i_s_w_0)
-        upd += self.mu_i_d1[-2]
+            (-now.i_e_z_0 / self.i_s_z_0 + now.i_e_w_0 / self.i_s_w_0)
+        upd += self.prev.mu_i_d1
         upd *= self.dt
 
-        self.mu_i.append(self.mu_i[-1] + upd)
+        now.mu_i += upd
+
+    def upd_mu_i_exact(self):
+        # exact update of all derivatives at once
+        now = self.now
+        Ad, Bd = self.transitions['interoception']
+
+        mu = Ad @ (now.mu_i, now.mu_i_d1, now.mu_i_d2) + \
+            Bd @ (now.sense_i, now.sense_i_d1, now.temp_desire)
+
+        now.mu_i, now.mu_i_d1, now.mu_i_d2 = mu
 
     def upd_vfe_i(self):
         def sqrd_err(err, sigma):
-            return np.power(err, 2) / sigma
+            return err * err / sigma
 
-        vfe_i = 0.5 * (sqrd_err(self.i_e_z_0[-1], self.i_s_z_0) +
-                       sqrd_err(self.i_e_z_1[-1], self.i_s_z_1) +
-                       sqrd_err(self.i_e_w_0[-1], self.i_s_w_0) +
-                       sqrd_err(self.i_e_w_1[-1], self.i_s_w_1))
+        now = self.now
+        vfe_i = 0.5 * (sqrd_err(now.i_e_z_0, self.i_s_z_0) +
+                       sqrd_err(now.i_e_z_1, self.i_s_z_1) +
+                       sqrd_err(now.i_e_w_0, self.i_s_w_0) +
+                       sqrd_err(now.i_e_w_1, self.i_s_w_1))
 
-        self.vfe_i.append(vfe_i)
+        now.vfe_i = vfe_i
 
     def upd_action(self):
         # TODO action is noisy! Add noise here but not forget about integration
         # sensation change over action is always 1
-        upd = -self.learn_r_a * 1 * (self.i_e_z_1[-1] / self.i_s_z_1)
+        upd = -self.learn_r_a * 1 * (self.now.i_e_z_1 / self.i_s_z_1)
         upd *= self.dt
-        action = self.temp_change_action[-1] + upd
+        action = self.now.temp_change_action + upd
 
         # action must be bound by some plausible constraints
         # e.g. temperature can't change more than action bound at each timestep
@@ -277,11 +392,11 @@ class InteroceptiveAgent:
             action = np.sign(action) * self.temp_change_action_bound
 
         # update action
-        self.temp_change_action.append(action)
+        self.now.temp_change_action = action
 
     def upd_no_action(self):
-        # if agent is not acting update it's variables anyway
-        self.temp_change_action.append(self.temp_change_action[-1])
+        # if agent is not acting it's variables keep their values
+        pass
 
     def interoception(self):
         # update interoception
@@ -292,135 +407,302 @@ class InteroceptiveAgent:
         self.upd_err_w_1()
 
         #  --> update recognition dynamics
-        self.upd_mu_i_d2()
-        self.upd_mu_i_d1()
-        self.upd_mu_i()
+        if self.integrator == 'exact':
+            self.upd_mu_i_exact()
+        else:
+            self.upd_mu_i_d2()
+            self.upd_mu_i_d1()
+            self.upd_mu_i()
 
         #  update free energy
         self.upd_vfe_i()
 
     def active_inference(self):
-        self.temp_desire.append(self.temp_viable_mean)
+        self.now.temp_desire = self.temp_viable_mean
         self.interoception()
 
     def upd_vfe(self):
-        self.vfe.append(self.vfe_i[-1])
+        self.now.vfe = self.now.vfe_i
+
+    def get_params(self):
+        """ parameters of the agent, as passed to the constructor """
+        return dict(i_s_z_0=self.i_s_z_0, i_s_z_1=self.i_s_z_1,
+                    i_s_w_0=self.i_s_w_0, i_s_w_1=self.i_s_w_1,
+                    action_bound=self.temp_change_action_bound,
+                    temp_const_change_initial=self.temp_change_environment_initial,
+                    learn_r_a=self.learn_r_a,
+                    temp_viable_range=self.temp_viable_range, dt=self.dt,
+                    learn_r=self.learn_r, simulate_current=self.simulate_current,
+                    seed=self.seed, integrator=self.integrator, schedule=self.schedule,
+                    field=self.field)
+
+    def result(self):
+        """ result of the last simulation """
+        # forcing of the world at the recorded steps
+        forcing = self.world.at(self.recorder.recorded_steps() - 1, self.dt)
+        return SimulationResult(type(self), self.get_params(), self.recorder,
+                                dt=self.dt, act_time=self.act_time, forcing=forcing,
+                                temp_viable_mean=self.temp_viable_mean,
+                                temp_viable_range=self.temp_viable_range,
+                                death_step=self.death_step, death_cause=self.death_cause,
+                                stats=self.stats.summary() if self.stats is not None else None)
 
     def plot_results(self):
-        fig, ax = plt.subplots(3, 2, constrained_layout=True)
-
-        timeline = [s * self.dt for s in range(self.steps)]
-
-        # Temperature
-        min_temp = self.temp_viable_mean - self.temp_viable_range
-        max_temp = self.temp_viable_mean + self.temp_viable_range
-        ax[0][0].plot(timeline, self.temp[1:])
-        ax[0][0].plot(timeline, self.temp_desire[1:], ls='--', lw=0.75, c='green')
-        ax[0][0].set_title('Temperature')
-        ax[0][0].set_xlabel('time step')
-        ax[0][0].set_ylabel('temperature')
-        ax[0][0].plot(timeline, np.ones_like(timeline) *
-                      min_temp, lw=0.75, ls='--', c='red')
-        ax[0][0].plot(timeline, np.ones_like(timeline) *
-                      max_temp, lw=0.75, ls='--', c='red')
-        ax[0][0].legend(['agent, $T$', 'goal, $T_{goal}$', 'viability'],
-                        loc='lower right')
-        ax[0][0].set_ylim(-10, 50)
-        ax[0][0].set_xlim(-10, self.time + 30)
-
-        # Temperature change
-        temp_change_organism = np.array(self.temp_change_environment[1:]) + \
-            np.array(self.temp_change_action[1:])
-        ax[1][0].plot(timeline, self.temp_change_environment[1:])
-        ax[1][0].plot(timeline, self.temp_change_action[1:])
-        ax[1][0].plot(timeline, temp_change_organism, lw=1.25, ls='--', c='g')
-        ax[1][0].plot(timeline, np.ones_like(timeline) * 0, lw=0.65, c='gray')
-        ax[1][0].legend(['env-t, $\\dot{T}_e$', 'action, $\\dot{T}_i$',
-                         'agent, $\\dot{T}$'],
-                        loc='lower right',
-                        # loc='center right',
-                        labelspacing=0.3)
-        ax[1][0].set_title('Temperature change')
-        ax[1][0].set_xlabel('time step')
-        ax[1][0].set_ylabel('temperature change')
-        ax[1][0].set_ylim(-8, 8)
-        ax[1][0].set_xlim(-10, self.time + 30)
-
-        # Light change
-        ax[2][0].plot(timeline, running_mean(self.light_change[1:]), lw=2)
-        ax[2][0].set_title('Light change')
-        ax[2][0].set_xlabel('time step')
-        ax[2][0].set_ylabel('light change')
-        ax[2][0].legend(['total, $\\dot{L}$'], loc='lower right')
-        ax[2][0].set_xlim(-10, self.time + 30)
-
-        # mu
-        ax[0][1].plot(timeline, self.mu_i[1:])
-        ax[0][1].plot(timeline, self.mu_i_d1[1:])
-        ax[0][1].plot(timeline, self.mu_i_d2[1:])
-        ax[0][1].set_title('Environmental variable, $\\mu$')
-        ax[0][1].set_xlabel('time step')
-        ax[0][1].set_ylabel('$\\mu$')
-        ax[0][1].legend(['$\\mu_i$', "$\\mu_i'$", "$\\mu_i''$"], loc='upper right')
-        ax[0][1].set_ylim(-10, 50)
-
-        # VFE
-        ax[1][1].plot(timeline, running_mean(self.vfe), lw=3, c="#3f92d2")
-        ax[1][1].set_title('Variational free energy (VFE), $F$')
-        ax[1][1].set_xlabel('time step')
-        ax[1][1].set_ylabel('$F$')
-        ax[1][1].set_ylim(-5, 500)
-
-        # Error terms
-        ax[2][1].plot(timeline, running_mean(self.i_e_z_0), lw=0.75)
-        ax[2][1].plot(timeline, running_mean(self.i_e_z_1), lw=0.75)
-        ax[2][1].plot(timeline, running_mean(self.i_e_w_0), lw=0.75)
-        ax[2][1].plot(timeline, running_mean(self.i_e_w_1), lw=0.75)
-        ax[2][1].set_ylim(-10, 10)
-        ax[2][1].set_title('Error terms, $\\epsilon$')
-        ax[2][1].set_xlabel('time step')
-        ax[2][1].set_ylabel('$\\epsilon$')
-        ax[2][1].legend(['$\\epsilon_{z0}$', '$\\epsilon_{z1}$', '$\\epsilon_{w0}$',
-                         '$\\epsilon_{w1}$'], loc='upper right')
-
-        return ax
-
-    def simulate(self, sim_time=300, act_time=50):
-        self.reset()
+        """ plot the trajectories recorded by the last simulation """
+        return self.result().plot()
+
+    def start(self, steps=None, act_time=50, record_every=1, record_window=None, stats=None):
+        """ start a simulation of the given number of steps (unbounded if None):
+            reset the agent and compile the forcing of its world.
+            With `stats` (True or an OnlineStats) summary statistics are updated at every step """
+        self.reset(steps, record_every, record_window)
+        self.start_stats(stats)
+        # noise streams of the simulation
+        self.noise = Noise(self.seed)
+        self.steps = steps
         self.act_time = act_time
-
-        plt.ion()
-
-        self.steps = int(sim_time / self.dt)
-        print(f'Simulating {self.steps} steps')
-
-        for step in range(self.steps):
-            self.time = step * self.dt
-            # update world
-            self.update_world()
-            self.upd_velocity()
-            self.upd_temp_change()
+        self.step = 0
+
+        # the step after which the temperature left the viable range
+        # for the first time (-1 while it stays viable) and why
+        self.death_step = -1
+        self.death_cause = None
+
+        if self.integrator == 'exact':
+            self.transitions = self.exact_transitions()
+
+        # forcing of the world at each step, compiled in chunks for unbounded runs
+        self.world = self.schedule or self.default_schedule()
+        # the action of the agent is noisy until the current starts
+        self.current_start = self.world.current.start_time()
+        self.compile_forcing(FORCING_CHUNK if steps is None else steps)
+
+    def start_stats(self, stats):
+        """ start the summary statistics of the simulation (see online.py) """
+        self.stats = OnlineStats() if stats is True else stats
+        if self.stats is not None:
+            self.stats.start(self.now, self.dt)
+
+    def compile_forcing(self, steps):
+        """ compile the forcing of the world for the next steps """
+        self.forcing = self.world.compile(steps, self.dt, start=self.step)
+        self.forcing_start = self.step
+        self.forcing_end = self.step + steps
+
+    def simulate_world(self):
+        """ update the world of this step and generate the sensations of it """
+        # update world
+        self.update_world()
+        self.upd_velocity()
+        if self.field is not None:
+            self.upd_field()
+            self.upd_temp()
+        else:
+            if self.integrator == 'exact':
+                self.upd_temp_change_exact()
+            else:
+                self.upd_temp_change()
             self.upd_temp()
             self.upd_light_change()
 
-            # generate sensations
-            self.generate_senses()
+        # generate sensations
+        self.generate_senses()
 
-            # perform active inference
-            self.active_inference()
+    def advance(self):
+        """ simulate one time step """
+        if self.step == self.forcing_end:
+            self.compile_forcing(FORCING_CHUNK)
 
-            # update variational free energy
-            self.upd_vfe()
+        self.time = self.step * self.dt
+        # keep the values of the previous step
+        vars(self.prev).update(vars(self.now))
 
-            #  act
-            if step * self.dt > act_time:
-                self.upd_action()
+        self.simulate_world()
 
-            else:
-                self.upd_no_action()
+        # perform active inference
+        self.active_inference()
 
-        self.plot_results()
-        plt.show()
+        # update variational free energy
+        self.upd_vfe()
+
+        #  act
+        if self.time > self.act_time:
+            self.upd_action()
+
+        else:
+            self.upd_no_action()
+
+        self.recorder.record(self.now)
+        if self.stats is not None:
+            self.stats.update(self.now)
+        self.step += 1
+        self.check_death()
+
+    def check_death(self, temp=None):
+        """ record the death at this step if the temperature (of the agent
+            by default) left the viable range for the first time.
+            Returns whether the agent is dead """
+        if self.death_step < 0:
+            temp = self.now.temp if temp is None else temp
+            if not abs(temp - self.temp_viable_mean) <= self.temp_viable_range:
+                self.record_death(temp)
+        return self.death_step >= 0
+
+    def record_death(self, temp=None):
+        """ record that the temperature (of the agent by default)
+            left the viable range at this step """
+        temp = self.now.temp if temp is None else temp
+        self.death_step = self.step
+        if math.isnan(temp):
+            self.death_cause = 'diverged'
+        elif temp < self.temp_viable_mean:
+            self.death_cause = 'cold'
+        else:
+            self.death_cause = 'hot'
+
+    def iter_steps(self, n=None, act_time=50, every=1, record_every=1, record_window=None,
+                   survival=False, stats=None):
+        """Simulate n steps (without end if None) and yield the number of
+           simulated steps and the state of the agent after every `every`-th step.
+
+           The state is updated in place, copy it (`state.copy()`) to keep it.
+           Trajectories are recorded every `record_every`-th step; with
+           `record_window` only the last ones are kept (none for 0),
+           so that the memory stays constant for any number of steps.
+           An unbounded run needs a `record_window`.
+           With `survival=True` the run stops when the agent dies and with
+           `stats` summary statistics are kept (see simulate)."""
+        self.start(n, act_time, record_every, record_window, stats)
+
+        while n is None or self.step < n:
+            self.advance()
+            if self.step % every == 0:
+                yield self.step, self.now
+            if survival and self.death_step >= 0:
+                return
+
+    def show_result(self, result):
+        """ plot the result and show the figure (requires matplotlib) """
+        from plotting import show_result
+        return show_result(result)
+
+    def simulate(self, sim_time=300, act_time=50, plot=True, record_every=1,
+                 record_window=None, profile=False, survival=False, stats=None, live=False,
+                 fast_forward=False):
+        """ simulate the agent and return the result of the simulation.
+            With `plot=False` the simulation is headless: nothing is printed
+            or plotted and matplotlib is not used.
+            With `profile=True` the time spent in each phase of the simulation
+            is measured and reported in `result.profile` (see profiling.py).
+            With `survival=True` the simulation stops as soon as the temperature
+            leaves the viable range -- the agent dies
+            (the time and the cause of the death are recorded in any case).
+            With `stats=True` (or an OnlineStats to configure them) summary statistics
+            of the free energy and the errors are updated at every step and
+            reported in `result.stats`, also when nothing is recorded.
+            With `live=True` (or a LiveView to configure it) the results are
+            plotted while the simulation runs (see live.py).
+            With `fast_forward=True` (or a FastForward to configure it) quiet
+            stretches between the events of the world are skipped once
+            the agent settled (see fastforward.py) """
+        steps = int(sim_time / self.dt)
+        profiler = PhaseProfiler(self) if profile else None
+
+        try:
+            # allocate recorded trajectories for all steps at once
+            self.start(steps, act_time, record_every, record_window, stats)
+            result = self.run(steps, plot, survival, live, fast_forward)
+        finally:
+            # the methods of the agent are restored even if the simulation failed
+            if profiler is not None:
+                report = profiler.finish()
+
+        if profiler is not None:
+            result.profile = report
+        return result
+
+    def run(self, steps, plot=False, survival=False, live=False, fast_forward=False):
+        """ simulate the steps of the started simulation and return its result """
+        if plot:
+            print(f'Simulating {steps} steps')
+
+        if live:
+            from live import LiveView
+            live = (LiveView() if live is True else live).start(self, steps)
+        if fast_forward:
+            from fastforward import FastForward
+            fast_forward = (FastForward() if fast_forward is True else fast_forward).start(self)
+
+        end = self.step + steps
+        while self.step < end:
+            self.advance()
+            if fast_forward:
+                fast_forward.update(self, end)
+            if live:
+                live.update()
+            if survival and self.death_step >= 0:
+                break
+
+        result = self.result()
+        if fast_forward:
+            # steps filled with the equilibrium instead of simulated
+            result.compressed = fast_forward.skipped
+        if live:
+            live.finish()
+        elif plot:
+            self.show_result(result)
+
+        return result
+
+    def checkpoint(self):
+        """ snapshot of the running simulation to continue it from (see checkpoint.py) """
+        return Checkpoint(self)
+
+    def restore(self, checkpoint, noise=True):
+        """ set the state of the simulation of the checkpoint: the values of all
+            variables, the step and (with `noise=True`) the state of the noise streams,
+            otherwise the noise starts from the seed of the agent.
+            Continue the simulation with `resume()` """
+        self.now = State()
+        vars(self.now).update(checkpoint.state)
+        self.prev = self.now.copy()
+
+        self.step = checkpoint.step
+        self.steps = checkpoint.steps
+        self.act_time = checkpoint.act_time
+        self.death_step = checkpoint.death_step
+        self.death_cause = checkpoint.death_cause
+
+        self.noise = Noise(self.seed)
+        if noise:
+            self.noise.set_state(checkpoint.noise)
+
+        if self.integrator == 'exact':
+            self.transitions = self.exact_transitions()
+        self.world = self.schedule or self.default_schedule()
+        self.current_start = self.world.current.start_time()
+
+        # nothing is recorded before the continuation
+        self.recorder = Recorder(self.now, 0, self.from_start, first_step=self.step)
+        self.stats = None
+
+    def resume(self, sim_time=None, plot=False, record_every=1, record_window=None,
+               survival=False, stats=None, live=False, fast_forward=False):
+        """ continue the simulation from the current step until the time `sim_time`
+            (the end of the started simulation by default) and return the result
+            of the continuation, recorded starting from the current state """
+        end = self.steps if sim_time is None else int(sim_time / self.dt)
+        if end is None:
+            raise ValueError('the end of the continuation of an unbounded simulation is needed')
+
+        steps = max(end - self.step, 0)
+        self.steps = end
+        self.recorder = Recorder(self.now, steps, self.from_start, every=record_every,
+                                 window=record_window, first_step=self.step)
+        self.start_stats(stats)
+        self.compile_forcing(steps)
+
+        return self.run(steps, plot, survival, live, fast_forward)
 
 
 class ExteroceptiveAgent(InteroceptiveAgent):
@@ -436,49 +718,60 @@ class ExteroceptiveAgent(InteroceptiveAgent):
         # sigma (variances)
         self.ex_s_z_0 = ex_s_z_0
 
-    def reset(self):
-        super().reset()
+    def init_state(self):
+        super().init_state()
+
+        # sense of light
+        self.track('ex_sense')
 
         # exteroceptive errors
-        self.ex_e_z_0 = []
-        self.ex_e_w_0 = []
+        self.track('ex_e_z_0')
 
         # brain state mu of the exteroception layer
-        self.ex_mu = [0]
+        self.track('ex_mu', 0)
 
         # variational free energy of the exteroception layer
-        self.vfe_ex = []
+        self.track('vfe_ex')
 
     def generate_senses(self):
         super().generate_senses()
         self.generate_ex_sense()
 
     def generate_ex_sense(self):
-        ex_sense = self.light_change[-1] + get_noise()
-        self.ex_sense.append(ex_sense)
+        self.now.ex_sense = self.now.light_change + self.noise('ex_sense')
 
     def upd_ex_err_z_0(self):
         # error between sensation and generated sensations
-        self.ex_e_z_0.append(self.ex_sense[-1] - 0.1 * (-self.ex_mu[-1] + 30))
+        self.now.ex_e_z_0 = self.now.ex_sense - 0.1 * (-self.now.ex_mu + 30)
 
     def upd_ex_mu(self):
         upd = -self.learn_r_ex * \
-            (0.1 * self.ex_e_z_0[-1] / self.ex_s_z_0)
+            (0.1 * self.now.ex_e_z_0 / self.ex_s_z_0)
         upd *= self.dt
 
-        self.ex_mu.append(self.ex_mu[-1] + upd)
+        self.now.ex_mu += upd
+
+    def upd_ex_mu_exact(self):
+        now = self.now
+        Ad, Bd = self.transitions['exteroception']
+
+        # light change the error was computed for
+        light_change = now.ex_e_z_0 + 0.1 * (-now.ex_mu + 30)
+        ex_mu = Ad @ (now.ex_mu,) + Bd @ (light_change, 1)
+
+        now.ex_mu = ex_mu[0]
 
     def upd_vfe_ex(self):
         def sqrd_err(err, sigma):
-            return np.power(err, 2) / sigma
+            return err * err / sigma
 
-        vfe_ex = 0.5 * (sqrd_err(self.ex_e_z_0[-1], self.ex_s_z_0))
+        vfe_ex = 0.5 * (sqrd_err(self.now.ex_e_z_0, self.ex_s_z_0))
 
-        self.vfe_ex.append(vfe_ex)
+        self.now.vfe_ex = vfe_ex
 
     def upd_vfe(self):
-        vfe = self.vfe_i[-1] + self.vfe_ex[-1]
-        self.vfe.append(vfe)
+        vfe = self.now.vfe_i + self.now.vfe_ex
+        self.now.vfe = vfe
 
     def exteroception(self):
         # the agent performs exteroception
@@ -490,60 +783,48 @@ class ExteroceptiveAgent(InteroceptiveAgent):
         self.upd_ex_err_z_0()
 
         #  --> update recognition dynamics
-        self.upd_ex_mu()
+        if self.integrator == 'exact':
+            self.upd_ex_mu_exact()
+        else:
+            self.upd_ex_mu()
 
         #  update free energy
         self.upd_vfe_ex()
 
-    def update_world(self):
+    def default_schedule(self):
         """ simulate light drop before temperature drop
             for a short period of time to show the proof of concept """
-        # update world as in Interoceptive Agent
-        super().update_world()
+        schedule = super().default_schedule()
 
         # change in light starts before the temperature drop
-        if int(self.time) == 175:
-            light_change_instant = -0.7
-        elif int(self.time) == 200:
-            light_change_instant = 0.7
-        else:
-            light_change_instant = 0
+        schedule.light_change = sunset()
 
-        self.light_change_instant.append(light_change_instant)
+        return schedule
 
     def active_inference(self):
         # exteroception first
         self.exteroception()
         # pass the prior about desired temperature to the interoception
         # generative model
-        self.temp_desire.append(self.ex_mu[-1])
+        self.now.temp_desire = self.now.ex_mu
         # then perform interoception
         self.interoception()
 
-    def simulate(self, sim_time=400, act_time=50):
-        # simulate for 400 time steps by default
-        super().simulate(sim_time=sim_time)
-
-    def plot_results(self):
-        ax = super().plot_results()
-
-        timeline = [s * self.dt for s in range(self.steps)]
+    def get_params(self):
+        params = super().get_params()
+        params.update(ex_s_z_0=self.ex_s_z_0)
+        return params
 
-        ax[0][1].plot(timeline, self.ex_mu[1:], ls='--')
-        ax[0][1].legend(['$\\mu_i$', "$\\mu_i'$", "$\\mu_i''$",
-                         "$\\mu_e$"], loc='upper right')
+    def exact_transitions(self):
+        transitions = super().exact_transitions()
+        transitions['exteroception'] = exteroceptive_transition(
+            self.dt, self.learn_r_ex, self.ex_s_z_0)
+        return transitions
 
-        ax[1][1].plot(timeline, running_mean(self.vfe_i, 5), lw=1, c='tab:red')
-        ax[1][1].plot(timeline, running_mean(self.vfe_ex), lw=1, c='tab:pink')
-        ax[1][1].legend(['$F$', '$F_i$', '$F_e$'], loc='upper right')
-        ax[1][1].set_ylim(-10, 200)
-
-        ax[2][1].plot(timeline, running_mean(self.ex_e_z_0), lw=0.75)
-        ax[2][1].legend(['$\\epsilon^{z0}_i$', '$\\epsilon^{z1}_i$', '$\\epsilon^{w0}_i$',
-                         '$\\epsilon^{w1}_i$', '$\\epsilon^{z0}_e$'], loc='upper right')
-        ax[2][1].set_ylim(-5, 5)
+    def simulate(self, sim_time=400, act_time=50, plot=True, **kwargs):
+        # simulate for 400 time steps by default
+        return super().simulate(sim_time=sim_time, act_time=act_time, plot=plot, **kwargs)
 
-        return ax
 
 
 class ActiveExteroceptiveAgent(ExteroceptiveAgent):
@@ -572,7 +853,9 @@ class ActiveExteroceptiveAgent(ExteroceptiveAgent):
 
         # sigma (variances)
         self.aex_s_z_0 = aex_s_z_0
+        self.aex_s_z_1 = aex_s_z_1
         self.aex_s_w_0 = aex_s_w_0
+        self.aex_s_w_1 = aex_s_w_1
 
         # action bound of the action on the world
         self.aex_action_bound = aex_action_bound
@@ -580,60 +863,86 @@ class ActiveExteroceptiveAgent(ExteroceptiveAgent):
         self.supress_action = supress_action
         self.supress_desired_temp_inference = supress_desired_temp_inference
 
-    def reset(self):
-        super().reset()
+    def init_state(self):
+        super().init_state()
 
         # active exteroceptive errors
-        self.aex_e_z_0 = [0]
-        self.aex_e_w_0 = [0]
+        self.track('aex_e_z_0', 0)
+        self.track('aex_e_w_0', 0)
 
         # mu of the exteroceptive layer -- inferred change in light
         # produced by the agent
-        self.aex_mu = [0]
-        self.aex_mu_d1 = [0]
+        self.track('aex_mu', 0)
+        self.track('aex_mu_d1', 0)
 
         # variational free energy of the active exteroception layer
-        self.vfe_aex = []
+        self.track('vfe_aex')
 
         # action
-        self.aex_action = [0]
-        self.aex_action_pre_bound = [0]
+        self.track('aex_action', 0)
+        self.track('aex_action_pre_bound', 0)
+
+    def get_params(self):
+        params = super().get_params()
+        params.update(aex_s_z_0=self.aex_s_z_0, aex_s_z_1=self.aex_s_z_1,
+                      aex_s_w_0=self.aex_s_w_0, aex_s_w_1=self.aex_s_w_1,
+                      aex_action_bound=self.aex_action_bound,
+                      supress_action=self.supress_action,
+                      learn_r_aex=self.learn_r_aex,
+                      supress_desired_temp_inference=self.supress_desired_temp_inference)
+        return params
+
+    def exact_transitions(self):
+        transitions = super().exact_transitions()
+        transitions['active_exteroception'] = active_exteroceptive_transition(
+            self.dt, self.learn_r_ex, self.aex_s_z_0, self.aex_s_w_0)
+        return transitions
 
     def update_world(self):
         super().update_world()
 
         if self.time < self.act_time:
-            self.velocity_action.append(0)
+            self.now.velocity_action = 0
             return
 
         if not self.supress_action:
             # extra_noise = get_noise() if np.random.rand() < 0.2 else 0
-            noise = get_noise() if self.time < 300 else 0
-            self.velocity_action.append(self.aex_action[-1] + noise)
+            noise = self.noise('velocity_action') if self.time < self.current_start else 0
+            self.now.velocity_action = self.now.aex_action + noise
 
     def upd_aex_mu_d1(self):
-        upd = -self.learn_r_ex * (self.aex_e_w_0[-1] / self.aex_s_w_0)
+        upd = -self.learn_r_ex * (self.now.aex_e_w_0 / self.aex_s_w_0)
         upd *= self.dt
 
-        self.aex_mu_d1.append(self.aex_mu_d1[-1] + upd)
+        self.now.aex_mu_d1 += upd
 
     def upd_aex_mu(self):
+        now = self.now
         upd = -self.learn_r_ex * \
-            (+self.aex_e_z_0[-1] / self.aex_s_z_0 +
-             +self.aex_e_w_0[-1] / self.aex_s_w_0
+            (+now.aex_e_z_0 / self.aex_s_z_0 +
+             +now.aex_e_w_0 / self.aex_s_w_0
              )
-        upd += self.aex_mu_d1[-1]
+        upd += now.aex_mu_d1
         upd *= self.dt
 
-        self.aex_mu.append(self.aex_mu[-1] + upd)
+        now.aex_mu += upd
+
+    def upd_aex_mu_exact(self):
+        now = self.now
+        Ad, Bd = self.transitions['active_exteroception']
+
+        t_change_goal = now.sense_i_d1 - now.temp_change_action
+        mu = Ad @ (now.aex_mu, now.aex_mu_d1) + Bd @ (now.aex_action, t_change_goal)
+
+        now.aex_mu, now.aex_mu_d1 = mu
 
     def upd_ex_err_z_0(self):
         # update of the error calculation at the exteroception layer
         # now we subtract the (prediction) of how much light change
         # is generated by the agent acting on the world
-        prediction = self.ex_sense[-1] - self.aex_action[-1]
+        prediction = self.now.ex_sense - self.now.aex_action
 
-        self.ex_e_z_0.append(prediction - 0.1 * (-self.ex_mu[-1] + 30))
+        self.now.ex_e_z_0 = prediction - 0.1 * (-self.now.ex_mu + 30)
 
     def upd_aex_err_w_0(self):
         """ agent's expected dynamics is that environment temperature change
@@ -641,8 +950,9 @@ class ActiveExteroceptiveAgent(ExteroceptiveAgent):
             set point is when the inferred change in light
             corresponds to the change in temperature """
 
-        t_change_goal = self.sense_i_d1[-1] - self.temp_change_action[-1]
-        self.aex_e_w_0.append(self.aex_mu_d1[-1] - t_change_goal + self.aex_mu[-1])
+        now = self.now
+        t_change_goal = now.sense_i_d1 - now.temp_change_action
+        now.aex_e_w_0 = now.aex_mu_d1 - t_change_goal + now.aex_mu
 
     def upd_aex_err_z_0(self):
         """ sensory error is the difference between the best guess
@@ -650,34 +960,36 @@ class ActiveExteroceptiveAgent(ExteroceptiveAgent):
         (through the copy of action)
         """
 
-        error = self.aex_action[-1]
-        self.aex_e_z_0.append(error - (-self.aex_mu[-1]))
+        error = self.now.aex_action
+        self.now.aex_e_z_0 = error - (-self.now.aex_mu)
 
     def upd_avfe_ex(self):
         """ active exteroception VFE """
         def sqrd_err(err, sigma):
-            return np.power(err, 2) / sigma
+            return err * err / sigma
 
-        vfe_aex = 0.5 * (sqrd_err(self.aex_e_z_0[-1], self.aex_s_z_0)
-                         + sqrd_err(self.aex_e_w_0[-1], self.aex_s_w_0))
+        now = self.now
+        vfe_aex = 0.5 * (sqrd_err(now.aex_e_z_0, self.aex_s_z_0)
+                         + sqrd_err(now.aex_e_w_0, self.aex_s_w_0))
 
-        self.vfe_aex.append(vfe_aex)
+        now.vfe_aex = vfe_aex
 
     def upd_vfe(self):
         """ total VFE """
-        vfe = self.vfe_i[-1] + self.vfe_ex[-1] + self.vfe_aex[-1]
-        self.vfe.append(vfe)
+        now = self.now
+        vfe = now.vfe_i + now.vfe_ex + now.vfe_aex
+        now.vfe = vfe
 
     def upd_action(self):
         super().upd_action()
 
         # sensation change over action is always 1
-        upd = -self.learn_r_aex * 1 * (self.aex_e_z_0[-1] / self.aex_s_z_0)
+        upd = -self.learn_r_aex * 1 * (self.now.aex_e_z_0 / self.aex_s_z_0)
         upd *= self.dt
-        aex_action = self.aex_action[-1] + upd
-        aex_action += get_noise() * self.dt
+        aex_action = self.now.aex_action + upd
+        aex_action += self.noise('aex_action') * self.dt
 
-        self.aex_action_pre_bound.append(aex_action)
+        self.now.aex_action_pre_bound = aex_action
 
         # action must be bound by some plausible constraints
         # e.g. can't move faster than some limit
@@ -685,19 +997,17 @@ class ActiveExteroceptiveAgent(ExteroceptiveAgent):
             aex_action = np.sign(aex_action) * self.aex_action_bound
 
         # update action
-        self.aex_action.append(aex_action)
-
-    def upd_no_action(self):
-        super().upd_no_action()
-        self.aex_action.append(self.aex_action[-1])
-        self.aex_action_pre_bound.append(self.aex_action_pre_bound[-1])
+        self.now.aex_action = aex_action
 
     def active_exteroception(self):
         """ an agents performs action
             based on it's exteroceptive inference
             about how temperature change causes light change """
-        self.upd_aex_mu_d1()
-        self.upd_aex_mu()
+        if self.integrator == 'exact':
+            self.upd_aex_mu_exact()
+        else:
+            self.upd_aex_mu_d1()
+            self.upd_aex_mu()
 
         # update errors
         self.upd_aex_err_z_0()
@@ -712,55 +1022,12 @@ class ActiveExteroceptiveAgent(ExteroceptiveAgent):
 
         # pass the prior about desired temperature to the generative model
         if not self.supress_desired_temp_inference:
-            self.temp_desire.append(self.ex_mu[-1])
+            self.now.temp_desire = self.now.ex_mu
         else:
-            self.temp_desire.append(self.temp_viable_mean)
+            self.now.temp_desire = self.temp_viable_mean
 
         # then perform interoception
         self.interoception()
         # and active exteroception
         self.active_exteroception()
 
-    def plot_results(self):
-        ax = super().plot_results()
-
-        timeline = [s * self.dt for s in range(self.steps)]
-
-        # change in light
-        ax[0][1].plot(timeline, self.aex_mu[1:], ls='--')
-        ax[0][1].legend(['$\\mu_i$', "$\\mu_i'$", "$\\mu_i''$",
-                         "$\\mu_e$", '$\\mu_a$'], loc='upper right')
-
-        ax[2][1].plot(timeline, running_mean(self.aex_e_z_0[1:]), lw=0.75)
-        ax[2][1].plot(timeline, running_mean(self.aex_e_w_0[1:]), lw=0.75)
-        ax[2][1].legend(['$\\epsilon^{z0}_i$', '$\\epsilon^{z1}_i$', '$\\epsilon^{w0}_i$',
-                         '$\\epsilon^{w1}_i$', '$\\epsilon^{z0}_e$',
-                         '$\\epsilon^{z0}_a$', '$\\epsilon^{w0}_a$'],
-                        loc='upper right',
-                        labelspacing=0)
-        ax[2][1].set_ylim(-3.5, 3.5)
-
-        # change in light produced by the external force
-        # is 0.1 after the time step 300
-        light_change_external = np.zeros(self.steps + 1)
-        light_change_external[3000:] = 0.1
-
-        # environmental change in light (e.g. modelled sunset/sunrise)
-        # is all change in light minus change in light generated by the agent's action
-        # and generated by the external force dragging agent closer to surface
-        light_change_env = np.array(self.light_change) - np.array(self.velocity_action) \
-            - light_change_external
-
-        # action  produced by the organism (including environmental noise)
-        ax[2][0].plot(timeline, running_mean(self.velocity_action[1:]), lw=0.75)
-        ax[2][0].plot(timeline, light_change_env[1:], lw=1, c='tab:red', ls='--')
-        ax[2][0].plot(timeline[3000:], light_change_external[3001:], lw=1, c='tab:green')
-        ax[2][0].legend(['total, $\\dot{L}$', 'action, $\\dot{L}_a$',
-                         'env-t, $\\dot{L}_e$', 'external'],
-                        loc='lower right')
-
-        ax[1][1].plot(timeline, running_mean(self.vfe_aex), lw=1, c="tab:orange")
-        ax[1][1].legend(['$F$', '$F_i$', '$F_e$', '$F_a$'])
-        ax[1][1].set_ylim(-5, 175)
-
-        plt.show()
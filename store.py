@@ -0,0 +1,206 @@
+# persistent store of simulation results: every recorded trajectory is
+# saved in its own .npy file and loaded back lazily as a memory-mapped array,
+# so that only the columns and time ranges that are used are read from disk
+import json
+import os
+
+import numpy as np
+
+import hierarchy
+import simulation
+from world import DepthField, Forcing, Schedule
+
+META_FILE = 'meta.json'
+
+
+def _forcing_to_json(forcing):
+    return {'initial': forcing.initial, 'events': sorted(forcing.events)}
+
+
+def _forcing_from_json(data):
+    forcing = Forcing(data['initial'])
+    forcing.events = [tuple(event) for event in data['events']]
+    return forcing
+
+
+def _to_json(value):
+    """ value of a parameter or a metric that can be written to JSON """
+    if isinstance(value, Schedule):
+        return {'schedule': {name: _forcing_to_json(getattr(value, name))
+                             for name in ('temp_change', 'light_change', 'current')}}
+    if isinstance(value, DepthField):
+        return {'field': {'depth': value.depth.tolist(), 'time': value.time.tolist(),
+                          'temp_change': value.temp_change.tolist(),
+                          'light': value.light.tolist(), 'period': value.period,
+                          'depth_initial': value.depth_initial}}
+    if isinstance(value, list) and value and isinstance(value[0], hierarchy.Layer):
+        return {'layers': [{name: _to_json(v) for name, v in vars(layer).items()}
+                           for layer in value]}
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _from_json(value):
+    if isinstance(value, dict) and 'schedule' in value:
+        return Schedule(**{name: _forcing_from_json(data)
+                           for name, data in value['schedule'].items()})
+    if isinstance(value, dict) and 'field' in value:
+        return DepthField.from_tables(**value['field'])
+    if isinstance(value, dict) and 'layers' in value:
+        return [hierarchy.Layer(**layer) for layer in value['layers']]
+    return value
+
+
+def save_result(result, path):
+    """ save the result of a simulation to the directory `path` """
+    os.makedirs(path, exist_ok=True)
+    recorder = result.recorder
+
+    for name in result.names:
+        np.save(os.path.join(path, name + '.npy'), recorder.view(name))
+    np.save(os.path.join(path, 'time.npy'), result.time)
+    for name, values in result.forcing.items():
+        np.save(os.path.join(path, 'forcing.' + name + '.npy'), values)
+
+    meta = {
+        'agent': result.agent_cls.__name__,
+        'params': {name: _to_json(value) for name, value in result.params.items()},
+        'seed': _to_json(result.params.get('seed')),
+        'dt': result.dt,
+        'act_time': result.act_time,
+        'steps': result.steps,
+        'record_every': recorder.every,
+        'temp_viable_mean': result.temp_viable_mean,
+        'temp_viable_range': result.temp_viable_range,
+        'death_step': result.death_step,
+        'death_cause': result.death_cause,
+        'names': result.names,
+        'from_start': sorted(recorder.from_start),
+        'forcing': list(result.forcing),
+        'metrics': {name: _to_json(value) for name, value in result.metrics.items()},
+        'stats': None if result.stats is None else
+        {name: _to_json(value) for name, value in result.stats.items()},
+    }
+    with open(os.path.join(path, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=1)
+
+    return StoredResult(path)
+
+
+class StoredResult:
+    """Result of a simulation loaded from a directory written by `save_result`.
+
+       Has the interface of SimulationResult: trajectories are available
+       under the names of the variables (e.g. `result.temp`) as read-only
+       memory-mapped arrays, opened on first use, so that slicing them
+       (e.g. `result.temp[1000:2000]`) only reads that part from disk."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+
+        self.meta = meta
+        # agents of simulation.py or of a hierarchy
+        self.agent_cls = getattr(simulation, meta['agent'], None) or \
+            getattr(hierarchy, meta['agent'])
+        self.params = {name: _from_json(value) for name, value in meta['params'].items()}
+        self.seed = meta['seed']
+        self.dt = meta['dt']
+        self.act_time = meta['act_time']
+        self.steps = meta['steps']
+        self.temp_viable_mean = meta['temp_viable_mean']
+        self.temp_viable_range = meta['temp_viable_range']
+        self.death_step = meta['death_step']
+        self.death_cause = meta['death_cause']
+        self.death_time = self.death_step * self.dt if self.death_step >= 0 else None
+        self.metrics = meta['metrics']
+        self.stats = meta['stats']
+        self.from_start = set(meta['from_start'])
+
+        self._arrays = {}
+
+    @property
+    def names(self):
+        """ names of the recorded variables """
+        return self.meta['names']
+
+    def _load(self, file_name):
+        if file_name not in self._arrays:
+            self._arrays[file_name] = np.load(os.path.join(self.path, file_name + '.npy'),
+                                              mmap_mode='r')
+        return self._arrays[file_name]
+
+    @property
+    def time(self):
+        return self._load('time')
+
+    @property
+    def forcing(self):
+        """ forcing of the world at each recorded step """
+        return {name: self._load('forcing.' + name) for name in self.meta['forcing']}
+
+    def __getattr__(self, name):
+        meta = self.__dict__.get('meta')
+        if meta is None or name not in meta['names']:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        return self._load(name)
+
+    def series(self, name, start=None, stop=None):
+        """ values of the variable at the recorded steps starting
+            at the times in [start, stop), aligned with `time` """
+        time = self.time
+        first = 0 if start is None else np.searchsorted(time, start)
+        last = len(time) if stop is None else np.searchsorted(time, stop)
+
+        # trajectories with the initial values have one value more
+        offset = 1 if name in self.from_start else 0
+        return getattr(self, name)[first + offset:last + offset]
+
+    def trajectories(self):
+        """ all recorded trajectories by the names of the variables """
+        return {name: getattr(self, name) for name in self.names}
+
+    def plot(self):
+        """ plot the result (requires matplotlib) """
+        from plotting import plot_result
+        return plot_result(self)
+
+
+class TrajectoryStore:
+    """Directory of saved simulation results, one subdirectory per run.
+       Runs are opened only when they are used."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def names(self):
+        """ names of the stored runs """
+        return sorted(name for name in os.listdir(self.path)
+                      if os.path.isfile(os.path.join(self.path, name, META_FILE)))
+
+    def save(self, result, name=None):
+        """ save the result of a simulation as the run `name` (the next number by default) """
+        if name is None:
+            name = f'run-{len(self.names()):06d}'
+        return save_result(result, os.path.join(self.path, name))
+
+    def __getitem__(self, name):
+        return StoredResult(os.path.join(self.path, name))
+
+    def __iter__(self):
+        return (self[name] for name in self.names())
+
+    def __len__(self):
+        return len(self.names())
+
+    def column(self, name, start=None, stop=None, runs=None):
+        """ the variable of the given runs (all by default) between the times start and stop,
+            one array per run (see StoredResult.series) """
+        runs = self.names() if runs is None else runs
+        return [self[run].series(name, start, stop) for run in runs]
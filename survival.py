@@ -0,0 +1,61 @@
+# survival studies: how likely agents are to stay viable over time.
+# An agent dies when its temperature leaves the viable range; with many seeds
+# simulated in batches that stop once all their agents are dead, the probability
+# of survival is estimated as a function of time
+import numpy as np
+
+from batch import BatchAgent
+
+
+def survival_curve(death_times, times, z=1.96):
+    """Fraction of the runs alive at each of the times and its confidence
+       interval (the Wilson interval, 95% by default).
+       Runs that did not die have the death time NaN"""
+    death_times = np.asarray(death_times, dtype=float)
+    times = np.asarray(times, dtype=float)
+    n = len(death_times)
+
+    # runs that survived are alive at all times
+    death_times = np.where(np.isnan(death_times), np.inf, death_times)
+    alive = np.sum(death_times[:, None] > times, axis=0)
+    p = alive / n
+
+    center = (p + z ** 2 / (2 * n)) / (1 + z ** 2 / n)
+    spread = z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / (1 + z ** 2 / n)
+    return p, center - spread, center + spread
+
+
+def survival_study(agent_cls, seeds=range(1000), sim_time=None, act_time=50,
+                   batch_size=1000, times=None, **params):
+    """Simulate agents of `agent_cls` with the parameters for all seeds until
+       they die and estimate the probability of survival over time.
+
+       Agents are simulated in batches of `batch_size`, stopped when all their
+       agents are dead, without recording trajectories.
+       Returns the death time (NaN for survivors) and the cause of death
+       of each run and the survival curve at the `times`."""
+    seeds = list(seeds)
+    death_time, death_cause = [], []
+
+    for start in range(0, len(seeds), batch_size):
+        chunk = seeds[start:start + batch_size]
+        batch = BatchAgent(agent_cls, n=len(chunk), seed=chunk, **params)
+        batch.simulate(sim_time, act_time, record_window=0, survival=True)
+
+        death_time.append(np.where(batch.death_step >= 0, batch.death_step * batch.dt, np.nan))
+        death_cause.append(batch.death_cause)
+
+    death_time = np.concatenate(death_time)
+    if times is None:
+        times = np.linspace(0, batch.steps * batch.dt, 201)
+    survival, lower, upper = survival_curve(death_time, times)
+
+    return {
+        'seed': np.array(seeds),
+        'death_time': death_time,
+        'death_cause': np.concatenate(death_cause),
+        'time': times,
+        'survival': survival,
+        'survival_lower': lower,
+        'survival_upper': upper,
+    }
@@ -0,0 +1,110 @@
+# parameter sweeps: many headless simulations run over a process pool
+import itertools
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+from store import TrajectoryStore
+
+# agent of the worker process, re-used between runs with the same parameters
+_worker_agent = None
+_worker_agent_key = None
+
+
+def param_grid(**values):
+    """ all combinations of the given parameter values, e.g.
+        param_grid(learn_r=[0.05, 0.1], supress_action=[False, True]) """
+    names = list(values)
+    return [dict(zip(names, combination))
+            for combination in itertools.product(*values.values())]
+
+
+def get_agent(agent_cls, params):
+    """ agent of the worker for the given parameters.
+        The agent is only created when the parameters change,
+        otherwise it is re-used (simulate() resets it) """
+    global _worker_agent, _worker_agent_key
+
+    key = (agent_cls, tuple(sorted(params.items())))
+    if key != _worker_agent_key:
+        _worker_agent = agent_cls(**params)
+        _worker_agent_key = key
+
+    return _worker_agent
+
+
+def run_chunk(task):
+    """ simulate a chunk of runs and return only their summaries,
+        saving the trajectories to the store if given """
+    agent_cls, runs, store, sim_kwargs = task
+
+    rows = []
+    for run, params, seed in runs:
+        agent = get_agent(agent_cls, params)
+        agent.seed = seed
+        result = agent.simulate(plot=False, **sim_kwargs)
+        if store is not None:
+            TrajectoryStore(store).save(result, name=f'run-{run:06d}')
+
+        row = {'run': run, 'seed': seed}
+        row.update(params)
+        row.update(result.metrics)
+        if result.stats is not None:
+            row.update(result.stats)
+        rows.append(row)
+
+    return rows
+
+
+def iter_sweep(agent_cls, params, seeds=(0,), processes=None, chunksize=None,
+               store=None, **sim_kwargs):
+    """Simulate `agent_cls` for every parameters set and seed and yield
+       the summary of each run as soon as it is finished.
+
+       `params` is either a list of constructor keyword arguments or
+       a dict of lists of values, combined with `param_grid`.
+       Runs are submitted to a pool of `processes` (all cores by default)
+       in chunks of `chunksize` runs; only summaries are sent back.
+       With a `store` directory the trajectories of each run are saved
+       there as the run `run-<number>` (see store.py).
+       Extra keyword arguments are passed to `simulate()`."""
+    if isinstance(params, dict):
+        params = param_grid(**params)
+
+    runs = [(run, p, seed) for run, (p, seed) in
+            enumerate(itertools.product(params, seeds))]
+    if not runs:
+        return
+
+    processes = processes or os.cpu_count()
+    if chunksize is None:
+        # a few chunks per process to balance the load
+        chunksize = max(1, len(runs) // (processes * 4))
+
+    tasks = ((agent_cls, runs[i:i + chunksize], store, sim_kwargs)
+             for i in range(0, len(runs), chunksize))
+
+    if processes == 1:
+        for task in tasks:
+            yield from run_chunk(task)
+        return
+
+    with Pool(processes) as pool:
+        for rows in pool.imap_unordered(run_chunk, tasks):
+            yield from rows
+
+
+def to_table(rows):
+    """ one table of summaries: a dict of columns, ordered by the run """
+    rows = sorted(rows, key=lambda row: row['run'])
+    names = list(dict.fromkeys(name for row in rows for name in row))
+
+    return {name: np.array([row.get(name) for row in rows]) for name in names}
+
+
+def sweep(agent_cls, params, seeds=(0,), processes=None, chunksize=None,
+          store=None, **sim_kwargs):
+    """ simulate all runs of a sweep and collect their summaries into one table """
+    return to_table(iter_sweep(agent_cls, params, seeds, processes=processes,
+                               chunksize=chunksize, store=store, **sim_kwargs))
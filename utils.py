@@ -1,8 +1,72 @@
 import numpy as np
 
+# values summed by one cumulative sum of running_mean, so that the rounding
+# errors of long series do not grow with their length
+SUM_BLOCK = 1024
 
-def running_mean(x, window=10, mode='valid', pad=True):
+
+def running_mean(x, window=10):
     """ a function allowing to plot smoother graphs by averaging
-        values of the several time steps """
-    x = np.pad(x, (window - 1, 0), mode='edge')
-    return np.convolve(x, np.ones((window,)) / window, mode='valid')
\ No newline at end of file
+        values of the several time steps.
+        Smooths along the first axis, so several series of the same length
+        can be smoothed at once as the columns of a 2-D array.
+        A NaN (or inf) only changes the means of the windows it is in """
+    x = np.asarray(x, dtype=float)
+    # the first values are averaged with copies of the first value
+    x = np.concatenate([np.repeat(x[:1], window - 1, axis=0), x])
+    finite = np.isfinite(x)
+    values = np.where(finite, x, 0)
+
+    # means over the window from cumulative sums, in O(n) for any window,
+    # restarted every block and taken around the mean of the block
+    n = len(x) - window + 1
+    means = np.empty((n,) + x.shape[1:])
+    block = max(SUM_BLOCK, window)
+    for start in range(0, n, block):
+        segment = values[start:start + block + window - 1]
+        offset = segment.mean(axis=0)
+        cumsum = np.cumsum(segment - offset, axis=0)
+        sums = cumsum[window - 1:].copy()
+        sums[1:] -= cumsum[:-window]
+        means[start:start + block] = sums / window + offset
+
+    # means of the windows with values that are not finite, from the numbers
+    # of NaN, inf and -inf in every window: NaN if there is a NaN or both
+    # infinities, else the infinity
+    if not finite.all():
+        nan, inf, neg = (window_counts(mask, window)
+                         for mask in (np.isnan(x), np.isposinf(x), np.isneginf(x)))
+        means[inf > 0] = np.inf
+        means[neg > 0] = -np.inf
+        means[(nan > 0) | ((inf > 0) & (neg > 0))] = np.nan
+    return means
+
+
+def window_counts(mask, window):
+    """ number of the true values of the mask in every window along the first axis """
+    counts = np.cumsum(mask, axis=0)
+    counts[window:] = counts[window:] - counts[:-window]
+    return counts[window - 1:]
+
+
+def minmax_downsample(x, y, buckets):
+    """ at most 2 points per each of the buckets of consecutive points:
+        the minimum and the maximum of y in the bucket (in their order),
+        so that a plot keeps its shape with much fewer points """
+    n = len(x)
+    if n <= 2 * buckets:
+        return x, y
+
+    size = -(-n // buckets)
+    full = n // size * size
+    blocks = np.asarray(y[:full]).reshape(-1, size)
+
+    lowest = np.argmin(blocks, axis=1)
+    highest = np.argmax(blocks, axis=1)
+    starts = np.arange(0, full, size)
+    index = np.column_stack([starts + np.minimum(lowest, highest),
+                             starts + np.maximum(lowest, highest)]).ravel()
+    # the points of the last, incomplete bucket are kept
+    index = np.r_[index, np.arange(full, n)]
+
+    return np.asarray(x)[index], np.asarray(y)[index]
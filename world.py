@@ -0,0 +1,262 @@
+# schedule of the world the agents live in: when the temperature change
+# and the light change of the environment change and when the current flows.
+# A schedule is compiled once per simulation into arrays indexed by the step
+import numpy as np
+
+
+def event_step(time, dt):
+    """ first step starting at or after the time """
+    return int(np.ceil(time / dt - 1e-9))
+
+
+def step_after(time, dt):
+    """ first step starting after the time """
+    return int(np.floor(time / dt + 1e-9)) + 1
+
+
+class Forcing:
+    """Value of a forcing of the world over time, changed by events:
+       jumps to a value at a time (`set`) or after it (`after`) and linear
+       changes to a value over a period of time (`ramp`).
+       Before the first event the value is `initial`."""
+
+    def __init__(self, initial=0):
+        self.initial = initial
+        self.events = []
+
+    def set(self, time, value):
+        """ jump to the value at the time """
+        self.events.append((time, time, value))
+        return self
+
+    def after(self, time, value):
+        """ jump to the value at the first step after the time """
+        self.events.append((time, time, value, True))
+        return self
+
+    def ramp(self, start, end, value):
+        """ change linearly from the current value to the value between start and end """
+        self.events.append((start, end, value))
+        return self
+
+    def key(self):
+        return (self.initial, tuple(sorted(self.events)))
+
+    def start_time(self):
+        """ time of the first event (inf without events) """
+        return min((event[0] for event in self.events), default=np.inf)
+
+    def at(self, steps, dt):
+        """ value at the start of each of the given steps (sorted step numbers)
+            and whether it was set by an event """
+        steps = np.asarray(steps)
+        values = np.full(len(steps), float(self.initial))
+        changed = np.zeros(len(steps), dtype=bool)
+
+        level = self.initial
+        for start, end, value, *after in sorted(self.events):
+            if after:
+                first = last = step_after(start, dt)
+            else:
+                first = event_step(start, dt)
+                last = event_step(end, dt)
+
+            # linear change during the ramp
+            ramp = (steps >= first) & (steps < last)
+            values[ramp] = level + (value - level) * (steps[ramp] * dt - start) / (end - start)
+            values[steps >= last] = value
+            changed |= (steps >= first) & (steps <= last)
+            level = value
+
+        return values, changed
+
+    def compile(self, steps, dt, start=0):
+        """ value at the start of each of the steps from the step `start` """
+        return self.at(np.arange(start, start + steps), dt)
+
+
+class Schedule:
+    """Scenario of the world:
+       the temperature change of the environment (`temp_change`), set at its events,
+       the light change of the environment (`light_change`)
+       and the current (`current`), the velocity added to the velocity of the agent."""
+
+    def __init__(self, temp_change=None, light_change=None, current=None):
+        self.temp_change = temp_change or Forcing()
+        self.light_change = light_change or Forcing()
+        self.current = current or Forcing()
+
+    def key(self):
+        return (self.temp_change.key(), self.light_change.key(), self.current.key())
+
+    def __eq__(self, other):
+        return isinstance(other, Schedule) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def at(self, steps, dt):
+        """ forcing at each of the given steps (sorted step numbers) """
+        steps = np.asarray(steps)
+        temp_change, temp_change_set = self.temp_change.at(steps, dt)
+        light_change, _ = self.light_change.at(steps, dt)
+        light_change_next, _ = self.light_change.at(steps + 1, dt)
+        current, _ = self.current.at(steps, dt)
+
+        return {
+            # temperature change of the environment to jump to at the step
+            # (NaN where it is not set, so that it keeps its value)
+            'temp_change': np.where(temp_change_set, temp_change, np.nan),
+            # rate of the light change of the environment over the step
+            'light_change': (light_change_next - light_change) / dt,
+            'current': current,
+        }
+
+    def compile(self, steps, dt, start=0):
+        """ per-step arrays of the forcing for the given number of steps from the step `start` """
+        return self.at(np.arange(start, start + steps), dt)
+
+
+class SharedWorld:
+    """World of a population of agents living in it together:
+       the forcing of its schedule is compiled and evaluated once per step
+       for all agents, and the light change of the environment is
+       the same for all of them, while every agent has its own position
+       (and so its own temperature change of the environment) and temperature."""
+
+    def __init__(self, schedule, dt):
+        self.schedule = schedule
+        self.dt = dt
+        self.reset()
+
+    def reset(self):
+        self.light_change_environment = 0.0
+
+    def compile(self, steps, start=0):
+        """ compile the forcing for the steps from the step `start` """
+        self.forcing = self.schedule.compile(steps, self.dt, start=start)
+        self.forcing_start = start
+
+    def advance(self, step):
+        """ forcing of the step and the light change of the environment """
+        i = step - self.forcing_start
+        self.temp_change = self.forcing['temp_change'][i]
+        self.light_change = self.forcing['light_change'][i]
+        self.current = self.forcing['current'][i]
+
+        self.light_change_environment += self.light_change * self.dt
+
+
+class DepthField:
+    """World over depth (positive downwards, from the surface at 0) and time:
+       the temperature change of the environment and the light at each depth
+       and time, given as functions f(depth, time) of arrays.
+
+       The functions are evaluated once on a grid of `depth_step` x `time_step`
+       over the `depths` (min, max) and `times` (start, end) and the simulation
+       interpolates the grid bilinearly. Outside of the grid the values at its
+       border are used, or with a `period` the time wraps around the period
+       (the grid then covers one period). Agents start at `depth_initial`."""
+
+    def __init__(self, temp_change, light, depths=(0, 50), times=(0, 1000), depth_step=0.5,
+                 time_step=1.0, period=None, depth_initial=10):
+        if period is not None:
+            times = (0, period)
+        depth = np.linspace(depths[0], depths[1],
+                            max(int(round((depths[1] - depths[0]) / depth_step)), 1) + 1)
+        time = np.linspace(times[0], times[1],
+                           max(int(round((times[1] - times[0]) / time_step)), 1) + 1)
+
+        grid_time, grid_depth = np.meshgrid(time, depth, indexing='ij')
+        shape = grid_time.shape
+        self.set_tables(depth, time,
+                        np.broadcast_to(temp_change(grid_depth, grid_time), shape),
+                        np.broadcast_to(light(grid_depth, grid_time), shape),
+                        period, depth_initial)
+
+    @classmethod
+    def from_tables(cls, depth, time, temp_change, light, period=None, depth_initial=10):
+        """ field of tables (time x depth) over evenly spaced depths and times """
+        field = cls.__new__(cls)
+        field.set_tables(np.asarray(depth, dtype=float), np.asarray(time, dtype=float),
+                         temp_change, light, period, depth_initial)
+        return field
+
+    def set_tables(self, depth, time, temp_change, light, period, depth_initial):
+        self.depth = depth
+        self.time = time
+        # values at (time, depth) of the grid
+        self.temp_change = np.array(temp_change, dtype=float)
+        self.light = np.array(light, dtype=float)
+        self.period = period
+        self.depth_initial = depth_initial
+
+        self.depth_min = depth[0]
+        self.depth_step = depth[1] - depth[0]
+        self.time_min = time[0]
+        self.time_step = time[1] - time[0]
+
+    def time_index(self, time):
+        """ row of the grid before the time and the fraction of the time step after it """
+        if self.period is not None:
+            time = time % self.period
+        t = min(max((time - self.time_min) / self.time_step, 0.0), len(self.time) - 1.0)
+        j = min(int(t), len(self.time) - 2)
+        return j, t - j
+
+    def sample(self, table, depth, time):
+        """ value of the table (`self.temp_change` or `self.light`)
+            at the depth and the time, interpolated bilinearly """
+        j, ft = self.time_index(time)
+        z = min(max((depth - self.depth_min) / self.depth_step, 0.0), len(self.depth) - 1.0)
+        i = min(int(z), len(self.depth) - 2)
+        fz = z - i
+
+        # the same operations as in sample_array, on floats
+        before, after = table.item(j, i), table.item(j + 1, i)
+        low = before + ft * (after - before)
+        before, after = table.item(j, i + 1), table.item(j + 1, i + 1)
+        high = before + ft * (after - before)
+        return low + fz * (high - low)
+
+    def sample_array(self, table, depth, time):
+        """ value of the table at the depths (an array) and the time,
+            the same as `sample` for each of the depths """
+        j, ft = self.time_index(time)
+        row = table[j] + ft * (table[j + 1] - table[j])
+
+        z = np.clip((depth - self.depth_min) / self.depth_step, 0.0, len(self.depth) - 1.0)
+        i = np.minimum(z.astype(int), len(self.depth) - 2)
+        fz = z - i
+
+        low, high = row[i], row[i + 1]
+        return low + fz * (high - low)
+
+
+def thermocline(depth=20, width=5, warm=0.5, cold=-0.5):
+    """ temperature change of the environment, warming above
+        the thermocline at the depth and cooling below it """
+    return lambda z, t: warm + (cold - warm) * (np.tanh((z - depth) / width) + 1) / 2
+
+
+def day_night(period=200, amplitude=5, attenuation=0.1):
+    """ light of a cycle of day and night with the period,
+        decaying exponentially with the depth """
+    return lambda z, t: amplitude * (1 + np.sin(2 * np.pi * t / period)) / 2 * \
+        np.exp(-attenuation * z)
+
+
+def temperature_drops():
+    """ changes of the temperature change of the environment
+        the agents are exposed to """
+    return Forcing().set(50, 3).set(100, 5).set(150, -1).set(200, -6.2).set(250, 0)
+
+
+def sunset():
+    """ light drop before the temperature drop, for a short period of time """
+    return Forcing().ramp(175, 176, -0.7).ramp(200, 201, 0)
+
+
+def current_after(time=300, velocity=0.1):
+    """ current moving the agent closer to the surface after the time """
+    return Forcing().after(time, velocity)